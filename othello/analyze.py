@@ -0,0 +1,135 @@
+"""
+Batch analysis of positions, for game archives.
+
+Positions are read as lines of text, position strings as given by
+Game.to_string (64 squares and the player to move), from files or standard
+input, and searched by an engine (see othello.arena.parse_engine) in a pool
+of worker processes. The results are written as JSON lines in the order of
+the input; a position where the player to move must pass has the move
+"pass" and no score, depth or principal variation. The stages are
+generators, and at most 'window' positions are in flight at a time, so
+memory use does not depend on the size of the input.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import os
+import sys
+import time
+
+from othello.arena import parse_engine
+from othello.game import Game
+from othello.players import Player
+
+# the AIs of a worker process by numeric colour, set up by _init_worker
+_worker_ais = None
+
+
+def _init_worker(engine):
+    global _worker_ais
+    cls, kwargs = parse_engine(engine)
+    _worker_ais = {Player.black: cls('black', **kwargs),
+                   Player.white: cls('white', **kwargs)}
+
+
+def read_positions(files):
+    """
+    Yield the positions of the open 'files', one per line, skipping blank
+    lines and comments starting with '#'.
+    """
+    for f in files:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+def analyze_position(line, ais=None):
+    """
+    Search the position string 'line' with the AI of the player to move
+    from 'ais' (the worker's AIs by default). Return the result as a dict.
+    """
+    ais = ais or _worker_ais
+    result = {'position': line}
+    try:
+        game = Game.from_string(line, [ais[Player.black], ais[Player.white]])
+    except ValueError as e:
+        result['error'] = str(e)
+        return result
+    if not game.legal_moves():
+        result.update(move='pass', score=None, depth=None, pv=None, nodes=0,
+                      seconds=0.0)
+        return result
+    ai = game.current_player
+    start = time.perf_counter()
+    nodes = ai._expanded_states
+    move = ai.search(game)
+    result.update(
+        move=None if move is None else game.board.parse_numeric_index(move),
+        score=None if ai.score is None else float(ai.score),
+        depth=ai.depth_reached,
+        pv=[None if m is None else game.board.parse_numeric_index(m)
+            for m in ai.pv],
+        nodes=ai._expanded_states - nodes,
+        seconds=time.perf_counter() - start)
+    return result
+
+
+def analyze(positions, engine='alphabeta:depth=4', workers=None,
+            window=None):
+    """
+    Search the position strings of the iterable 'positions' with 'engine'
+    in 'workers' processes, yielding the results in input order. At most
+    'window' positions (by default four per process) are submitted ahead
+    of the result being yielded.
+    """
+    parse_engine(engine)    # fail early on a bad specification
+    workers = workers or os.cpu_count() or 1
+    window = window or 4 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(engine,)) as pool:
+        pending = deque()
+        for line in positions:
+            pending.append(pool.submit(analyze_position, line))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Find the best moves of positions, one per line, as '
+                    'written by Game.to_string.')
+    parser.add_argument(
+        'files', nargs='*', type=argparse.FileType('r'),
+        help='files of positions, default is standard input')
+    parser.add_argument(
+        '-e', '--engine', default='alphabeta:depth=4',
+        help="engine searching the positions, default is "
+             "'alphabeta:depth=4'")
+    parser.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='number of processes, default is one per CPU')
+    parser.add_argument(
+        '--window', type=int, default=None,
+        help='number of positions in flight, default is four per process')
+    parser.add_argument(
+        '-o', '--output', type=argparse.FileType('w'), default=sys.stdout,
+        help='JSONL file to write the results to, default is standard '
+             'output')
+    args = parser.parse_args(argv)
+
+    try:
+        results = analyze(read_positions(args.files or [sys.stdin]),
+                          args.engine, args.workers, args.window)
+        for result in results:
+            args.output.write(json.dumps(result) + '\n')
+            args.output.flush()
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == '__main__':
+    main()
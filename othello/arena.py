@@ -0,0 +1,248 @@
+"""
+Headless self-play tournaments between AI players, for regression testing
+engine changes.
+
+Engines are given as 'name:key=value,...', e.g. 'alphabeta:depth=3' or
+'minimax:depth=2,time_limit=1', where the keys are passed on to the AI.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import ast
+import json
+import math
+import random
+import sys
+
+from othello.game import Board, Game
+from othello.players import MiniMaxAI, AlphaBetaAI, PVSAI
+from othello.records import ArchiveWriter
+
+ENGINES = {
+    'minimax': MiniMaxAI,
+    'alphabeta': AlphaBetaAI,
+    'pvs': PVSAI,
+}
+
+
+def parse_engine(spec):
+    """
+    Parse an engine specification into an AI class and its keyword
+    arguments.
+    """
+    name, _, args = spec.partition(':')
+    try:
+        cls = ENGINES[name]
+    except KeyError:
+        raise ValueError('unknown engine {!r}, choose from {}'.format(
+            name, ', '.join(sorted(ENGINES))))
+    kwargs = dict()
+    for arg in filter(None, args.split(',')):
+        key, _, value = arg.partition('=')
+        try:
+            kwargs[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[key] = value
+    return cls, kwargs
+
+
+def random_opening(game, nbr_of_moves, rng):
+    """
+    Play 'nbr_of_moves' random legal moves, returning the moves made.
+    """
+    moves = list()
+    for _ in range(nbr_of_moves):
+        if game.is_terminal():
+            break
+        legal = game.legal_moves()
+        move = rng.choice(legal) if legal else None
+        game.make_move(move)
+        moves.append(move)
+    return moves
+
+
+def play_game(black, white, opening_moves=0, seed=None):
+    """
+    Play a game between the engines 'black' and 'white' (specifications as
+    accepted by parse_engine), after a random opening of 'opening_moves'
+    moves. Return the result as a dict.
+    """
+    (black_cls, black_kwargs), (white_cls, white_kwargs) = (
+        parse_engine(black), parse_engine(white))
+    players = [black_cls('black', **black_kwargs),
+               white_cls('white', **white_kwargs)]
+    game = Game(Board(), players)
+    moves = random_opening(game, opening_moves, random.Random(seed))
+    while not game.is_terminal():
+        if game.legal_moves():
+            move = game.current_player.get_move(game)
+        else:
+            move = None
+        game.make_move(move)
+        moves.append(move)
+    for player in players:
+        player.close()
+
+    black_tiles = game.nbr_of_tiles(players[0])
+    white_tiles = game.nbr_of_tiles(players[1])
+    return {
+        'black': black,
+        'white': white,
+        'seed': seed,
+        'black_tiles': black_tiles,
+        'white_tiles': white_tiles,
+        'winner': ('black' if black_tiles > white_tiles else
+                   'white' if white_tiles > black_tiles else None),
+        'moves': [None if m is None else game.board.parse_numeric_index(m)
+                  for m in moves],
+    }
+
+
+def elo(scores):
+    """
+    Estimate the Elo difference from a list of game scores (1 for a win,
+    0.5 for a draw and 0 for a loss), returning the estimate and the 95%
+    confidence margin.
+    """
+    n = len(scores)
+    if not n:
+        return 0.0, math.inf
+    p = sum(scores) / n
+    if p <= 0 or p >= 1:
+        return (-math.inf if p <= 0 else math.inf), math.inf
+    variance = sum(s * s for s in scores) / n - p * p
+    margin = (1.96 * math.sqrt(variance / n) *
+              400 / (math.log(10) * p * (1 - p)))
+    return -400 * math.log10(1 / p - 1), margin
+
+
+class Tournament:
+    """
+    Plays 'games' games between two engines, spread over a pool of
+    'workers' processes. Each random opening is played twice, with the
+    engines swapping colours.
+    """
+
+    def __init__(self, engine, opponent, games=100, workers=None,
+                 opening_moves=4, seed=0):
+        # fail early on bad specifications
+        parse_engine(engine)
+        parse_engine(opponent)
+        self.engine = engine
+        self.opponent = opponent
+        self.games = games
+        self.workers = workers
+        self.opening_moves = opening_moves
+        self.seed = seed
+        self.scores = list()
+        self.disc_differentials = list()
+
+    def tasks(self):
+        for i in range(self.games):
+            seed = self.seed + i // 2
+            if i % 2 == 0:
+                yield self.engine, self.opponent, self.opening_moves, seed
+            else:
+                yield self.opponent, self.engine, self.opening_moves, seed
+
+    def record(self, result):
+        """
+        Score a finished game from the point of view of the engine.
+        """
+        colour = 'black' if result['black'] == self.engine else 'white'
+        other = 'white' if colour == 'black' else 'black'
+        if result['black'] == result['white']:
+            # an engine playing itself, score it as black
+            colour, other = 'black', 'white'
+        score = (0.5 if result['winner'] is None else
+                 1.0 if result['winner'] == colour else 0.0)
+        differential = (result[colour + '_tiles'] -
+                        result[other + '_tiles'])
+        self.scores.append(score)
+        self.disc_differentials.append(differential)
+        result['engine_score'] = score
+        result['engine_disc_differential'] = differential
+        return result
+
+    def run(self):
+        """
+        Play the games, yielding each result as soon as it is finished.
+        """
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(play_game, *task) for task in self.tasks()]
+            for future in as_completed(futures):
+                yield self.record(future.result())
+
+    def summary(self):
+        rating, margin = elo(self.scores)
+        n = len(self.scores)
+        return {
+            'engine': self.engine,
+            'opponent': self.opponent,
+            'games': n,
+            'wins': self.scores.count(1.0),
+            'draws': self.scores.count(0.5),
+            'losses': self.scores.count(0.0),
+            'mean_disc_differential': (sum(self.disc_differentials) / n
+                                       if n else 0.0),
+            # JSON has no infinity, which is given for a clean sweep
+            'elo': rating if math.isfinite(rating) else None,
+            'elo_margin': margin if math.isfinite(margin) else None,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Play AI vs AI games and estimate their Elo difference.')
+    parser.add_argument('engine', help="engine under test, e.g. "
+                        "'alphabeta:depth=3'")
+    parser.add_argument('opponent', help="reference engine, e.g. "
+                        "'minimax:depth=2'")
+    parser.add_argument(
+        '-n', '--games', type=int, default=100,
+        help='number of games, default is 100')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='number of processes, default is one per CPU')
+    parser.add_argument(
+        '--opening-moves', type=int, default=4,
+        help='number of random moves at the start of each game, '
+             'default is 4')
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='seed of the random openings, default is 0')
+    parser.add_argument(
+        '-o', '--output', default=None,
+        help='JSONL file to stream the results to, default is stdout')
+    parser.add_argument(
+        '--archive', default=None,
+        help='game archive to append the games to, see othello.records')
+    args = parser.parse_args(argv)
+
+    try:
+        tournament = Tournament(args.engine, args.opponent, args.games,
+                                args.workers, args.opening_moves, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    out = open(args.output, 'a') if args.output else sys.stdout
+    archive = ArchiveWriter(args.archive) if args.archive else None
+    try:
+        for result in tournament.run():
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            if archive is not None:
+                archive.add_result(result)
+        summary = tournament.summary()
+        out.write(json.dumps(dict(summary, type='summary')) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if archive is not None:
+            archive.close()
+    rating, margin = elo(tournament.scores)
+    print('{} vs {}: +{} ={} -{}, Elo {:+.0f} +/- {:.0f}'.format(
+        args.engine, args.opponent, summary['wins'], summary['draws'],
+        summary['losses'], rating, margin), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Search benchmarks over a fixed set of test positions, for tracking the speed
+of the engines between commits.
+
+Each engine (a specification as accepted by othello.arena.parse_engine)
+searches each position once, and a JSON line is written per search with the
+expanded states, the nodes per second, the time to each depth, the effective
+branching factor and the peak memory use of the benchmark process so far
+(which is the same for all searches after the most demanding one; run a
+single search per process to measure each).
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from othello.arena import parse_engine
+from othello.game import Game
+from othello.players import Player
+
+# positions reached by random play, as given by Game.to_string, named by
+# their number of empty squares
+MIDGAME = {
+    'mid52': ('---------------------------OX---'
+              '---XO----OOOOOX-------X-------X- X'),
+    'mid46': ('-----------------O-O-----XXOX---'
+              '--XXX-----XOXX---XOO-O---O------ X'),
+    'mid40': ('-X--O-----X-OO---OOXO-O---OXXOX-'
+              '---OOXX----OOX-------O--------O- X'),
+    'mid34': ('-----O------OO-XOOOOOOOO---OOXO-'
+              '-XXXXOO---XXOOO-----O-X--------X X'),
+    'mid28': ('-O------XXXXOOO-XOXXXXX-OOOXOXO-'
+              'OOOOX-----OX-X---OOOOO---O------ X'),
+}
+
+ENDGAME = {
+    'end14a': ('--XXXXX--OXXXX-O-OOXOXO--OOOXOOO'
+               '-O-OOOOOOOXOOOOO-XXXXXO-XXXX-O-O X'),
+    'end14b': ('O-X-XXXXOXXOOOOOOOXXOOOOO-XOX-O-'
+               '-OOOXO--XXOOXOX-OO-OXXX----OXXXO X'),
+    'end12a': ('-XXXXO--XXXXXX--OOOOOOX-XOXOOX-O'
+               '-XOOXOOOOXOX-OOOXXXOOOOOOXOO--O- X'),
+    'end12b': ('X-OO-OX--XOOOX-XXOOOXOXXXOOOXXO-'
+               'XOOOXXOOXOOXX-OOXOOOOO-O--OX-O-O X'),
+}
+
+MIDGAME_ENGINES = ('minimax:depth=2,endgame_empties=0',
+                   'alphabeta:depth=4,endgame_empties=0')
+ENDGAME_ENGINES = ('alphabeta:endgame_empties=14',)
+
+
+def nodes_per_depth(iterations):
+    """
+    The expanded states of each iteration of an AI's iterative deepening,
+    from the cumulative counts in AI.iterations.
+    """
+    nodes = dict()
+    previous = 0
+    for depth, _, total in iterations:
+        nodes[depth] = total - previous
+        previous = total
+    return nodes
+
+
+def branching_factor(iterations):
+    """
+    The effective branching factor, the ratio of the expanded states of the
+    last two iterations, or None with fewer than two iterations.
+    """
+    nodes = list(nodes_per_depth(iterations).values())
+    if len(nodes) < 2 or not nodes[-2]:
+        return None
+    return nodes[-1] / nodes[-2]
+
+
+def peak_memory():
+    """
+    The peak resident set size of the process so far in bytes, or None
+    where it is not available (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def metadata():
+    """
+    The Python version, platform and git commit the benchmark ran on.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'commit': commit,
+    }
+
+
+def run(name, position, engine, trace_memory=False):
+    """
+    Search 'position' (as given by Game.to_string) with 'engine' and return
+    the measurements as a dict.
+    """
+    cls, kwargs = parse_engine(engine)
+    to_move = 'white' if position.split()[-1].upper() == 'O' else 'black'
+    ai = cls(to_move, **kwargs)
+    other = Player('black' if to_move == 'white' else 'white')
+    players = [ai, other] if to_move == 'black' else [other, ai]
+    game = Game.from_string(position, players)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        move = ai.search(game)
+    finally:
+        seconds = time.perf_counter() - start
+        if trace_memory:
+            traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        ai.close()
+    nodes = ai._expanded_states
+    result = {
+        'position': name,
+        'engine': engine,
+        'empties': game.nbr_of_empty_tiles(),
+        'move': (None if move is None else
+                 game.board.parse_numeric_index(move)),
+        'score': None if ai.score is None else float(ai.score),
+        'depth': ai.depth_reached,
+        'nodes': nodes,
+        'seconds': seconds,
+        'nps': nodes / seconds if seconds else None,
+        'time_to_depth': {str(d): t for d, t, _ in ai.iterations},
+        'nodes_per_depth': {str(d): n for d, n in
+                            nodes_per_depth(ai.iterations).items()},
+        'branching_factor': branching_factor(ai.iterations),
+        'process_peak_rss': peak_memory(),
+    }
+    if trace_memory:
+        result['peak_traced'] = traced
+    return result
+
+
+def benchmarks(midgame_engines=MIDGAME_ENGINES,
+               endgame_engines=ENDGAME_ENGINES, positions=None):
+    """
+    The (name, position, engine) triples to run: the midgame positions with
+    'midgame_engines' and the endgame positions with 'endgame_engines',
+    restricted to the position names in 'positions' if given.
+    """
+    for group, engines in ((MIDGAME, midgame_engines),
+                           (ENDGAME, endgame_engines)):
+        for name, position in group.items():
+            if positions is None or name in positions:
+                for engine in engines:
+                    yield name, position, engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the search engines on fixed test positions.')
+    parser.add_argument(
+        '-e', '--engine', action='append', default=None,
+        help="engine to run on the midgame positions, e.g. "
+             "'alphabeta:depth=5', may be repeated")
+    parser.add_argument(
+        '-E', '--endgame-engine', action='append', default=None,
+        help='engine to run on the endgame positions, may be repeated')
+    parser.add_argument(
+        '-p', '--position', action='append', default=None,
+        choices=sorted(list(MIDGAME) + list(ENDGAME)),
+        help='only run this position, may be repeated')
+    parser.add_argument(
+        '--trace-memory', action='store_true',
+        help='also measure the peak Python allocations with tracemalloc, '
+             'which slows the search down')
+    parser.add_argument(
+        '-o', '--output', default=None,
+        help='JSONL file to append the results to, default is stdout')
+    args = parser.parse_args(argv)
+
+    tasks = list(benchmarks(args.engine or MIDGAME_ENGINES,
+                            args.endgame_engine or ENDGAME_ENGINES,
+                            args.position))
+    try:
+        for _, _, engine in tasks:
+            parse_engine(engine)
+    except ValueError as e:
+        parser.error(str(e))
+    meta = metadata()
+    out = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        for name, position, engine in tasks:
+            result = run(name, position, engine, args.trace_memory)
+            out.write(json.dumps(dict(result, **meta)) + '\n')
+            out.flush()
+            print('{:8} {:40} {:>10} nodes {:8.2f}s {:>10.0f} nps'.format(
+                name, engine, result['nodes'], result['seconds'],
+                result['nps'] or 0), file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
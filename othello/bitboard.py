@@ -0,0 +1,225 @@
+"""
+Bitboard primitives for the game of othello.
+
+A position is represented by two 64-bit integers, one per player, where bit
+'x * 8 + y' is set if the player has a tile on board[x, y] (x being the row
+and y the column, see Board.parse_numeric_index). Move generation and flip
+computation are done with shifts and masks over all squares at once.
+"""
+
+FULL = 0xFFFFFFFFFFFFFFFF
+NOT_A = 0xFEFEFEFEFEFEFEFE  # every square except column a (y == 0)
+NOT_H = 0x7F7F7F7F7F7F7F7F  # every square except column h (y == 7)
+
+# (shift, mask) pairs for the eight directions, in the same order as the
+# directions were originally walked in Game.get_valid_flips, i.e.
+# [0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1].
+# The mask clears the bits that wrapped around to the other side of the board.
+DIRECTIONS = ((1, NOT_A), (9, NOT_A), (8, FULL), (7, NOT_H),
+              (-1, NOT_H), (-9, NOT_H), (-8, FULL), (-7, NOT_A))
+
+_LEFT = tuple((d, m) for d, m in DIRECTIONS if d > 0)
+_RIGHT = tuple((-d, m) for d, m in DIRECTIONS if d < 0)
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(bits):
+        """
+        Return the number of set bits in 'bits'.
+        """
+        return bin(bits).count('1')
+
+
+def square(place):
+    """
+    Convert a numeric (x, y) index into a square number in [0, 63].
+    """
+    x, y = place
+    return 8 * x + y
+
+
+def place(sq):
+    """
+    Convert a square number in [0, 63] into a numeric (x, y) index.
+    """
+    return divmod(sq, 8)
+
+
+def squares(bits):
+    """
+    Yield the square numbers of all set bits in 'bits', in ascending order.
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def legal_moves(own, opp):
+    """
+    Return a mask of all squares where the player owning 'own' may move.
+    """
+    empty = ~(own | opp) & FULL
+    moves = 0
+    for d, m in _LEFT:
+        o = opp & m
+        t = (own << d) & o
+        t |= (t << d) & o
+        t |= (t << d) & o
+        t |= (t << d) & o
+        t |= (t << d) & o
+        t |= (t << d) & o
+        moves |= (t << d) & m
+    for d, m in _RIGHT:
+        o = opp & m
+        t = (own >> d) & o
+        t |= (t >> d) & o
+        t |= (t >> d) & o
+        t |= (t >> d) & o
+        t |= (t >> d) & o
+        t |= (t >> d) & o
+        moves |= (t >> d) & m
+    return moves & empty
+
+
+def neighbours(bits):
+    """
+    Return a mask of all squares adjacent to a set bit of 'bits'.
+    """
+    adjacent = 0
+    for d, m in _LEFT:
+        adjacent |= (bits << d) & m
+    for d, m in _RIGHT:
+        adjacent |= (bits >> d) & m
+    return adjacent & FULL
+
+
+def move_features(own, opp):
+    """
+    Return the masks of the legal moves of both players, their potential
+    mobility (the empty squares next to an opponent's tile) and their
+    frontier tiles (those next to an empty square), as (own moves, opponent
+    moves, own potential, opponent potential, own frontier, opponent
+    frontier). All are computed in one pass over the directions, sharing
+    the shifts of legal_moves.
+    """
+    empty = ~(own | opp) & FULL
+    own_moves = opp_moves = 0
+    next_to_own = next_to_opp = next_to_empty = 0
+    for d, m in _LEFT:
+        o = opp & m
+        p = own & m
+        t = (own << d) & o
+        u = (opp << d) & p
+        t |= (t << d) & o
+        u |= (u << d) & p
+        t |= (t << d) & o
+        u |= (u << d) & p
+        t |= (t << d) & o
+        u |= (u << d) & p
+        t |= (t << d) & o
+        u |= (u << d) & p
+        t |= (t << d) & o
+        u |= (u << d) & p
+        own_moves |= (t << d) & m
+        opp_moves |= (u << d) & m
+        next_to_own |= (own << d) & m
+        next_to_opp |= (opp << d) & m
+        next_to_empty |= (empty << d) & m
+    for d, m in _RIGHT:
+        o = opp & m
+        p = own & m
+        t = (own >> d) & o
+        u = (opp >> d) & p
+        t |= (t >> d) & o
+        u |= (u >> d) & p
+        t |= (t >> d) & o
+        u |= (u >> d) & p
+        t |= (t >> d) & o
+        u |= (u >> d) & p
+        t |= (t >> d) & o
+        u |= (u >> d) & p
+        t |= (t >> d) & o
+        u |= (u >> d) & p
+        own_moves |= (t >> d) & m
+        opp_moves |= (u >> d) & m
+        next_to_own |= (own >> d) & m
+        next_to_opp |= (opp >> d) & m
+        next_to_empty |= (empty >> d) & m
+    return (own_moves & empty, opp_moves & empty,
+            next_to_opp & empty, next_to_own & empty,
+            own & next_to_empty, opp & next_to_empty)
+
+
+def _rays():
+    """
+    For each square, the masks of the squares in each of the eight
+    directions up to the edge of the board, split into the directions of
+    increasing and decreasing square numbers.
+    """
+    up = list()
+    down = list()
+    for sq in range(64):
+        x0, y0 = divmod(sq, 8)
+        rays_up = list()
+        rays_down = list()
+        for dx, dy in ((0, 1), (1, 1), (1, 0), (1, -1), (0, -1),
+                       (-1, -1), (-1, 0), (-1, 1)):
+            ray = 0
+            x, y = x0 + dx, y0 + dy
+            while 0 <= x < 8 and 0 <= y < 8:
+                ray |= 1 << (8 * x + y)
+                x, y = x + dx, y + dy
+            # a flip needs at least two squares in the direction
+            if ray & (ray - 1):
+                (rays_up if 8 * dx + dy > 0 else rays_down).append(ray)
+        up.append(tuple(rays_up))
+        down.append(tuple(rays_down))
+    return up, down
+
+
+def _neighbours():
+    """
+    For each square, the mask of the squares adjacent to it.
+    """
+    neighbours = list()
+    for sq in range(64):
+        bit = 1 << sq
+        mask = 0
+        for d, m in _LEFT:
+            mask |= (bit << d) & m
+        for d, m in _RIGHT:
+            mask |= (bit >> d) & m
+        neighbours.append(mask)
+    return neighbours
+
+
+RAYS_UP, RAYS_DOWN = _rays()
+NEIGHBOURS = _neighbours()
+
+
+def flips(own, opp, sq):
+    """
+    Return a mask of the tiles flipped if the player owning 'own' moves on
+    square 'sq', which is 0 if the move is not legal.
+
+    Along each ray from 'sq', the first square not taken by the opponent is
+    found with a bit trick; if it is the player's own tile, the opponent's
+    tiles in between are flipped.
+    """
+    if (own | opp) >> sq & 1 or not NEIGHBOURS[sq] & opp:
+        return 0
+    flipped = 0
+    for ray in RAYS_UP[sq]:
+        blockers = ray & ~opp
+        first = blockers & -blockers
+        if first & own:
+            flipped |= ray & (first - 1)
+    for ray in RAYS_DOWN[sq]:
+        blockers = ray & ~opp
+        if blockers:
+            first = 1 << (blockers.bit_length() - 1)
+            if first & own:
+                flipped |= ray & ~((first << 1) - 1)
+    return flipped
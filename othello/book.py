@@ -0,0 +1,261 @@
+"""
+Opening book, built from the results of self-play games.
+
+Positions are keyed by the Zobrist hash (see othello.transposition) of their
+canonical form under the eight board symmetries (see othello.symmetry), so
+that mirrored and rotated positions share their entries. For each position
+and move the book holds the number of games the move was played in and the
+sum of the final disc differentials, from the point of view of the player
+making the move.
+
+The file is a 16 byte header, the magic number and the number of entries n
+as a little-endian uint64, followed by the n keys (uint64), sums of disc
+differentials (int32), game counts (uint32) and canonical move squares
+(uint8), each as a column sorted by key and move. The file is memory-mapped,
+and a position is looked up with a binary search over the key column.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from othello import symmetry
+from othello.bitboard import place, square
+from othello.transposition import SIDE_KEY, zobrist
+
+MAGIC = b'OTHBOOK\x01'
+HEADER_SIZE = 16
+
+# numeric colour of white, as in Player.white
+_WHITE = 1
+
+
+def position_key(position):
+    """
+    The canonical key of 'position' (as given by Game.position) and the
+    symmetries that take the position to its canonical form.
+    """
+    black, white, to_move = position
+    black, white, symmetries = symmetry.canonical_symmetries(black, white)
+    key = zobrist(white, black)
+    if to_move == _WHITE:
+        key ^= SIDE_KEY
+    return key, symmetries
+
+
+class OpeningBook:
+    """
+    An opening book read from the file 'path', or an empty one. Only moves
+    played in at least 'min_games' games are suggested.
+    """
+
+    def __init__(self, path=None, min_games=1):
+        self.path = path
+        self.min_games = min_games
+        n = 0
+        if path is not None:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER_SIZE)
+            if len(header) != HEADER_SIZE or header[:8] != MAGIC:
+                raise ValueError('{} is not an opening book'.format(path))
+            n = int(np.frombuffer(header, '<u8', 1, 8)[0])
+        if n:
+            data = np.memmap(path, np.uint8, 'r')
+            if len(data) != HEADER_SIZE + 17 * n:
+                raise ValueError('{} is truncated'.format(path))
+            offset = HEADER_SIZE
+            columns = list()
+            for dtype in ('<u8', '<i4', '<u4', 'u1'):
+                size = np.dtype(dtype).itemsize * n
+                columns.append(data[offset:offset + size].view(dtype))
+                offset += size
+        else:
+            columns = [np.zeros(0, dtype)
+                       for dtype in ('<u8', '<i4', '<u4', 'u1')]
+        self.keys, self.scores, self.games, self.squares = columns
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __reduce__(self):
+        # reopen the file rather than pickling the mapped data
+        return OpeningBook, (self.path, self.min_games)
+
+    def entries(self, position):
+        """
+        The moves of 'position' (as given by Game.position) in the book, as
+        a list of (move, games, mean disc differential) with the moves as
+        numeric (x, y) indices.
+        """
+        key, symmetries = position_key(position)
+        start = np.searchsorted(self.keys, np.uint64(key), 'left')
+        end = np.searchsorted(self.keys, np.uint64(key), 'right')
+        entries = list()
+        for i in range(start, end):
+            games = int(self.games[i])
+            sq = symmetry.inverse_square(int(self.squares[i]),
+                                         symmetries[0])
+            entries.append((place(sq), games, int(self.scores[i]) / games))
+        return entries
+
+    def lookup(self, state):
+        """
+        The book move of the game 'state', the move with the best mean disc
+        differential, or None if the position is not in the book.
+        """
+        best = None
+        legal = state.legal_moves()
+        for move, games, mean in self.entries(state.position()):
+            if games >= self.min_games and move in legal and (
+                    best is None or (mean, games) > best[1:]):
+                best = (move, mean, games)
+        return None if best is None else best[0]
+
+
+class BookBuilder:
+    """
+    Collects the moves of finished games into an opening book. Moves up to
+    'plies' moves into a game are recorded, including those of the random
+    openings of self-play games, which is how different moves get tried.
+    """
+
+    def __init__(self, plies=20):
+        self.plies = plies
+        # (key, canonical square) -> [games, sum of disc differentials]
+        self.stats = dict()
+
+    def __len__(self):
+        return len(self.stats)
+
+    def add_book(self, book):
+        """
+        Add the entries of the OpeningBook 'book', to grow an existing book.
+        """
+        for key, score, games, sq in zip(book.keys.tolist(),
+                                         book.scores.tolist(),
+                                         book.games.tolist(),
+                                         book.squares.tolist()):
+            entry = self.stats.setdefault((key, sq), [0, 0])
+            entry[0] += games
+            entry[1] += score
+
+    def add_game(self, moves, differential):
+        """
+        Add a game given by its 'moves' from the start position (numeric
+        indices, None for a pass) which ended with the disc differential
+        'differential' (black minus white tiles).
+        """
+        from othello.game import Board, Game
+        from othello.players import Player
+        game = Game(Board(), [Player('black'), Player('white')])
+        for move in moves[:self.plies]:
+            if move is not None:
+                position = game.position()
+                key, symmetries = position_key(position)
+                # in a symmetric position, equivalent moves share an entry
+                sq = min(symmetry.transform_square(square(move), s)
+                         for s in symmetries)
+                entry = self.stats.setdefault((key, sq), [0, 0])
+                entry[0] += 1
+                entry[1] += (differential if position[2] != _WHITE
+                             else -differential)
+            game.make_move(move)
+
+    def add_result(self, result):
+        """
+        Add a game as given by othello.arena.play_game.
+        """
+        from othello.game import Board
+        board = Board()
+        moves = [None if m is None else board.parse_index(m)
+                 for m in result['moves']]
+        self.add_game(moves, result['black_tiles'] - result['white_tiles'])
+
+    def write(self, path):
+        """
+        Write the book to 'path', replacing the file in one step so that
+        readers with the old file mapped are not affected.
+        """
+        items = sorted(self.stats.items())
+        n = len(items)
+        keys = np.array([key for (key, _), _ in items], '<u8')
+        squares = np.array([sq for (_, sq), _ in items], 'u1')
+        games = np.array([g for _, (g, _) in items], '<u4')
+        scores = np.array([s for _, (_, s) in items], '<i4')
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC)
+            f.write(np.array([n], '<u8').tobytes())
+            for column in (keys, scores, games, squares):
+                f.write(column.tobytes())
+        os.replace(tmp, path)
+
+
+def self_play(engine, games, workers=None, opening_moves=4, seed=0):
+    """
+    Play 'games' games of 'engine' against itself, see
+    othello.arena.Tournament, yielding the results.
+    """
+    from othello.arena import Tournament
+    tournament = Tournament(engine, engine, games, workers, opening_moves,
+                            seed)
+    return tournament.run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Build or grow an opening book from self-play games.')
+    parser.add_argument('book', help='book file, grown if it exists')
+    parser.add_argument(
+        'results', nargs='*',
+        help='JSONL files of game results, as written by othello-arena')
+    parser.add_argument(
+        '--self-play', metavar='ENGINE', default=None,
+        help="also play games of ENGINE against itself, e.g. "
+             "'alphabeta:depth=4'")
+    parser.add_argument(
+        '-n', '--games', type=int, default=100,
+        help='number of self-play games, default is 100')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='number of processes, default is one per CPU')
+    parser.add_argument(
+        '--opening-moves', type=int, default=4,
+        help='number of random moves at the start of each self-play game, '
+             'default is 4')
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='seed of the random openings, default is 0')
+    parser.add_argument(
+        '--plies', type=int, default=20,
+        help='number of moves of each game to record, default is 20')
+    args = parser.parse_args(argv)
+
+    builder = BookBuilder(args.plies)
+    if os.path.exists(args.book):
+        try:
+            builder.add_book(OpeningBook(args.book))
+        except ValueError as e:
+            parser.error(str(e))
+    for path in args.results:
+        with open(path) as f:
+            for line in f:
+                result = json.loads(line)
+                if result.get('type') != 'summary':
+                    builder.add_result(result)
+    if args.self_play is not None:
+        try:
+            results = self_play(args.self_play, args.games, args.workers,
+                                args.opening_moves, args.seed)
+            for result in results:
+                builder.add_result(result)
+        except ValueError as e:
+            parser.error(str(e))
+    builder.write(args.book)
+    print('{}: {} entries'.format(args.book, len(builder)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Persistent cache of search results, shared across games, restarts and
+processes.
+
+A PositionCache keeps the result of each search of an AI, the depth, bound,
+score and best move, in an SQLite database. Positions are keyed like the
+opening book (see othello.book.position_key), by the Zobrist hash of their
+canonical form under the board symmetries, so mirrored and rotated
+positions share their entries, and the move is stored as a square of the
+canonical position.
+
+The database is opened lazily, on first use in each process, in write-ahead
+logging mode so that any number of processes, e.g. the workers of a
+self-play tournament, read it concurrently while one of them writes. The
+least recently used entries are evicted beyond 'max_entries', and entries
+not used for 'max_age' seconds are evicted too. Lookups only read: the
+times of use of the entries found are written with the next store, so that
+readers never wait for the writer.
+
+The scores depend on the engine and its evaluation, so engines with
+different settings should not share a file.
+"""
+import os
+import sqlite3
+import time
+
+from othello import symmetry
+from othello.bitboard import place, square
+from othello.book import position_key
+
+# depth stored for results of searches that reached the end of the game,
+# which are valid at any depth
+COMPLETE = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    key INTEGER PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    bound INTEGER NOT NULL,
+    score REAL NOT NULL,
+    move INTEGER NOT NULL,
+    used REAL NOT NULL
+)
+"""
+_INDEX = 'CREATE INDEX IF NOT EXISTS positions_used ON positions (used)'
+
+
+def _signed(key):
+    # SQLite integers are signed 64 bit
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class PositionCache:
+    """
+    A cache of search results in the SQLite database 'path', holding at most
+    'max_entries' positions (None for no limit) and evicting those not used
+    for 'max_age' seconds (None to keep them). Eviction runs every
+    'evict_interval' stores.
+    """
+
+    def __init__(self, path, max_entries=2 ** 20, max_age=None,
+                 evict_interval=256, timeout=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.evict_interval = evict_interval
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        self._used = dict()
+        self._connection = None
+        self._pid = None
+
+    def __reduce__(self):
+        # each process opens its own connection
+        return PositionCache, (self.path, self.max_entries, self.max_age,
+                               self.evict_interval, self.timeout)
+
+    def __len__(self):
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM positions').fetchone()[0]
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(_SCHEMA)
+            connection.execute(_INDEX)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self):
+        if self._connection is not None and self._pid == os.getpid():
+            if self._used:
+                self._write_used()
+            self._connection.close()
+        self._connection = None
+
+    def lookup(self, position):
+        """
+        The cached result of 'position' (as given by Game.position) as
+        (depth, bound, score, move) with the move as a numeric (x, y) index,
+        or None if the position is not in the cache.
+        """
+        key, symmetries = position_key(position)
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT depth, bound, score, move FROM positions WHERE key = ?',
+            (_signed(key),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used[_signed(key)] = time.time()
+        depth, bound, score, sq = row
+        return (depth, bound, score,
+                place(symmetry.inverse_square(sq, symmetries[0])))
+
+    def store(self, position, depth, bound, score, move):
+        """
+        Store the result of a search of 'position' to 'depth', unless the
+        cache holds a deeper one. Use COMPLETE as the depth of results that
+        are exact to the end of the game.
+        """
+        key, symmetries = position_key(position)
+        sq = symmetry.transform_square(square(move), symmetries[0])
+        connection = self._connect()
+        connection.execute(
+            'INSERT INTO positions VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET depth = excluded.depth, '
+            'bound = excluded.bound, score = excluded.score, '
+            'move = excluded.move, used = excluded.used '
+            'WHERE excluded.depth >= positions.depth',
+            (_signed(key), depth, bound, float(score), sq, time.time()))
+        if self._used:
+            self._write_used()
+        self._stores += 1
+        if self._stores % self.evict_interval == 0:
+            self.evict()
+
+    def _write_used(self):
+        # the times of use of the entries found by lookups since the last
+        # store, forgotten if the database is busy
+        used, self._used = self._used, dict()
+        self._connect().executemany(
+            'UPDATE positions SET used = ? WHERE key = ?',
+            [(t, key) for key, t in used.items()])
+
+    def evict(self):
+        """
+        Delete the entries older than max_age and the least recently used
+        ones beyond max_entries.
+        """
+        connection = self._connect()
+        if self._used:
+            self._write_used()
+        if self.max_age is not None:
+            connection.execute('DELETE FROM positions WHERE used < ?',
+                               (time.time() - self.max_age,))
+        if self.max_entries is not None:
+            connection.execute(
+                'DELETE FROM positions WHERE key IN (SELECT key FROM '
+                'positions ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,))
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
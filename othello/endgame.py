@@ -0,0 +1,217 @@
+"""
+Exact endgame solver. Close to the end of the game the whole remaining game
+tree can be searched, which gives the final disc differential and a perfect
+move rather than a heuristic estimate.
+"""
+from othello.bitboard import flips, legal_moves, popcount, place
+from othello.ordering import SQUARE_PRIORITY
+
+# empty squares are kept in a linked list in this order, so that squares
+# that are usually good moves are tried first
+SQUARE_ORDER = sorted(range(64), key=lambda sq: -SQUARE_PRIORITY[place(sq)])
+
+# the board is divided into four quadrants for the parity ordering
+QUADRANT = [1 << (2 * (sq // 32) + (sq % 8) // 4) for sq in range(64)]
+
+_HEAD = 64
+_TAIL = 65
+
+
+class EndgameSolver:
+    """
+    Searches to the end of the game with negamax alpha-beta on bitboards.
+
+    Moves are ordered fastest-first (least opponent mobility) while more than
+    'fastest_first' squares are empty, and by parity (moves in quadrants with
+    an odd number of empty squares first) below that. The last four empty
+    squares are handled without move generation. 'check_time' is called
+    every 'check_interval' nodes, and may abort the search by raising.
+    """
+
+    def __init__(self, fastest_first=7, check_time=None,
+                 check_interval=1024):
+        self.fastest_first = fastest_first
+        self.check_time = check_time
+        self.check_interval = check_interval
+        self.nodes = 0
+        self._next = [0] * 66
+        self._prev = [0] * 66
+
+    def solve(self, own, opp):
+        """
+        Solve the position where the player owning 'own' is to move. Return
+        the final disc differential (own minus opponent tiles) under perfect
+        play, and the best move as a numeric (x, y) index, or None if the
+        player has to pass.
+        """
+        self.nodes = 0
+        empty = ~(own | opp) & 0xFFFFFFFFFFFFFFFF
+        nxt = self._next
+        prev = self._prev
+        last = _HEAD
+        parity = 0
+        for sq in SQUARE_ORDER:
+            if empty >> sq & 1:
+                nxt[last] = sq
+                prev[sq] = last
+                last = sq
+                parity ^= QUADRANT[sq]
+        nxt[last] = _TAIL
+        prev[_TAIL] = last
+
+        moves = legal_moves(own, opp)
+        if not moves:
+            return self.negamax(own, opp, -64, 64, popcount(empty),
+                                parity), None
+        best, best_sq = -65, None
+        alpha = -64
+        for sq in self.ordered(own, opp, moves, popcount(empty), parity):
+            f = flips(own, opp, sq)
+            self._remove(sq)
+            v = -self.negamax(opp ^ f, own | f | 1 << sq, -64, -alpha,
+                              popcount(empty) - 1, parity ^ QUADRANT[sq])
+            self._restore(sq)
+            if v > best:
+                best, best_sq = v, sq
+                alpha = max(alpha, v)
+        return best, place(best_sq)
+
+    def _remove(self, sq):
+        nxt = self._next
+        prev = self._prev
+        nxt[prev[sq]] = nxt[sq]
+        prev[nxt[sq]] = prev[sq]
+
+    def _restore(self, sq):
+        self._next[self._prev[sq]] = sq
+        self._prev[self._next[sq]] = sq
+
+    def empties(self):
+        """
+        The empty squares, in linked list order.
+        """
+        nxt = self._next
+        sq = nxt[_HEAD]
+        while sq != _TAIL:
+            yield sq
+            sq = nxt[sq]
+
+    def ordered(self, own, opp, moves, n_empty, parity):
+        """
+        The squares of 'moves', in the order they should be searched.
+        """
+        if n_empty > self.fastest_first:
+            scored = list()
+            for sq in self.empties():
+                if moves >> sq & 1:
+                    f = flips(own, opp, sq)
+                    mobility = popcount(legal_moves(opp ^ f,
+                                                    own | f | 1 << sq))
+                    scored.append((mobility, len(scored), sq))
+            scored.sort()
+            return [sq for _, _, sq in scored]
+        odd = list()
+        even = list()
+        for sq in self.empties():
+            if moves >> sq & 1:
+                (odd if parity & QUADRANT[sq] else even).append(sq)
+        return odd + even
+
+    def negamax(self, own, opp, alpha, beta, n_empty, parity):
+        """
+        The final disc differential from the point of view of the player
+        owning 'own', if it lies within (alpha, beta), otherwise a bound.
+        """
+        self.nodes += 1
+        if self.check_time is not None and \
+                self.nodes % self.check_interval == 0:
+            self.check_time()
+        if n_empty <= 4:
+            return self.solve_small(own, opp, alpha, beta,
+                                    self._small_empties(parity))
+
+        moves = legal_moves(own, opp)
+        if not moves:
+            if not legal_moves(opp, own):
+                return popcount(own) - popcount(opp)
+            return -self.negamax(opp, own, -beta, -alpha, n_empty, parity)
+
+        best = -65
+        for sq in self.ordered(own, opp, moves, n_empty, parity):
+            f = flips(own, opp, sq)
+            self._remove(sq)
+            v = -self.negamax(opp ^ f, own | f | 1 << sq, -beta, -alpha,
+                              n_empty - 1, parity ^ QUADRANT[sq])
+            self._restore(sq)
+            if v > best:
+                best = v
+                if v > alpha:
+                    alpha = v
+                    if alpha >= beta:
+                        break
+        return best
+
+    def _small_empties(self, parity):
+        """
+        The last few empty squares, those in odd quadrants first.
+        """
+        odd = list()
+        even = list()
+        for sq in self.empties():
+            (odd if parity & QUADRANT[sq] else even).append(sq)
+        return odd + even
+
+    def solve_small(self, own, opp, alpha, beta, empties):
+        """
+        Negamax over the last few 'empties', trying each empty square
+        directly instead of generating moves.
+        """
+        if len(empties) == 1:
+            return self.solve_1(own, opp, empties[0])
+        best = -65
+        for i, sq in enumerate(empties):
+            f = flips(own, opp, sq)
+            if not f:
+                continue
+            self.nodes += 1
+            rest = empties[:i] + empties[i + 1:]
+            v = -self.solve_small(opp ^ f, own | f | 1 << sq, -beta, -alpha,
+                                  rest)
+            if v > best:
+                best = v
+                if v > alpha:
+                    alpha = v
+                    if alpha >= beta:
+                        return best
+        if best > -65:
+            return best
+        # no move, so pass if the opponent can move, otherwise game over
+        for sq in empties:
+            if flips(opp, own, sq):
+                return -self.solve_small(opp, own, -beta, -alpha, empties)
+        return popcount(own) - popcount(opp)
+
+    def solve_1(self, own, opp, sq):
+        """
+        The final disc differential with a single empty square 'sq' left.
+        """
+        self.nodes += 1
+        f = flips(own, opp, sq)
+        if f:
+            n = popcount(f)
+            return popcount(own) - popcount(opp) + 2 * n + 1
+        f = flips(opp, own, sq)
+        if f:
+            n = popcount(f)
+            return popcount(own) - popcount(opp) - 2 * n - 1
+        return popcount(own) - popcount(opp)
+
+
+def solve(game, **kwargs):
+    """
+    Solve 'game' for the player to move, returning the final disc
+    differential from that player's point of view and the best move.
+    """
+    own = game.board.bits(game.current_player)
+    opp = game.board.bits(game.other_player)
+    return EndgameSolver(**kwargs).solve(own, opp)
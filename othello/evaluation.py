@@ -0,0 +1,255 @@
+"""
+Vectorised evaluation of many positions at once. Positions are given either
+as a stack of 8 x 8 boards, where 1 is a tile of the player the positions
+are evaluated for and -1 a tile of the opponent, or as arrays of bitboards
+(see othello.bitboard) of the player's and the opponent's tiles.
+"""
+import numpy as np
+
+from othello import bitboard
+from othello.bitboard import DIRECTIONS
+
+_DIRECTIONS = tuple((np.uint64(abs(d)), d > 0, np.uint64(m))
+                    for d, m in DIRECTIONS)
+
+
+def square_weights(edge_weight=3, corner_weight=10):
+    """
+    The weight of each square: 'corner_weight' for the corners,
+    'edge_weight' for the rest of the edges and 2 for all other squares.
+    """
+    weights = np.full((8, 8), 2.0)
+    weights[:, 0] = edge_weight
+    weights[0, :] = edge_weight
+    weights[:, -1] = edge_weight
+    weights[-1, :] = edge_weight
+    weights[0, 0] = corner_weight
+    weights[-1, 0] = corner_weight
+    weights[0, -1] = corner_weight
+    weights[-1, -1] = corner_weight
+    return weights
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(bits):
+        return np.bitwise_count(bits).astype(np.int64)
+else:   # numpy < 2.0
+    def popcount(bits):
+        bytes_ = np.ascontiguousarray(bits, dtype='<u8').view(np.uint8)
+        return np.unpackbits(bytes_.reshape(-1, 8), axis=1).sum(
+            axis=1, dtype=np.int64).reshape(np.shape(bits))
+
+
+def legal_moves(own, opp):
+    """
+    Vectorised othello.bitboard.legal_moves over arrays of bitboards.
+    """
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for d, left, m in _DIRECTIONS:
+        o = opp & m
+        if left:
+            t = (own << d) & o
+            for _ in range(5):
+                t |= (t << d) & o
+            moves |= (t << d) & m
+        else:
+            t = (own >> d) & o
+            for _ in range(5):
+                t |= (t >> d) & o
+            moves |= (t >> d) & m
+    return moves & empty
+
+
+def neighbours(bits):
+    """
+    Vectorised othello.bitboard.neighbours over an array of bitboards.
+    """
+    adjacent = np.zeros_like(bits)
+    for d, left, m in _DIRECTIONS:
+        adjacent |= ((bits << d) if left else (bits >> d)) & m
+    return adjacent
+
+
+def to_bits(boards):
+    """
+    Convert a stack of boards, shape (N, 8, 8), to arrays of bitboards of the
+    player's and the opponent's tiles.
+    """
+    boards = np.asarray(boards).reshape(-1, 64)
+    own = np.packbits(boards == 1, axis=1, bitorder='little')
+    opp = np.packbits(boards == -1, axis=1, bitorder='little')
+    return (own.view('<u8').reshape(-1).astype(np.uint64),
+            opp.view('<u8').reshape(-1).astype(np.uint64))
+
+
+def to_boards(own, opp):
+    """
+    Convert arrays of bitboards to a stack of boards of shape (N, 8, 8).
+    """
+    own = np.ascontiguousarray(own, dtype='<u8').view(np.uint8)
+    opp = np.ascontiguousarray(opp, dtype='<u8').view(np.uint8)
+    boards = (np.unpackbits(own.reshape(-1, 8), axis=1,
+                            bitorder='little').astype(np.int8) -
+              np.unpackbits(opp.reshape(-1, 8), axis=1,
+                            bitorder='little').astype(np.int8))
+    return boards.reshape(-1, 8, 8)
+
+
+class MoveCache:
+    """
+    A direct-mapped table of 'size' entries (a power of two) of the legal
+    moves of both players by board hash, shared by move generation (see
+    Game.legal_moves_mask) and the mobility terms of the evaluation. A
+    position evaluated at the search frontier thus has its moves ready when
+    it is expanded by the next iteration.
+    """
+
+    __slots__ = ('_mask', '_keys', '_moves', 'hits', 'misses')
+
+    def __init__(self, size=2 ** 16):
+        if size & (size - 1):
+            raise ValueError('the size must be a power of two')
+        self._mask = size - 1
+        self._keys = [None] * size
+        self._moves = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def moves(self, board):
+        """
+        The masks of the legal moves of black and white on 'board'.
+        """
+        key = board.hash
+        i = key & self._mask
+        if self._keys[i] == key:
+            self.hits += 1
+            return self._moves[i]
+        self.misses += 1
+        black = board.bits(-1)
+        white = board.bits(1)
+        moves = (bitboard.legal_moves(black, white),
+                 bitboard.legal_moves(white, black))
+        self._keys[i] = key
+        self._moves[i] = moves
+        return moves
+
+
+class Evaluator:
+    """
+    A linear combination of the disc difference, the weighted-square score
+    (see square_weights), the mobility difference (the number of legal
+    moves of the player minus those of the opponent), the potential
+    mobility difference (the empty squares next to the opponent's tiles
+    minus those next to the player's) and the frontier difference (the
+    player's tiles next to an empty square minus the opponent's, usually
+    with a negative weight).
+
+    With 'move_cache', attached games keep a MoveCache of that many entries
+    (or the default size for True).
+    """
+
+    def __init__(self, disc_weight=1, square_weight=1, mobility_weight=1,
+                 edge_weight=3, corner_weight=10, potential_mobility_weight=0,
+                 frontier_weight=0, move_cache=None):
+        self.disc_weight = disc_weight
+        self.square_weight = square_weight
+        self.mobility_weight = mobility_weight
+        self.potential_mobility_weight = potential_mobility_weight
+        self.frontier_weight = frontier_weight
+        self.move_cache = move_cache
+        self.weights = square_weights(edge_weight, corner_weight)
+        # the squares of each distinct weight as a bitboard, to score single
+        # positions with popcounts
+        flat = self.weights.reshape(64)
+        self._square_masks = [
+            (float(w), sum(1 << int(sq) for sq in np.flatnonzero(flat == w)))
+            for w in np.unique(flat) if w]
+
+    def evaluate(self, own, opp):
+        """
+        Score the positions given by the arrays of bitboards 'own' and 'opp'.
+        """
+        own = np.asarray(own, dtype=np.uint64).reshape(-1)
+        opp = np.asarray(opp, dtype=np.uint64).reshape(-1)
+        scores = np.zeros(own.shape, dtype=np.float64)
+        if self.disc_weight:
+            scores += self.disc_weight * (popcount(own) - popcount(opp))
+        if self.square_weight:
+            boards = to_boards(own, opp).reshape(-1, 64)
+            scores += self.square_weight * (boards @ self.weights.reshape(64))
+        if self.mobility_weight:
+            scores += self.mobility_weight * (
+                popcount(legal_moves(own, opp)) -
+                popcount(legal_moves(opp, own)))
+        if self.potential_mobility_weight or self.frontier_weight:
+            empty = ~(own | opp)
+            if self.potential_mobility_weight:
+                scores += self.potential_mobility_weight * (
+                    popcount(neighbours(opp) & empty) -
+                    popcount(neighbours(own) & empty))
+            if self.frontier_weight:
+                next_to_empty = neighbours(empty)
+                scores += self.frontier_weight * (
+                    popcount(own & next_to_empty) -
+                    popcount(opp & next_to_empty))
+        return scores
+
+    def attach(self, game):
+        """
+        Prepare 'game' for being evaluated with Evaluator.score, giving its
+        board a MoveCache if enabled.
+        """
+        if self.move_cache and game.board.move_cache is None:
+            game.board.set_move_cache(
+                MoveCache() if self.move_cache is True else
+                MoveCache(self.move_cache))
+
+    def score(self, board, player):
+        """
+        The value of 'board' for 'player', computed with bit operations on
+        the bitboards, which is the same as Evaluator.evaluate.
+        """
+        pop = bitboard.popcount
+        own = board.bits(player)
+        opp = board.bits(-player)
+        score = 0.0
+        if self.disc_weight:
+            score += self.disc_weight * (pop(own) - pop(opp))
+        if self.square_weight:
+            for weight, mask in self._square_masks:
+                score += (self.square_weight * weight *
+                          (pop(own & mask) - pop(opp & mask)))
+        if not (self.mobility_weight or self.potential_mobility_weight or
+                self.frontier_weight):
+            return score
+        cache = board.move_cache
+        if cache is None:
+            (own_moves, opp_moves, own_potential, opp_potential,
+             own_frontier, opp_frontier) = bitboard.move_features(own, opp)
+        else:
+            black_moves, white_moves = cache.moves(board)
+            own_moves, opp_moves = (
+                (white_moves, black_moves) if int(player) == 1
+                else (black_moves, white_moves))
+            empty = ~(own | opp) & bitboard.FULL
+            own_potential = opp_potential = own_frontier = opp_frontier = 0
+            if self.potential_mobility_weight:
+                own_potential = bitboard.neighbours(opp) & empty
+                opp_potential = bitboard.neighbours(own) & empty
+            if self.frontier_weight:
+                next_to_empty = bitboard.neighbours(empty)
+                own_frontier = own & next_to_empty
+                opp_frontier = opp & next_to_empty
+        return (score +
+                self.mobility_weight * (pop(own_moves) - pop(opp_moves)) +
+                self.potential_mobility_weight * (pop(own_potential) -
+                                                  pop(opp_potential)) +
+                self.frontier_weight * (pop(own_frontier) -
+                                        pop(opp_frontier)))
+
+    def evaluate_boards(self, boards):
+        """
+        Score a stack of boards of shape (N, 8, 8).
+        """
+        return self.evaluate(*to_bits(boards))
@@ -1,35 +1,61 @@
 import numpy as np
+import operator
 import re
 import argparse
+import logging
 import os
 
 import sys
 import os.path
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from othello.players import Human, MiniMaxAI, AI
+from othello.players import Player, Human, MiniMaxAI, AI
+from othello import bitboard
+from othello.bitboard import popcount
+from othello import symmetry
+from othello import transposition
+from othello.stats import JSONFormatter
+
+log = logging.getLogger(__name__)
 
 
 class Board:
     """
-    Represents the board as an 8 x 8 matrix, where 0:s are unoccupied tiles,
-    and players' tiles are given by their numeric representation from int()
-    in the Player class.
+    Represents the 8 x 8 board as a pair of bitboards, one per player, see
+    othello.bitboard. Indexing the board gives 0 for unoccupied tiles, and
+    players' tiles are given by their numeric representation from int() in
+    the Player class.
     """
 
     order = 'abcdefgh'
 
+    __slots__ = ('_bits', '_hash', '_count', '_patterns', '_move_cache')
+
     def __init__(self, shape=(8, 8)):
-        self._board = np.zeros(shape=shape)
+        if tuple(shape) != (8, 8):
+            raise ValueError('only 8 x 8 boards are supported')
+        # indexed by the numeric player representation, i.e. _bits[1] holds
+        # the white tiles and _bits[-1] the black tiles
+        self._bits = [0, 0, 0]
+        # Zobrist hash and number of tiles of each player, indexed like
+        # _bits, both kept up to date as the board changes
+        self._hash = 0
+        self._count = [0, 0, 0]
+        # pattern indices for the pattern evaluation, if enabled with
+        # set_patterns, see othello.patterns
+        self._patterns = None
+        # legal moves by board hash, if enabled with set_move_cache, see
+        # othello.evaluation.MoveCache
+        self._move_cache = None
 
     def __str__(self):
         s = '    ' + '   '.join(Board.order) + '\n'
-        line = '  +' + '---+' * self._board.shape[1] + '\n'
+        line = '  +' + '---+' * 8 + '\n'
         s += line
-        for i in range(self._board.shape[0]):
+        for i in range(8):
             s += '%s |' % str(i + 1)
-            for j in range(self._board.shape[1]):
-                s += ' %s |' % ' O*'[int(self._board[i, j])]
+            for j in range(8):
+                s += ' %s |' % ' O*'[self[i, j]]
             s += '\n' + line
         return s
 
@@ -80,29 +106,172 @@ class Board:
         x, y = item
         return Board.order[y] + str(x + 1)
 
+    def bits(self, player):
+        """
+        Get the bitboard of the tiles belonging to 'player'.
+        """
+        return self._bits[int(player)]
+
+    def to_array(self):
+        """
+        Return the board as an 8 x 8 numpy array.
+        """
+        white = np.array([self._bits[1]], dtype='<u8').view(np.uint8)
+        black = np.array([self._bits[-1]], dtype='<u8').view(np.uint8)
+        array = (np.unpackbits(white, bitorder='little').astype(np.int8) -
+                 np.unpackbits(black, bitorder='little').astype(np.int8))
+        return array.reshape((8, 8))
+
+    def _load(self, array):
+        """
+        Set the board from an 8 x 8 array-like.
+        """
+        array = np.asarray(array).reshape(64)
+        self.set_bits(
+            sum(1 << int(i) for i in np.flatnonzero(array > 0)),
+            sum(1 << int(i) for i in np.flatnonzero(array < 0)))
+
+    def set_bits(self, white, black):
+        """
+        Set the board from the bitboards of the white and black tiles.
+        """
+        self._bits[1] = white
+        self._bits[-1] = black
+        self._hash = transposition.zobrist(white, black)
+        self._count[1] = popcount(white)
+        self._count[-1] = popcount(black)
+        if self._patterns is not None:
+            self._patterns.reset(white, black)
+
+    def transformed(self, sym):
+        """
+        A new board with the tiles of this one moved by the symmetry 'sym',
+        see othello.symmetry.
+        """
+        board = Board()
+        board.set_bits(symmetry.transform(self._bits[1], sym),
+                       symmetry.transform(self._bits[-1], sym))
+        return board
+
+    def canonical(self):
+        """
+        The canonical form of the board under the eight symmetries, as
+        (black tiles, white tiles, symmetry) where the symmetry takes the
+        board to the canonical form. Moves are mapped to and from the
+        canonical board with symmetry.transform_move and inverse_move.
+        """
+        return symmetry.canonical(self._bits[-1], self._bits[1])
+
+    @property
+    def hash(self):
+        """
+        Zobrist hash of the tiles on the board.
+        """
+        return self._hash
+
+    @property
+    def patterns(self):
+        """
+        The PatternIndices kept up to date with the board, or None.
+        """
+        return self._patterns
+
+    def set_patterns(self, patterns):
+        """
+        Keep the PatternIndices 'patterns' up to date as moves are made with
+        Game.make_move and taken back, or stop with None.
+        """
+        if patterns is not None:
+            patterns.reset(self._bits[1], self._bits[-1])
+        self._patterns = patterns
+
+    @property
+    def move_cache(self):
+        """
+        The MoveCache of the board, or None.
+        """
+        return self._move_cache
+
+    def set_move_cache(self, cache):
+        """
+        Look up the legal moves on the board in the MoveCache 'cache', or
+        stop with None.
+        """
+        self._move_cache = cache
+
+    def nbr_of_tiles(self):
+        """
+        The number of tiles of both players on the board.
+        """
+        return self._count[1] + self._count[-1]
+
+    def _square(self, item):
+        """
+        Return the square number of a single (x, y) index, or None if 'item'
+        is not a single numeric index.
+        """
+        if isinstance(item, str):
+            item = self.parse_index(item)
+        try:
+            x, y = item
+            x, y = operator.index(x), operator.index(y)
+        except (TypeError, ValueError):
+            return None
+        if x < 0:
+            x += 8
+        if y < 0:
+            y += 8
+        if not (0 <= x < 8 and 0 <= y < 8):
+            raise IndexError('index {} is out of bounds'.format(item))
+        return 8 * x + y
+
     def any(self, *args, **kwargs):
-        return self._board.any(*args, **kwargs)
+        if args or any(v is not None for v in kwargs.values()):
+            return self.to_array().any(*args, **kwargs)
+        return bool(self._bits[1] | self._bits[-1])
 
     def sum(self, *args, **kwargs):
-        return self._board.sum(*args, **kwargs)
+        if args or any(v is not None for v in kwargs.values()):
+            return self.to_array().sum(*args, **kwargs)
+        return self._count[1] - self._count[-1]
 
     def __getitem__(self, item):
-        if isinstance(item, str):
-            return self._board[self.parse_index(item)]
-        else:
-            return self._board[item]
+        sq = self._square(item)
+        if sq is None:
+            return self.to_array()[item]
+        bit = 1 << sq
+        if self._bits[1] & bit:
+            return 1
+        if self._bits[-1] & bit:
+            return -1
+        return 0
 
     def __setitem__(self, key, value):
-        if isinstance(key, str):
-            self._board[self.parse_index(key)] = value
-        else:
-            self._board[key] = value
+        sq = self._square(key)
+        if sq is None:
+            array = self.to_array()
+            array[key] = value
+            self._load(array)
+            return
+        if value not in (-1, 0, 1):
+            raise ValueError('invalid tile value {}'.format(value))
+        old = self[key]
+        if old:
+            self._bits[old] &= ~(1 << sq)
+            self._hash ^= transposition.tile_key(old, sq)
+            self._count[old] -= 1
+        if value:
+            self._bits[int(value)] |= 1 << sq
+            self._hash ^= transposition.tile_key(int(value), sq)
+            self._count[int(value)] += 1
+        if self._patterns is not None:
+            self._patterns.reset(self._bits[1], self._bits[-1])
 
     def __mul__(self, other):
-        return np.multiply(self._board, other)
+        return np.multiply(self.to_array(), other)
 
     def __rmul__(self, other):
-        return np.multiply(other, self._board)
+        return np.multiply(other, self.to_array())
 
 
 class Game:
@@ -110,12 +279,18 @@ class Game:
     Handles the actual game play, defining allowable moves, starting positions.
     """
 
+    __slots__ = ('players', 'board', 'visualise', 'current_player',
+                 'other_player', '_undo_stack')
+
     def __init__(self, board, players, visualise=False):
         self.players = players
         self.board = board
         self.visualise = visualise
         self.current_player = players[0]
         self.other_player = players[1]
+        # moves made with make_move, as
+        # (player, move bit, flipped tiles, board hash before the move)
+        self._undo_stack = list()
 
         # set the starting positions of the players
         self.board['4d'] = int(players[1])
@@ -123,62 +298,93 @@ class Game:
         self.board['5d'] = int(players[0])
         self.board['5e'] = int(players[1])
 
+    @classmethod
+    def from_position(cls, position, players=None, visualise=False):
+        """
+        Set up a game in the position given by Game.position, by default with
+        plain Player('black') and Player('white') players.
+        """
+        black, white, to_move = position
+        if players is None:
+            players = [Player('black'), Player('white')]
+        game = cls(Board(), players, visualise)
+        game.board.set_bits(white, black)
+        if int(game.current_player) != to_move:
+            game.swap_players()
+        return game
+
+    def position(self):
+        """
+        A compact description of the position, which is cheap to pickle:
+        (black tiles, white tiles, numeric colour of the player to move).
+        """
+        return (self.board._bits[-1], self.board._bits[1],
+                int(self.current_player))
+
+    @classmethod
+    def from_string(cls, string, players=None, visualise=False):
+        """
+        Set up a game from a position string as given by Game.to_string: 64
+        characters for the squares a1, b1, ..., h8, where 'X' (or '*') is a
+        black tile, 'O' a white tile and '-' (or '.') an empty one, optionally
+        followed by whitespace and 'X' or 'O' for the player to move (black
+        by default).
+        """
+        parts = string.split()
+        if not parts or len(parts[0]) != 64 or len(parts) > 2:
+            raise ValueError('invalid position {!r}'.format(string))
+        black = white = 0
+        for sq, c in enumerate(parts[0].upper()):
+            if c in 'X*':
+                black |= 1 << sq
+            elif c == 'O':
+                white |= 1 << sq
+            elif c not in '-.':
+                raise ValueError('invalid square {!r} in position'.format(c))
+        to_move = parts[1].upper() if len(parts) > 1 else 'X'
+        if to_move not in ('X', '*', 'O'):
+            raise ValueError('invalid player to move {!r}'.format(to_move))
+        return cls.from_position(
+            (black, white, Player.white if to_move == 'O' else Player.black),
+            players, visualise)
+
+    def to_string(self):
+        """
+        The position as a string, see Game.from_string.
+        """
+        black = self.board._bits[-1]
+        white = self.board._bits[1]
+        squares = ''.join('X' if black >> sq & 1 else
+                          'O' if white >> sq & 1 else '-'
+                          for sq in range(64))
+        return squares + (' O' if int(self.current_player) == Player.white
+                          else ' X')
+
     def swap_players(self):
         self.other_player, self.current_player = \
             self.current_player, self.other_player
 
+    def get_flip_mask(self, place):
+        """
+        For a suggested move, given by 'place', return a bitboard of the tiles
+        to be flipped, which is 0 if the move is not legal.
+        """
+        if not self.board.on_board(place):
+            return 0
+        bits = self.board._bits
+        return bitboard.flips(bits[int(self.current_player)],
+                              bits[int(self.other_player)],
+                              bitboard.square(place))
+
     def get_valid_flips(self, place):
         """
         For a suggested move, given by 'place', return the tiles to be flipped,
         if any, otherwise return None.
         """
-        if place is None:
-            return None
-
-        # check that the tile is not taken
-        if self.board[place] != 0:
-            return None
-
-        # check that the position is within the board
-        if not self.board.on_board(place):
+        mask = self.get_flip_mask(place)
+        if not mask:
             return None
-
-        tiles_to_flip = list()
-        # go through possible directions, i.e. [0,1] is tile above,
-        for xdir, ydir in ([0, 1], [1, 1], [1, 0], [1, -1], [0, -1],
-                           [-1, -1], [-1, 0], [-1, 1]):
-            x, y = place  # x-y position
-            x += xdir
-            y += ydir
-
-            # check next direction if current one is not within board
-            if not self.board.on_board((x, y)):
-                continue
-
-            # go as far as possible in current direction
-            # while tiles are of opposing colour
-            while self.board[x, y] == int(self.other_player):
-                x += xdir
-                y += ydir
-                if not self.board.on_board((x, y)):
-                    break
-
-            # again, test another direction if not on board
-            # (opposing player's tiles are stretched all the way to an edge)
-            if not self.board.on_board((x, y)):
-                continue
-
-            # if current stretch is "anchored" by this player's tile, we're ok
-            if self.board[x, y] == int(self.current_player):
-                # build a list of all the tiles to flip
-                while True:
-                    x -= xdir
-                    y -= ydir
-                    if (x, y) == place:
-                        break
-                    tiles_to_flip.append((x, y))
-
-        return tiles_to_flip if tiles_to_flip else None
+        return [bitboard.place(sq) for sq in bitboard.squares(mask)]
 
     def get_tiles_to_flip(self, place):
         return self.get_valid_flips(place)
@@ -187,20 +393,50 @@ class Game:
         """
         Flip all tiles in 'tiles' to the colour of 'player'.
         """
+        mask = 0
         for tile in tiles:
-            self.board[tile] = int(self.current_player)
+            mask |= 1 << bitboard.square(tile)
+        self._flip_mask(mask)
+
+    def _flip_mask(self, mask):
+        """
+        Flip all tiles in the bitboard 'mask' to the colour of the current
+        player.
+        """
+        board = self.board
+        bits = board._bits
+        own = int(self.current_player)
+        flipped = mask & bits[-own]
+        placed = mask & ~(bits[own] | bits[-own])
+        bits[own] |= mask
+        bits[-own] &= ~mask
+        board._hash ^= transposition.flip_key(flipped)
+        for sq in bitboard.squares(placed):
+            board._hash ^= transposition.tile_key(own, sq)
+        n = popcount(flipped)
+        board._count[own] += n + popcount(placed)
+        board._count[-own] -= n
+        if board._patterns is not None:
+            board._patterns.reset(bits[1], bits[-1])
+
+    def legal_moves_mask(self):
+        """
+        Return a bitboard of all legal moves on the board for 'player'.
+        """
+        board = self.board
+        if board._move_cache is not None:
+            black, white = board._move_cache.moves(board)
+            return white if int(self.current_player) == Player.white else black
+        bits = board._bits
+        return bitboard.legal_moves(bits[int(self.current_player)],
+                                    bits[int(self.other_player)])
 
     def legal_moves(self):
         """
         Return a list of all possible legal moves on the board for 'player'.
         """
-        legal_moves = list()
-        for x in range(8):
-            for y in range(8):
-                flips = self.get_valid_flips((x, y))
-                if flips:
-                    legal_moves.append((x, y))
-        return legal_moves
+        return [bitboard.place(sq)
+                for sq in bitboard.squares(self.legal_moves_mask())]
 
     def clear(self):
         """
@@ -218,17 +454,85 @@ class Game:
 
     def move(self, place, flips=None):
         if not flips:
-            self.flip_tiles(self.get_valid_flips(place))
+            self._flip_mask(self.get_flip_mask(place))
         else:
             self.flip_tiles(flips)
         self.board[place] = int(self.current_player)
 
+    @property
+    def hash(self):
+        """
+        Zobrist hash of the position, including the player to move.
+        """
+        if int(self.current_player) == Player.white:
+            return self.board._hash ^ transposition.SIDE_KEY
+        return self.board._hash
+
+    def make_move(self, place):
+        """
+        Make the move 'place' for the current player in place, and hand the
+        turn to the other player. A 'place' of None passes the turn. The move
+        is recorded so that it can be taken back with undo_move.
+        """
+        board = self.board
+        bits = board._bits
+        player = self.current_player
+        own = int(player)
+        old_hash = board._hash
+        if place is None:
+            sq = None
+            bit = flips = 0
+        else:
+            sq = bitboard.square(place)
+            bit = 1 << sq
+            flips = bitboard.flips(bits[own], bits[-own], sq)
+            if not flips:
+                raise ValueError('illegal move {}'.format(place))
+            bits[own] |= flips | bit
+            bits[-own] ^= flips
+            board._hash ^= (transposition.flip_key(flips) ^
+                            transposition.tile_key(own, sq))
+            n = popcount(flips)
+            board._count[own] += n + 1
+            board._count[-own] -= n
+        if board._patterns is not None:
+            board._patterns.move(own, sq, flips)
+        self._undo_stack.append((player, bit, flips, old_hash))
+        self.swap_players()
+
+    def undo_move(self):
+        """
+        Take back the last move made with make_move.
+        """
+        player, bit, flips, old_hash = self._undo_stack.pop()
+        own = int(player)
+        board = self.board
+        bits = board._bits
+        bits[own] ^= flips | bit
+        bits[-own] |= flips
+        board._hash = old_hash
+        if bit:
+            n = popcount(flips)
+            board._count[own] -= n + 1
+            board._count[-own] += n
+        if board._patterns is not None:
+            board._patterns.undo()
+        self.current_player = player
+        self.other_player = (self.players[1] if player is self.players[0]
+                             else self.players[0])
+
     def is_terminal(self):
         """
-        Just a very basic test at the moment checks if there are any zeros.
-        :return:
+        The game is over when neither player has a legal move.
         """
-        return not self.board.any()
+        board = self.board
+        if board._move_cache is not None:
+            black, white = board._move_cache.moves(board)
+            return not (black or white)
+        black = board._bits[-1]
+        white = board._bits[1]
+        return not (bitboard.legal_moves(black, white) or
+                    bitboard.legal_moves(white, black))
 
     def play(self):
         """
@@ -254,9 +558,17 @@ class Game:
             else:
                 if position is not None and isinstance(self.other_player,
                                                        AI):
-                    print("Player {} moved on {}".format(
-                        self.other_player,
-                        self.board.parse_numeric_index(position)))
+                    move = self.board.parse_numeric_index(position)
+                    log.info('Player %s moved on %s', self.other_player, move,
+                             extra={'data': {
+                                 'event': 'move',
+                                 'player': str(self.other_player),
+                                 'move': move,
+                                 'black_tiles': self.nbr_of_tiles(
+                                     self.players[0]),
+                                 'white_tiles': self.nbr_of_tiles(
+                                     self.players[1]),
+                             }})
 
             # Check that moves are actually available for current player
             if self.legal_moves() == []:
@@ -271,12 +583,21 @@ class Game:
                     # other player's turn instead, we just pass because we've
                     # already swapped
 
+            # the AI searches the replies while the human is thinking
+            pondering = (isinstance(self.current_player, Human) and
+                         isinstance(self.other_player, AI) and
+                         self.other_player.ponder)
+            if pondering:
+                self.other_player.start_pondering(self)
+
             # loop until we get some valid input
             while True:
                 position = self.current_player.get_move(self)
 
                 if isinstance(self.current_player, Human):
                     if position.upper() == 'Q' or position.upper() == 'QUIT':
+                        if pondering:
+                            self.other_player.stop_pondering()
                         return
                     elif position.upper() == 'H' or position.upper() == 'HELP':
                         self.print_help()
@@ -286,6 +607,8 @@ class Game:
 
                 tiles = self.get_valid_flips(position)
                 if tiles:
+                    if pondering:
+                        self.other_player.stop_pondering()
                     self.move(position, tiles)
                     break
                 else:
@@ -313,11 +636,13 @@ class Game:
         """
         Get the number of tiles on the board belonging to 'player'.
         """
-        nbr = 0
-        for x in np.nditer(self.board._board):
-            if x == int(player):
-                nbr += 1
-        return nbr
+        return self.board._count[int(player)]
+
+    def nbr_of_empty_tiles(self):
+        """
+        Get the number of unoccupied tiles on the board.
+        """
+        return 64 - self.board._count[1] - self.board._count[-1]
 
     def __mul__(self, other):
         return self.board * other
@@ -337,10 +662,58 @@ def main():
         type=int,
         help='time limit in seconds for each ply, default is 10s',
         default=10)
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        help='number of processes searching in parallel, default is 1',
+        default=1)
+    parser.add_argument(
+        '--stats',
+        help='log statistics of each search of the AI',
+        action='store_true')
+    parser.add_argument(
+        '--log-json',
+        help='log the moves and statistics as JSON lines',
+        action='store_true')
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        help='write a cProfile profile of the searches of the AI to FILE')
+    parser.add_argument(
+        '--book',
+        metavar='FILE',
+        help='opening book of the AI, see othello-book')
+    parser.add_argument(
+        '--weights',
+        metavar='FILE',
+        help='pattern weights of the AI evaluation, see othello-train')
+    parser.add_argument(
+        '--cache',
+        metavar='FILE',
+        help='persistent cache of the results of the AI searches')
+    parser.add_argument(
+        '--ponder',
+        help='let the AI search while waiting for your moves',
+        action='store_true')
     args = parser.parse_args()
     board = Board()
 
-    players = [Human('black'), MiniMaxAI('white', time_limit=args.time)]
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter() if args.log_json else
+                         logging.Formatter('%(message)s'))
+    logging.basicConfig(handlers=[handler])
+    log.setLevel(logging.INFO)
+    if args.stats:
+        logging.getLogger('othello').setLevel(logging.INFO)
+
+    players = [Human('black'), MiniMaxAI('white', time_limit=args.time,
+                                         workers=args.workers,
+                                         stats=args.stats,
+                                         profile=args.profile,
+                                         book=args.book,
+                                         evaluator=args.weights,
+                                         ponder=args.ponder,
+                                         cache=args.cache)]
 
     game = Game(board, players, args.visualise)
     game.play()
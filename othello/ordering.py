@@ -0,0 +1,108 @@
+"""
+Move ordering for alpha-beta search. The earlier the best move of a node is
+searched, the more of its siblings are cut off.
+"""
+
+# static priority of each square: corners first, then edges, with the
+# X-squares (diagonally next to a corner) and C-squares (next to a corner
+# on the edge) last, since they tend to give away the corner
+SQUARE_PRIORITY = {
+    (x, y): p
+    for x, row in enumerate((
+        (8, -4, 4, 3, 3, 4, -4, 8),
+        (-4, -8, -1, -1, -1, -1, -8, -4),
+        (4, -1, 2, 1, 1, 2, -1, 4),
+        (3, -1, 1, 0, 0, 1, -1, 3),
+        (3, -1, 1, 0, 0, 1, -1, 3),
+        (4, -1, 2, 1, 1, 2, -1, 4),
+        (-4, -8, -1, -1, -1, -1, -8, -4),
+        (8, -4, 4, 3, 3, 4, -4, 8),
+    ))
+    for y, p in enumerate(row)
+}
+
+
+class MoveOrderer:
+    """
+    Orders the moves of a node: the best move from the transposition table
+    first, then the killer moves of the ply (moves that recently caused a
+    cutoff in a sibling node), then by the history heuristic (how often and
+    how deep a move has caused cutoffs) and finally by static square
+    priority.
+    """
+
+    def __init__(self, killers=2, history=True, static=True):
+        self.nbr_of_killers = killers
+        self.use_history = history
+        self.use_static = static
+        self._killers = list()
+        self._history = {1: dict(), -1: dict()}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    @property
+    def first_move_cutoff_rate(self):
+        """
+        The fraction of cutoffs that were caused by the first move searched.
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def new_search(self):
+        """
+        Forget the killer moves and age the history table, which are then
+        relearnt in the new search.
+        """
+        self._killers = list()
+        for table in self._history.values():
+            for move in table:
+                table[move] //= 2
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def killers(self, ply):
+        while len(self._killers) <= ply:
+            self._killers.append(list())
+        return self._killers[ply]
+
+    def order(self, moves, ply, player, hash_move=False):
+        """
+        Sort the moves of 'player' at 'ply' in place, best first.
+        """
+        if len(moves) <= 1:
+            return moves
+        killers = self.killers(ply)
+        history = self._history[player] if self.use_history else dict()
+        static = SQUARE_PRIORITY if self.use_static else dict()
+        nbr_of_killers = len(killers)
+
+        def key(move):
+            if move == hash_move:
+                rank = nbr_of_killers + 1
+            elif move in killers:
+                rank = nbr_of_killers - killers.index(move)
+            else:
+                rank = 0
+            return rank, history.get(move, 0), static.get(move, 0)
+
+        moves.sort(key=key, reverse=True)
+        return moves
+
+    def cutoff(self, move, ply, depth, player, index):
+        """
+        Record that 'move', the 'index':th move searched, caused a cutoff
+        with 'depth' plies left.
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if move is None:
+            return
+        if self.nbr_of_killers:
+            killers = self.killers(ply)
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[self.nbr_of_killers:]
+        if self.use_history:
+            history = self._history[player]
+            history[move] = history.get(move, 0) + depth * depth
@@ -0,0 +1,136 @@
+"""
+Parallel search by root splitting: the moves at the root are scored by a pool
+of worker processes, each running its own copy of the AI.
+"""
+from concurrent.futures import ProcessPoolExecutor, wait
+import copy
+import time
+
+import numpy as np
+
+from othello.game import Game
+from othello.players import SearchTimeout
+
+# the AI of a worker process, set up by _init_worker
+_worker_ai = None
+
+
+def _init_worker(ai):
+    global _worker_ai
+    _worker_ai = ai
+
+
+def _score_move(position, move, depth, time_left, alpha=-np.inf):
+    """
+    Score 'move' in 'position' (see Game.position) with the worker's AI,
+    given that another move scores 'alpha'. Return the score, or None if
+    the time ran out, whether the search was cut off by the depth limit and
+    the number of expanded states.
+    """
+    ai = _worker_ai
+    game = Game.from_position(position)
+    ai.deadline = (None if time_left is None else
+                   time.perf_counter() + time_left)
+    ai._expanded_states = 0
+    try:
+        score = ai.score_move(game, move, depth, alpha)
+    except SearchTimeout:
+        score = None
+    return score, ai._depth_cuts > 0, ai._expanded_states
+
+
+class RootSplitter:
+    """
+    Runs the iterative deepening of 'ai' with the root moves of each
+    iteration spread over 'workers' processes. Only the compact position and
+    the move are sent to the workers for each task.
+    """
+
+    def __init__(self, ai, workers):
+        worker_ai = copy.copy(ai)
+        worker_ai.workers = 1
+        worker_ai._root_splitter = None
+        # statistics and profiles are only collected in this process
+        worker_ai.stats = None
+        worker_ai.profiler = None
+        worker_ai.book = None
+        worker_ai.cache = None
+        worker_ai.ponder = False
+        self.ai = ai
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(max_workers=workers,
+                                         initializer=_init_worker,
+                                         initargs=(worker_ai,))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def time_left(self):
+        """
+        The seconds left of the AI's search, None without a time limit.
+        """
+        if self.ai.deadline is None:
+            return None
+        return self.ai.deadline - time.perf_counter()
+
+    def score_moves(self, position, moves, depth, alpha=-np.inf):
+        """
+        The results of _score_move for each of 'moves', or None if the time
+        ran out.
+        """
+        time_left = self.time_left()
+        if time_left is not None and time_left <= 0:
+            return None
+        futures = [self._pool.submit(_score_move, position, a, depth,
+                                     time_left, alpha) for a in moves]
+        done, not_done = wait(futures, timeout=time_left)
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            return None
+        results = [future.result() for future in futures]
+        self.ai._expanded_states += sum(r[2] for r in results)
+        if any(r[0] is None for r in results):
+            return None
+        return results
+
+    def search(self, state):
+        """
+        Iterative deepening, searching the best move of the previous
+        iteration first and the other moves in parallel with its score as
+        alpha, which proves most of them worse without finding their
+        exact scores.
+        """
+        ai = self.ai
+        position = state.position()
+        moves = state.legal_moves()
+        if not moves:
+            return None
+        best_move = moves[0]
+        nodes = ai._expanded_states
+        for depth in range(ai.depth + 1):
+            results = self.score_moves(position, moves[:1], depth)
+            if results is None:
+                break
+            if len(moves) > 1:
+                others = self.score_moves(position, moves[1:], depth,
+                                          results[0][0])
+                if others is None:
+                    break
+                results += others
+            scores = [r[0] for r in results]
+            # search the best moves of this iteration first in the next one;
+            # the stable sort keeps the first move ahead of those only
+            # proved to be no better
+            order = np.argsort(-np.asarray(scores), kind='stable')
+            moves = [moves[i] for i in order]
+            best_move = moves[0]
+            ai.score = scores[order[0]]
+            ai.pv = (best_move,)
+            ai.depth_reached = depth
+            ai.iterations.append(
+                (depth, time.perf_counter() - ai.search_start_time,
+                 ai._expanded_states - nodes))
+            if not any(r[1] for r in results):
+                break   # the whole game tree was searched
+        return best_move
@@ -0,0 +1,282 @@
+"""
+Pattern evaluation in the style of Logistello and Edax.
+
+The board is covered by pattern instances, lines and blocks of squares such
+as an edge with its two X-squares or a 3 x 3 corner. The contents of an
+instance, each square being empty (0), the player's (1) or the opponent's
+(2), are read as a base 3 number which indexes a table of weights shared by
+all instances of the pattern, and the evaluation is the sum of the weights
+of all instances. There is one set of tables per game phase, the phase
+being given by the number of tiles on the board.
+
+The indices of a game's board are kept up to date on each move by
+PatternIndices (see Board.set_patterns), with 1 for black and 2 for white
+tiles, so that a node is evaluated with one lookup per instance.
+"""
+import numpy as np
+
+from othello import bitboard, symmetry
+from othello.evaluation import square_weights, to_boards
+
+MAGIC = b'OTHPAT\x00\x01'
+
+# the squares of one instance of each pattern as (x, y) indices, the other
+# instances are its images under the board symmetries
+PATTERNS = (
+    ('edge', tuple((0, y) for y in range(8)) + ((1, 1), (1, 6))),
+    ('corner3x3', tuple((x, y) for x in range(3) for y in range(3))),
+    ('corner2x5', tuple((x, y) for x in range(2) for y in range(5))),
+    ('diagonal8', tuple((i, i) for i in range(8))),
+    ('diagonal7', tuple((i, i + 1) for i in range(7))),
+    ('diagonal6', tuple((i, i + 2) for i in range(6))),
+    ('diagonal5', tuple((i, i + 3) for i in range(5))),
+    ('diagonal4', tuple((i, i + 4) for i in range(4))),
+)
+
+
+def _instances(squares):
+    """
+    The distinct images of the pattern 'squares' under the eight symmetries,
+    as tuples of square numbers in the same order.
+    """
+    instances = list()
+    seen = set()
+    for sym in range(8):
+        instance = tuple(symmetry.transform_square(bitboard.square(p), sym)
+                         for p in squares)
+        if frozenset(instance) not in seen:
+            seen.add(frozenset(instance))
+            instances.append(instance)
+    return instances
+
+
+def _tables():
+    """
+    The squares, table offset and table size of every instance, with the
+    instances of each pattern grouped together.
+    """
+    instances = list()
+    groups = list()
+    offset = 0
+    for name, squares in PATTERNS:
+        size = 3 ** len(squares)
+        group = _instances(squares)
+        groups.append((name, len(instances), len(group), offset, size))
+        instances.extend((instance, offset) for instance in group)
+        offset += size
+    return instances, groups, offset
+
+
+INSTANCES, GROUPS, TABLE_SIZE = _tables()
+OFFSETS = np.array([offset for _, offset in INSTANCES], dtype=np.int64)
+
+# SQUARE_POWERS[sq, i] is the place value of square 'sq' in the index of
+# instance i, 0 if the instance does not cover the square
+SQUARE_POWERS = np.zeros((64, len(INSTANCES)), dtype=np.int64)
+for _i, (_instance, _) in enumerate(INSTANCES):
+    for _k, _sq in enumerate(_instance):
+        SQUARE_POWERS[_sq, _i] = 3 ** _k
+
+
+def _swapped():
+    """
+    For each table entry, the entry with the player's and the opponent's
+    tiles exchanged.
+    """
+    swapped = np.empty(TABLE_SIZE, dtype=np.int64)
+    for _, _, _, offset, size in GROUPS:
+        index = np.arange(size)
+        result = np.zeros(size, dtype=np.int64)
+        power = 1
+        while power < size:
+            digit = index // power % 3
+            result += np.where(digit == 0, 0, 3 - digit) * power
+            power *= 3
+        swapped[offset:offset + size] = offset + result
+    return swapped
+
+
+SWAPPED = _swapped()
+
+
+def phase(tiles, phases):
+    """
+    The game phase, from 0 to 'phases' - 1, of a position with 'tiles'
+    tiles on the board.
+    """
+    return np.minimum((np.asarray(tiles) - 4) * phases // 61, phases - 1)
+
+
+class PatternIndices:
+    """
+    The pattern indices of a board, with 1 for black and 2 for white tiles,
+    updated incrementally as moves are made and taken back.
+    """
+
+    __slots__ = ('indices', '_stack')
+
+    def __init__(self, white=0, black=0):
+        self.indices = None
+        self._stack = list()
+        self.reset(white, black)
+
+    def reset(self, white, black):
+        """
+        Compute the indices of the board from scratch.
+        """
+        digits = np.zeros(64, dtype=np.int64)
+        digits[list(bitboard.squares(black))] = 1
+        digits[list(bitboard.squares(white))] = 2
+        self.indices = digits @ SQUARE_POWERS
+
+    def move(self, own, sq, flips):
+        """
+        Update the indices for a tile of numeric colour 'own' placed on 'sq'
+        flipping the tiles in the bitboard 'flips', or a pass if 'sq' is
+        None.
+        """
+        self._stack.append(self.indices)
+        if sq is None:
+            return
+        # black tiles count 1 and white 2, so a flip to black subtracts one
+        # place value and a flip to white adds one
+        placed = 1 if own == -1 else 2
+        indices = self.indices + placed * SQUARE_POWERS[sq]
+        if flips:
+            change = SQUARE_POWERS[list(bitboard.squares(flips))].sum(axis=0)
+            indices += change if own == 1 else -change
+        self.indices = indices
+
+    def undo(self):
+        """
+        Take back the last update made by PatternIndices.move.
+        """
+        self.indices = self._stack.pop()
+
+
+class PatternEvaluator:
+    """
+    Evaluates positions with pattern weights of shape (phases, TABLE_SIZE),
+    where 1 in an index is a tile of the player the position is evaluated
+    for. Use PatternEvaluator.load for weights saved to a file, or
+    PatternEvaluator.from_square_weights for a starting point before any
+    training.
+    """
+
+    def __init__(self, weights):
+        self.set_weights(weights)
+
+    def set_weights(self, weights):
+        """
+        Replace the weights, an array of shape (phases, TABLE_SIZE).
+        """
+        weights = np.asarray(weights, dtype=np.float32)
+        if weights.ndim != 2 or weights.shape[1] != TABLE_SIZE:
+            raise ValueError('weights must have shape (phases, {})'.format(
+                TABLE_SIZE))
+        self.weights = weights
+        self.phases = len(weights)
+        # the weights seen from black's and white's side, to be indexed by
+        # the indices of PatternIndices
+        self._tables = {-1: weights, 1: weights[:, SWAPPED]}
+
+    @classmethod
+    def from_square_weights(cls, edge_weight=3, corner_weight=10, phases=4):
+        """
+        Weights that give the weighted-square score of
+        othello.evaluation.square_weights in every phase.
+        """
+        square = square_weights(edge_weight, corner_weight).reshape(64)
+        return cls.from_squares(np.tile(square, (phases, 1)))
+
+    @classmethod
+    def from_squares(cls, values):
+        """
+        Weights that give the sum of the values of the player's squares
+        minus those of the opponent's, for 'values' of shape (phases, 64).
+        Each square's value is split evenly between the instances covering
+        it, so the values must be the same for symmetric squares.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, 64)
+        coverage = (SQUARE_POWERS > 0).sum(axis=1)
+        weights = np.zeros((len(values), TABLE_SIZE))
+        for name, first, _, offset, size in GROUPS:
+            instance = INSTANCES[first][0]
+            index = np.arange(size)
+            for k, sq in enumerate(instance):
+                digit = index // 3 ** k % 3
+                sign = np.where(digit == 1, 1, np.where(digit == 2, -1, 0))
+                weights[:, offset:offset + size] += np.outer(
+                    values[:, sq] / coverage[sq], sign)
+        return cls(weights)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read weights saved with PatternEvaluator.save.
+        """
+        with open(path, 'rb') as f:
+            header = f.read(16)
+            if len(header) != 16 or header[:8] != MAGIC:
+                raise ValueError('{} is not a pattern weight file'.format(
+                    path))
+            phases, size = np.frombuffer(header, '<u4', 2, 8)
+            if size != TABLE_SIZE:
+                raise ValueError('{} has tables of {} weights, expected '
+                                 '{}'.format(path, size, TABLE_SIZE))
+            weights = np.fromfile(f, '<f4', int(phases) * TABLE_SIZE)
+        if len(weights) != phases * TABLE_SIZE:
+            raise ValueError('{} is truncated'.format(path))
+        return cls(weights.reshape(phases, TABLE_SIZE))
+
+    def save(self, path):
+        """
+        Write the weights as a 16 byte header, the magic number, the number
+        of phases and the table size as little-endian uint32, followed by
+        the weights as little-endian float32.
+        """
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(np.array([self.phases, TABLE_SIZE], '<u4').tobytes())
+            f.write(self.weights.astype('<f4').tobytes())
+
+    def attach(self, game):
+        """
+        Keep the pattern indices of the board of 'game' up to date, so that
+        it can be evaluated incrementally.
+        """
+        if game.board.patterns is None:
+            game.board.set_patterns(PatternIndices())
+
+    def features(self, own, opp):
+        """
+        The table entries (offset into a phase's weights) of every instance
+        and the phase of the positions given by the arrays of bitboards
+        'own' and 'opp', shapes (N, instances) and (N,).
+        """
+        boards = to_boards(own, opp).reshape(-1, 64).astype(np.int64)
+        digits = np.where(boards == -1, 2, boards)
+        indices = digits @ SQUARE_POWERS + OFFSETS
+        tiles = (boards != 0).sum(axis=1)
+        return indices, phase(tiles, self.phases)
+
+    def evaluate(self, own, opp):
+        """
+        Score the positions given by the arrays of bitboards 'own' and 'opp'.
+        """
+        indices, phases = self.features(
+            np.asarray(own, dtype=np.uint64).reshape(-1),
+            np.asarray(opp, dtype=np.uint64).reshape(-1))
+        return self.weights[phases[:, None], indices].sum(
+            axis=1, dtype=np.float64)
+
+    def score(self, board, player):
+        """
+        The value of 'board' for 'player', from the incrementally updated
+        indices if the board keeps them.
+        """
+        if board.patterns is None:
+            return self.evaluate(board.bits(player), board.bits(-player))[0]
+        tables = self._tables[player]
+        table = tables[int(phase(board.nbr_of_tiles(), self.phases))]
+        return float(table[board.patterns.indices + OFFSETS].sum())
@@ -1,8 +1,31 @@
 import numpy as np
 from copy import deepcopy
 
+import cProfile
+import logging
+import sqlite3
+import threading
 import time
 
+from othello import bitboard, evaluation
+from othello.endgame import EndgameSolver
+from othello.evaluation import Evaluator
+from othello.ordering import MoveOrderer
+from othello.stats import SearchStats
+from othello.transposition import TranspositionTable
+
+log = logging.getLogger(__name__)
+
+# the factor of the disc difference of finished games when searching with
+# an evaluator, so that results outrank any heuristic score
+RESULT_SCALE = 10000
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when the time limit for the ply has run out.
+    """
+
 
 class Player:
     """
@@ -11,8 +34,18 @@ class Player:
     white = 1
     black = -1
 
+    __slots__ = ('color', '_value')
+
     def __init__(self, color):
         self.color = color
+        # the numeric representation is looked up once, it is used for
+        # every node of a search
+        if color == 'white':
+            self._value = Player.white
+        elif color == 'black':
+            self._value = Player.black
+        else:
+            raise ValueError('invalid color {}'.format(color))
 
     def __str__(self):
         """
@@ -24,12 +57,7 @@ class Player:
         """
         Get the numeric representation of the player, as used on the board.
         """
-        if self.color == 'white':
-            return Player.white
-        elif self.color == 'black':
-            return Player.black
-        else:
-            raise ValueError
+        return self._value
 
     def get_move(self, state):
         # implement in subclasses
@@ -41,6 +69,8 @@ class Human(Player):
     This player asks for input from the terminal.
     """
 
+    __slots__ = ()
+
     def get_move(self, state):
         """
         Ask human for desired move.
@@ -70,57 +100,523 @@ class AI(Player):
     """
 
     def __init__(self, color, time_limit=None, edge_weight=3,
-                 corner_weight=10, depth=10):
+                 corner_weight=10, depth=10, move_ordering=None,
+                 workers=1, endgame_empties=0, evaluator=None, stats=None,
+                 profile=None, book=None, ponder=False,
+                 cache=None):
         super().__init__(color)
+        for name, value in (('depth', depth), ('workers', workers),
+                            ('endgame_empties', endgame_empties)):
+            if not isinstance(value, int) or value < 0:
+                raise ValueError('{} must be a non-negative integer, not '
+                                 '{!r}'.format(name, value))
+        if time_limit is not None and (
+                not isinstance(time_limit, (int, float)) or time_limit <= 0):
+            raise ValueError('time_limit must be a positive number, not '
+                             '{!r}'.format(time_limit))
+
+        # True gives the default MoveOrderer, None or False no ordering
+        if move_ordering is True:
+            move_ordering = MoveOrderer()
+        self.move_ordering = move_ordering or None
+
+        # with more than one worker, the root moves are searched in parallel
+        # processes, see othello.parallel
+        self.workers = workers
+        self._root_splitter = None
+
+        # positions with at most this many empty tiles are solved exactly
+        self.endgame_empties = endgame_empties
+
+        # positions in the opening book, an OpeningBook or the path of one,
+        # are answered without searching
+        if isinstance(book, str):
+            from othello.book import OpeningBook
+            book = OpeningBook(book)
+        self.book = book
+
+        # results of earlier searches, a PositionCache or the path of one,
+        # are reused if they are deep enough, see othello.cache
+        if isinstance(cache, str):
+            from othello.cache import PositionCache
+            cache = PositionCache(cache)
+        self.cache = cache
+
+        # with 'ponder', Game.play lets the AI search the opponent's replies
+        # while the opponent is thinking, see start_pondering
+        self.ponder = ponder
+        self._ponder_thread = None
+        self._pondered = dict()
 
         self.depth = depth
         self.player = int(self)
         self.time_limit = time_limit
         self.search_start_time = None
+        self.deadline = None
         self._expanded_states = 0
 
+        # principal variation and score of the last completed iteration
+        self.pv = ()
+        self.score = None
+        self.depth_reached = None
+        # (depth, seconds, expanded states) at the end of each completed
+        # iteration, counted from the start of the search
+        self.iterations = list()
+        self._iteration_depth = 0
+        self._pv_table = list()
+        self._follow_pv = False
+        self._depth_cuts = 0
 
-        # weight board
-        # self._weight_board = WeightBoard() + 1
-        #
-        # # set the edges on the weight board
-        # self._weight_board[:, 0] = edge_weight
-        # self._weight_board[0, :] = edge_weight
-        # self._weight_board[:, -1] = edge_weight
-        # self._weight_board[-1, :] = edge_weight
-        #
-        # # set the corners to the corner weights
-        # self._weight_board[0, 0] = corner_weight
-        # self._weight_board[-1, 0] = corner_weight
-        # self._weight_board[0, -1] = corner_weight
-        # self._weight_board[-1, -1] = corner_weight
+        # leaves are scored by the disc difference, unless an Evaluator is
+        # given (True for one with the edge and corner weights above, or the
+        # path of a file of pattern weights for a PatternEvaluator), in
+        # which case all children of a node at the search frontier are
+        # evaluated in one vectorised call
+        if evaluator is True:
+            evaluator = Evaluator(edge_weight=edge_weight,
+                                  corner_weight=corner_weight)
+        elif isinstance(evaluator, str):
+            from othello.patterns import PatternEvaluator
+            evaluator = PatternEvaluator.load(evaluator)
+        self.evaluator = evaluator or None
+
+        # telemetry of each search, True for a default SearchStats, see
+        # othello.stats
+        if stats is True:
+            stats = SearchStats()
+        self.stats = stats or None
+
+        # the searches are profiled by 'profile', a file name to write
+        # cProfile statistics to after each search, or any profiler with
+        # enable() and disable() methods
+        self.profile_path = None
+        if isinstance(profile, str):
+            self.profile_path = profile
+            profile = cProfile.Profile()
+        self.profiler = profile
 
     def search(self, state):
+        """
+        Search 'state' for the best move, collecting statistics and
+        profiling the search if enabled.
+        """
+        if self.stats is None and self.profiler is None:
+            return self.iterative_deepening(state)
+        if self.profiler is not None:
+            self.profiler.enable()
+        if self.stats is not None:
+            self.stats.start(self, state)
+        move = None
+        try:
+            move = self.iterative_deepening(state)
+        finally:
+            if self.stats is not None:
+                self.stats.finish(self, move)
+            if self.profiler is not None:
+                self.profiler.disable()
+                if self.profile_path is not None:
+                    self.profiler.dump_stats(self.profile_path)
+        return move
+
+    def iterative_deepening(self, state):
+        """
+        Iterative deepening: search the game tree to increasing depths, up to
+        self.depth, until the time limit runs out. Return the best move found
+        by the last iteration that was completed.
+        """
+        self.search_start_time = time.perf_counter()
+        self.deadline = (None if self.time_limit is None else
+                         self.search_start_time + self.time_limit)
+        self.pv = ()
+        self.score = None
+        self.depth_reached = None
+        self.iterations = list()
+        moves = state.legal_moves()
+        if not moves:
+            return None
+        best_move = moves[0]
+        if self.book is not None:
+            move = self.book.lookup(state)
+            if move is not None:
+                self.pv = (move,)
+                log.info('%s: book move %s', self, move)
+                return move
+        endgame = (self.endgame_empties and
+                   state.nbr_of_empty_tiles() <= self.endgame_empties)
+        if self.cache is not None:
+            move = self.cached_move(state, moves, endgame)
+            if move is not None:
+                return move
+        if endgame:
+            try:
+                move = self.solve_endgame(state)
+                self.cache_result(state, move, complete=True)
+                return move
+            except SearchTimeout:
+                pass    # fall back to the heuristic search
+        if self.workers > 1:
+            move = self.parallel_search(state)
+            self.cache_result(state, move)
+            return move
+        if self.evaluator is not None:
+            self.evaluator.attach(state)
+        nodes = self._expanded_states
+        first_depth = 0
+        pondered = None
+        if self._pondered:
+            pondered = self._pondered.get(state.hash)
+            self._pondered = dict()
+        if pondered is not None and pondered[1] in moves:
+            # continue from the iterations searched while pondering
+            depth, best_move, self.score, self.pv, depth_cut = pondered
+            self.depth_reached = depth
+            if not depth_cut:
+                self.cache_result(state, best_move, complete=True)
+                return best_move
+            first_depth = depth + 1
+        complete = False
+        for depth in range(first_depth, self.depth + 1):
+            self.new_iteration(depth)
+            try:
+                best_move, self.score = self.search_root(state, depth)
+            except SearchTimeout:
+                break
+            self.pv = self._pv_table[0]
+            self.depth_reached = depth
+            self.iterations.append(
+                (depth, time.perf_counter() - self.search_start_time,
+                 self._expanded_states - nodes))
+            if not self._depth_cuts:
+                complete = True
+                break   # the whole game tree was searched
+        log.info('%s: depth %s, %d expanded states, %.2fs', self,
+                 self.depth_reached, self._expanded_states,
+                 time.perf_counter() - self.search_start_time)
+        self.cache_result(state, best_move, complete)
+        return best_move
+
+    def cached_move(self, state, moves, endgame):
+        """
+        The move cached for 'state', if the cached search was at least as
+        deep as this one would be. Otherwise the cached move, if any, is
+        made the principal variation, to be searched first.
+        """
+        from othello.cache import COMPLETE
+        try:
+            entry = self.cache.lookup(state.position())
+        except sqlite3.OperationalError as e:
+            log.warning('%s: cache lookup failed: %s', self, e)
+            return None
+        if entry is None or entry[3] not in moves:
+            return None
+        depth, _, score, move = entry
+        if depth >= (COMPLETE if endgame else self.depth):
+            self.pv = (move,)
+            self.score = score
+            self.depth_reached = depth
+            log.info('%s: cached move %s, depth %s', self, move, depth)
+            return move
+        self.pv = (move,)
+        return None
+
+    def cache_result(self, state, move, complete=False):
+        """
+        Store the result of the search of 'state' in the cache, if any.
+        """
+        if self.cache is None or move is None or self.depth_reached is None:
+            return
+        from othello.cache import COMPLETE
+        try:
+            self.cache.store(state.position(),
+                             COMPLETE if complete else self.depth_reached,
+                             TranspositionTable.EXACT, self.score, move)
+        except sqlite3.OperationalError as e:
+            log.warning('%s: cache store failed: %s', self, e)
+
+    def new_iteration(self, depth, follow_pv=True):
+        """
+        Reset the search state for an iteration to 'depth', following the
+        principal variation self.pv first if 'follow_pv'.
+        """
+        self._iteration_depth = depth
+        self._pv_table = [()] * (depth + 3)
+        self._follow_pv = follow_pv
+        self._depth_cuts = 0
+
+    def start_pondering(self, state):
+        """
+        Search the positions after each reply of the opponent, who is to
+        move in 'state', in a background thread until stop_pondering is
+        called. The predicted reply, from the principal variation of the
+        last search, is searched first, and all replies are deepened one
+        iteration at a time. The next search continues from the iterations
+        completed for the actual reply, and the transposition table, if
+        any, is shared.
+        """
+        if self.workers > 1 or self._ponder_thread is not None:
+            return
+        game = type(state).from_position(state.position(), state.players)
+        self._pondered = dict()
+        self.deadline = None
+        self._ponder_thread = threading.Thread(
+            target=self._ponder, args=(game,), daemon=True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        """
+        Stop the search started by start_pondering and wait for it to end.
+        """
+        thread = self._ponder_thread
+        if thread is None:
+            return
+        # makes check_time raise SearchTimeout in the pondering thread
+        self.deadline = 0
+        thread.join()
+        self._ponder_thread = None
+
+    def _ponder(self, game):
+        replies = game.legal_moves()
+        if len(self.pv) > 1 and self.pv[1] in replies:
+            replies.remove(self.pv[1])
+            replies.insert(0, self.pv[1])
+        if self.evaluator is not None:
+            self.evaluator.attach(game)
+        self.search_start_time = time.perf_counter()
+        try:
+            for depth in range(self.depth + 1):
+                for reply in replies:
+                    game.make_move(reply)
+                    try:
+                        self._ponder_reply(game, depth)
+                    finally:
+                        game.undo_move()
+        except SearchTimeout:
+            pass
+
+    def _ponder_reply(self, game, depth):
+        """
+        Search the position 'game' after a reply to 'depth', if it is worth
+        searching.
+        """
+        key = game.hash
+        previous = self._pondered.get(key)
+        if previous is not None and not previous[4]:
+            return  # the whole game tree was searched
+        if not game.legal_moves() or (
+                self.endgame_empties and
+                game.nbr_of_empty_tiles() <= self.endgame_empties):
+            return  # no search to speed up
+        self.pv = () if previous is None else previous[3]
+        self.new_iteration(depth)
+        move, score = self.search_root(game, depth)
+        self._pondered[key] = (depth, move, score, self._pv_table[0],
+                               self._depth_cuts > 0)
+
+    def solve_endgame(self, state):
+        """
+        Solve 'state' exactly with an EndgameSolver, using at most half of
+        the time limit. The score is the final disc differential.
+        """
+        deadline = self.deadline
+        if self.time_limit is not None:
+            self.deadline = self.search_start_time + self.time_limit / 2
+        try:
+            solver = EndgameSolver(check_time=self.check_time)
+            self.score, move = solver.solve(
+                state.board.bits(state.current_player),
+                state.board.bits(state.other_player))
+        finally:
+            self.deadline = deadline
+        self._expanded_states += solver.nodes
+        self.pv = (move,)
+        self.depth_reached = state.nbr_of_empty_tiles()
+        self.iterations.append(
+            (self.depth_reached, time.perf_counter() - self.search_start_time,
+             solver.nodes))
+        log.info('%s: solved endgame, score %d, %d expanded states, %.2fs',
+                 self, self.score, solver.nodes,
+                 time.perf_counter() - self.search_start_time)
+        return move
+
+    def parallel_search(self, state):
+        if self._root_splitter is None:
+            from othello.parallel import RootSplitter
+            self._root_splitter = RootSplitter(self, self.workers)
+        best_move = self._root_splitter.search(state)
+        log.info('%s: depth %s, %d expanded states in %d processes, %.2fs',
+                 self, self.depth_reached, self._expanded_states,
+                 self.workers, time.perf_counter() - self.search_start_time)
+        return best_move
+
+    def close(self):
+        """
+        Shut down the worker processes of a parallel search, if any.
+        """
+        if self._root_splitter is not None:
+            self._root_splitter.shutdown()
+            self._root_splitter = None
+
+    def search_root(self, state, depth):
+        """
+        Search 'state' with all nodes 'depth' plies below the root's children
+        cut off. Return the best move and its score.
+        """
         raise NotImplementedError
 
+    def score_move(self, state, a, depth, alpha=-np.inf):
+        """
+        Score the root move 'a' on its own, as searched by search_root,
+        given that another move scores 'alpha': a score of at most alpha
+        only bounds that of the move.
+        """
+        self.new_iteration(depth, follow_pv=False)
+        if self.evaluator is not None:
+            self.evaluator.attach(state)
+        state.make_move(a)
+        try:
+            return self.child_value(state, depth, alpha)
+        finally:
+            state.undo_move()
+
+    def child_value(self, state, depth, alpha=-np.inf):
+        """
+        The value of a child of the root, searched to 'depth', or a bound
+        of at most 'alpha' on it.
+        """
+        raise NotImplementedError
+
+    def cut_off(self, state, depth):
+        """
+        Stop searching at terminal states and at the depth limit, and abort
+        the search when the time limit has run out.
+        """
+        self.check_time()
+        if state.is_terminal():
+            return True
+        if depth <= 0:
+            self._depth_cuts += 1
+            return True
+        return False
+
+    def check_time(self):
+        if (self.deadline is not None and
+                time.perf_counter() >= self.deadline):
+            raise SearchTimeout
+
+    def ply(self, depth):
+        """
+        The distance from the root of a node searched with 'depth' remaining.
+        """
+        return self._iteration_depth - depth + 1
+
+    def order_moves(self, moves, ply):
+        """
+        Move the principal variation of the previous iteration to the front
+        while the search is following it.
+        """
+        if self._follow_pv:
+            self._follow_pv = False
+            if ply < len(self.pv) and self.pv[ply] in moves:
+                moves.remove(self.pv[ply])
+                moves.insert(0, self.pv[ply])
+                self._follow_pv = True
+        return moves
+
+    def update_pv(self, ply, move):
+        self._pv_table[ply] = (move,) + self._pv_table[ply + 1]
+
     def get_move(self, state):
         move = self.search(state)
         return move
 
     def result(self, state, a):
+        """
+        Return a copy of 'state' with the move 'a' made. The search itself
+        makes and takes back moves in place, see Game.make_move.
+        """
         self._expanded_states += 1
 
         state_copy = deepcopy(state)
         state_copy.move(a)
         return state_copy
 
+    def actions(self, state):
+        """
+        The moves available in 'state', where a player without legal moves
+        has to pass, which is represented by the move None.
+        """
+        return state.legal_moves() or [None]
+
     def utility(self, state):
         """
-        Here we use the weight board to gauge how well a player is doing
+        Gauge how well the player is doing, by the disc difference or with
+        the evaluator. With the evaluator, finished games are scored by the
+        disc difference times RESULT_SCALE.
 
         :param state: Game, a game state
         :return: float/int, score for the current state given the player set
             at initialization
         """
-        # utility = np.sum(np.sum(self._weight_board * state))
+        if self.evaluator is not None and not state.is_terminal():
+            return self.evaluator.score(state.board, self.player)
         utility = np.sum(state.board) * int(self.player)
+        if self.evaluator is not None:
+            return RESULT_SCALE * utility
         return utility
 
+    def frontier_values(self, state):
+        """
+        Evaluate all children of 'state' in one batch (a batch per node,
+        not across the frontier), finished games by their result, see
+        utility. Return the moves, an array of the values of the resulting
+        positions and a boolean array telling which of them are finished
+        games.
+        """
+        board = state.board
+        to_move = int(state.current_player)
+        own = board.bits(to_move)
+        opp = board.bits(-to_move)
+        moves = self.actions(state)
+        movers = list()
+        others = list()
+        for a in moves:
+            if a is None:
+                movers.append(own)
+                others.append(opp)
+            else:
+                sq = bitboard.square(a)
+                f = bitboard.flips(own, opp, sq)
+                movers.append(own | f | 1 << sq)
+                others.append(opp ^ f)
+        movers = np.array(movers, dtype=np.uint64)
+        others = np.array(others, dtype=np.uint64)
+        if to_move == self.player:
+            own, opp = movers, others
+        else:
+            own, opp = others, movers
+        values = self.evaluator.evaluate(own, opp)
+        over = ((evaluation.legal_moves(own, opp) == 0) &
+                (evaluation.legal_moves(opp, own) == 0))
+        if over.any():
+            result = evaluation.popcount(own) - evaluation.popcount(opp)
+            values = np.where(over, RESULT_SCALE * result, values)
+        return moves, values, over
+
+    def frontier_value(self, state, ply, maximize):
+        """
+        The value of a node whose children are all leaves, see
+        frontier_values.
+        """
+        moves, values, over = self.frontier_values(state)
+        self._expanded_states += len(moves)
+        if not over.all():
+            # some values are heuristic
+            self._depth_cuts += 1
+        i = int(np.argmax(values) if maximize else np.argmin(values))
+        self._pv_table[ply + 1] = ()
+        self.update_pv(ply, moves[i])
+        return values[i]
+
     # def __str__(self):
     #     return ("%s for player %s: %s expanded states" %
     #             (self.__class__.__name__, self.player, self._expanded_states))
@@ -128,63 +624,460 @@ class AI(Player):
 
 class MiniMaxAI(AI):
 
-    def search(self, state):
-        self.search_start_time = time.clock()
-        moves = state.legal_moves()
-        scores = [self.min_value(self.result(state, a), self.depth)
-                  for a in moves]
-        return moves[np.argmax(scores)]
+    def child_value(self, state, depth, alpha=-np.inf):
+        return self.min_value(state, depth)
+
+    def search_root(self, state, depth):
+        best_move = None
+        v = -np.inf
+        for a in self.order_moves(state.legal_moves(), 0):
+            self._expanded_states += 1
+            state.make_move(a)
+            try:
+                value = self.min_value(state, depth)
+            finally:
+                state.undo_move()
+            if value > v:
+                v = value
+                best_move = a
+                self.update_pv(0, a)
+        return best_move, v
 
     def max_value(self, state, depth):
+        ply = self.ply(depth)
+        self._pv_table[ply] = ()
         if self.cut_off(state, depth):
             return self.utility(state)
+        if depth == 1 and self.evaluator is not None:
+            return self.frontier_value(state, ply, True)
         v = -np.inf
-        for a in state.legal_moves():
-            v = max(v, self.min_value(self.result(state, a), depth - 1))
+        for a in self.order_moves(self.actions(state), ply):
+            self._expanded_states += 1
+            state.make_move(a)
+            try:
+                value = self.min_value(state, depth - 1)
+            finally:
+                state.undo_move()
+            if value > v:
+                v = value
+                self.update_pv(ply, a)
         return v
 
     def min_value(self, state, depth):
+        ply = self.ply(depth)
+        self._pv_table[ply] = ()
         if self.cut_off(state, depth):
             return self.utility(state)
+        if depth == 1 and self.evaluator is not None:
+            return self.frontier_value(state, ply, False)
         v = np.inf
-        for a in state.legal_moves():
-            v = min(v, self.max_value(self.result(state, a), depth - 1))
+        for a in self.order_moves(self.actions(state), ply):
+            self._expanded_states += 1
+            state.make_move(a)
+            try:
+                value = self.max_value(state, depth - 1)
+            finally:
+                state.undo_move()
+            if value < v:
+                v = value
+                self.update_pv(ply, a)
         return v
 
-    def cut_off(self, state, depth):
-        return (state.is_terminal() or depth <= 0 or
-                time.clock() - self.search_start_time >= self.time_limit)
-
 
 class AlphaBetaAI(AI):
+    """
+    Alpha-beta search, using a transposition table of 'tt_size' bytes to
+    avoid searching the same position twice (set 'tt_size' to 0 to disable).
+    Moves are ordered by a MoveOrderer unless 'move_ordering' is disabled,
+    and positions with at most 'endgame_empties' empty tiles are solved
+    exactly. Nodes are pruned by Multi-ProbCut if 'probcut' is given, as a
+    ProbCut or the path of a parameter file, see othello.probcut.
+    """
+
+    def __init__(self, color, tt_size=16 * 2 ** 20, move_ordering=True,
+                 endgame_empties=12, probcut=None, **kwargs):
+        super().__init__(color, move_ordering=move_ordering,
+                         endgame_empties=endgame_empties, **kwargs)
+        self.transposition_table = (TranspositionTable(tt_size) if tt_size
+                                    else None)
+        if isinstance(probcut, str):
+            from othello.probcut import ProbCut
+            probcut = ProbCut.load(probcut)
+        self.probcut = probcut
+        # set during the shallow searches of ProbCut, which do not update
+        # the move ordering
+        self._shallow_testing = False
+
+    def child_value(self, state, depth, alpha=-np.inf):
+        return self.min_value(state, alpha, np.inf, depth)
 
     def search(self, state):
-        self.best_move = None
-        v = self.max_value(state, -np.inf, np.inf)
-        return v
+        if self.transposition_table is not None:
+            self.transposition_table.reset_stats()
+        if self.move_ordering is not None:
+            self.move_ordering.new_search()
+        move = super().search(state)
+        if self.transposition_table is not None:
+            log.info('%s: transposition table hit rate %.1f%%', self,
+                     100 * self.transposition_table.hit_rate)
+        if self.move_ordering is not None:
+            log.info('%s: %d cutoffs, %.1f%% on the first move', self,
+                     self.move_ordering.cutoffs,
+                     100 * self.move_ordering.first_move_cutoff_rate)
+        return move
 
-    def max_value(self, state, alpha, beta):
-        if state.is_terminal():
+    def probe(self, state, alpha, beta, depth):
+        """
+        Look up 'state' in the transposition table. Return the stored score
+        if it decides the value of the node within (alpha, beta), otherwise
+        None, together with the stored best move (False if there is none).
+        """
+        entry = self.transposition_table.probe(state.hash)
+        if entry is None:
+            return None, False
+        stored_depth, bound, score, move, complete = entry
+        # results of searches that reached the end of the game everywhere
+        # hold at any depth
+        if stored_depth >= depth or complete:
+            if (bound == TranspositionTable.EXACT or
+                    bound == TranspositionTable.LOWER and score >= beta or
+                    bound == TranspositionTable.UPPER and score <= alpha):
+                if not complete:
+                    # the stored result was itself cut off
+                    self._depth_cuts += 1
+                return score, move
+        return None, move
+
+    def store(self, state, alpha, beta, depth, v, move, complete=False):
+        """
+        Store the value 'v' of 'state' searched within (alpha, beta) to
+        'depth', 'complete' if no line of the search was cut off before the
+        end of the game.
+        """
+        if v <= alpha:
+            bound = TranspositionTable.UPPER
+        elif v >= beta:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        self.transposition_table.store(state.hash, depth, bound, v, move,
+                                       complete)
+
+    def ordered_actions(self, state, hash_move, ply):
+        moves = self.actions(state)
+        if self.move_ordering is not None:
+            self.move_ordering.order(moves, ply, int(state.current_player),
+                                     hash_move)
+        elif hash_move is not False and hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+        return self.order_moves(moves, ply)
+
+    def record_cutoff(self, state, move, ply, depth, index):
+        if self.move_ordering is not None and not self._shallow_testing:
+            self.move_ordering.cutoff(move, ply, depth,
+                                      int(state.current_player), index)
+
+    def search_root(self, state, depth):
+        hash_move = False
+        if self.transposition_table is not None:
+            entry = self.transposition_table.probe(state.hash)
+            if entry is not None:
+                hash_move = entry[3]
+        alpha, beta = -np.inf, np.inf
+        best_move = None
+        for a in self.ordered_actions(state, hash_move, 0):
+            self._expanded_states += 1
+            state.make_move(a)
+            try:
+                value = self.min_value(state, alpha, beta, depth)
+            finally:
+                state.undo_move()
+            if value > alpha:
+                alpha = value
+                best_move = a
+                self.update_pv(0, a)
+        if self.transposition_table is not None:
+            self.store(state, -np.inf, beta, depth + 1, alpha, best_move,
+                       not self._depth_cuts)
+        return best_move, alpha
+
+    def prob_cut(self, state, alpha, beta, depth, maximize):
+        """
+        Multi-ProbCut: return beta (alpha) if a shallow search predicts that
+        the value of 'state' searched to 'depth' is at least beta (at most
+        alpha), otherwise None. Nodes on the principal variation are never
+        cut.
+        """
+        if self._follow_pv:
+            return None
+        checks = self.probcut.checks(depth, state.board.nbr_of_tiles())
+        if not checks:
+            return None
+        search = self.max_value if maximize else self.min_value
+        # the models predict the score of the player to move, so the offset
+        # changes sign when that is the opponent
+        if int(state.current_player) != self.player:
+            checks = [(shallow, a, -b, sigma)
+                      for shallow, a, b, sigma in checks]
+        t = self.probcut.threshold
+        for shallow, a, b, sigma in checks:
+            if beta < np.inf:
+                bound = (beta + t * sigma - b) / a
+                if self._shallow_test(search, state, bound, depth, shallow,
+                                      True):
+                    self._depth_cuts += 1
+                    return beta
+            if alpha > -np.inf:
+                bound = (alpha - t * sigma - b) / a
+                if self._shallow_test(search, state, bound, depth, shallow,
+                                      False):
+                    self._depth_cuts += 1
+                    return alpha
+        return None
+
+    def _shallow_test(self, search, state, bound, depth, shallow, above):
+        """
+        Whether the value of 'state', a node searched with 'depth', searched
+        to 'shallow' instead is at least 'bound' if 'above', at most 'bound'
+        otherwise, by a null window search. The search runs at the ply of
+        the node and leaves its principal variation and the move ordering
+        as they were.
+        """
+        ply = self.ply(depth)
+        iteration_depth = self._iteration_depth
+        shallow_testing = self._shallow_testing
+        # shift the iteration so that self.ply gives the plies of the node
+        # and its descendants
+        self._iteration_depth += shallow - depth
+        self._shallow_testing = True
+        try:
+            if above:
+                v = search(state, np.nextafter(bound, -np.inf), bound,
+                           shallow)
+                return v >= bound
+            v = search(state, bound, np.nextafter(bound, np.inf), shallow)
+            return v <= bound
+        finally:
+            self._iteration_depth = iteration_depth
+            self._shallow_testing = shallow_testing
+            self._pv_table[ply] = ()
+
+    def max_value(self, state, alpha, beta, depth):
+        ply = self.ply(depth)
+        self._pv_table[ply] = ()
+        if self.cut_off(state, depth):
             return self.utility(state)
+        hash_move = False
+        if self.transposition_table is not None:
+            score, hash_move = self.probe(state, alpha, beta, depth)
+            if score is not None:
+                return score
+        if self.probcut is not None:
+            score = self.prob_cut(state, alpha, beta, depth, True)
+            if score is not None:
+                return score
+        if depth == 1 and self.evaluator is not None:
+            return self.frontier_value(state, ply, True)
+        cuts = self._depth_cuts
+        alpha_orig = alpha
         v = -np.inf
-        for a in state.legal_moves():
-            v = max(v, self.min_value(self.result(state, a), alpha, beta))
+        best = False
+        for i, a in enumerate(self.ordered_actions(state, hash_move, ply)):
+            self._expanded_states += 1
+            state.make_move(a)
+            try:
+                value = self.min_value(state, alpha, beta, depth - 1)
+            finally:
+                state.undo_move()
+            if value > v:
+                v = value
+                best = a
+                if v > alpha:
+                    self.update_pv(ply, a)
             if v >= beta:
-                return v
+                self.record_cutoff(state, a, ply, depth, i)
+                break
             alpha = max(alpha, v)
+        if self.transposition_table is not None:
+            self.store(state, alpha_orig, beta, depth, v, best,
+                       self._depth_cuts == cuts)
         return v
 
-    def min_value(self, state, alpha, beta):
-        if state.is_terminal():
+    def min_value(self, state, alpha, beta, depth):
+        ply = self.ply(depth)
+        self._pv_table[ply] = ()
+        if self.cut_off(state, depth):
             return self.utility(state)
+        hash_move = False
+        if self.transposition_table is not None:
+            score, hash_move = self.probe(state, alpha, beta, depth)
+            if score is not None:
+                return score
+        if self.probcut is not None:
+            score = self.prob_cut(state, alpha, beta, depth, False)
+            if score is not None:
+                return score
+        if depth == 1 and self.evaluator is not None:
+            return self.frontier_value(state, ply, False)
+        cuts = self._depth_cuts
+        beta_orig = beta
         v = np.inf
-        for a in state.legal_moves():
-            v = min(v, self.max_value(self.result(state, a), alpha, beta))
+        best = False
+        for i, a in enumerate(self.ordered_actions(state, hash_move, ply)):
+            self._expanded_states += 1
+            state.make_move(a)
+            try:
+                value = self.max_value(state, alpha, beta, depth - 1)
+            finally:
+                state.undo_move()
+            if value < v:
+                v = value
+                best = a
+                if v < beta:
+                    self.update_pv(ply, a)
             if v <= alpha:
-                return v
-            beta = min(alpha, v)
+                self.record_cutoff(state, a, ply, depth, i)
+                break
+            beta = min(beta, v)
+        if self.transposition_table is not None:
+            self.store(state, alpha, beta_orig, depth, v, best,
+                       self._depth_cuts == cuts)
         return v
 
 
+class PVSAI(AlphaBetaAI):
+    """
+    Principal variation search (NegaScout) in negamax form, with the
+    transposition table, move ordering and endgame solving of AlphaBetaAI.
+    The first move of each node is searched with the full window and the
+    others with a null window, which only proves that they are no better,
+    and is followed by a full search if one turns out to be. Each iteration
+    starts with an aspiration window of 'aspiration_window' around the
+    score of the iteration two plies shallower (scores alternate between
+    odd and even depths), opened on the failing side on a fail high or
+    low. Values are from the point of view of the player to move in a node.
+    """
+
+    def __init__(self, color, aspiration_window=4, **kwargs):
+        if kwargs.get('probcut') is not None:
+            raise ValueError('PVSAI does not support probcut')
+        super().__init__(color, **kwargs)
+        self.aspiration_window = aspiration_window
+        self._root_hash = None
+        self._root_values = dict()
+
+    def child_value(self, state, depth, alpha=-np.inf):
+        return -self.negascout(state, -np.inf, -alpha, depth)
+
+    def search_root(self, state, depth):
+        if self._root_hash != state.hash:
+            self._root_hash = state.hash
+            self._root_values = dict()
+        guess = self._root_values.get(depth - 2, self.score)
+        if depth == 0 or guess is None or not np.isfinite(guess):
+            move, value = self.search_window(state, depth, -np.inf, np.inf)
+        else:
+            alpha = guess - self.aspiration_window
+            beta = guess + self.aspiration_window
+            while True:
+                move, value = self.search_window(state, depth, alpha, beta)
+                if value <= alpha:
+                    alpha = -np.inf
+                elif value >= beta:
+                    beta = np.inf
+                else:
+                    break
+        self._root_values[depth] = value
+        return move, value
+
+    def search_window(self, state, depth, alpha, beta):
+        """
+        Search the root 'state' within the window (alpha, beta). Return the
+        best move and its value, which is a bound if it falls outside the
+        window.
+        """
+        hash_move = False
+        if self.transposition_table is not None:
+            entry = self.transposition_table.probe(state.hash)
+            if entry is not None:
+                hash_move = entry[3]
+        alpha_orig = alpha
+        best = -np.inf
+        best_move = None
+        for i, a in enumerate(self.ordered_actions(state, hash_move, 0)):
+            self._expanded_states += 1
+            state.make_move(a)
+            try:
+                value = self.scout(state, alpha, beta, depth, i)
+            finally:
+                state.undo_move()
+            if value > best:
+                best = value
+                best_move = a
+                if value > alpha:
+                    alpha = value
+                    self.update_pv(0, a)
+                if value >= beta:
+                    break
+        if self.transposition_table is not None:
+            self.store(state, alpha_orig, beta, depth + 1, best, best_move,
+                       not self._depth_cuts)
+        return best_move, best
+
+    def scout(self, state, alpha, beta, depth, index):
+        """
+        The value of the child 'state', the move number 'index' of its
+        parent, for the parent's player: a full window search for the first
+        move, otherwise a null window search at alpha, repeated with the
+        full window if the move turns out to be better.
+        """
+        if index == 0:
+            return -self.negascout(state, -beta, -alpha, depth)
+        value = -self.negascout(state, -np.nextafter(alpha, np.inf),
+                                -alpha, depth)
+        if alpha < value < beta:
+            value = -self.negascout(state, -beta, -value, depth)
+        return value
+
+    def negascout(self, state, alpha, beta, depth):
+        ply = self.ply(depth)
+        self._pv_table[ply] = ()
+        sign = 1 if int(state.current_player) == self.player else -1
+        if self.cut_off(state, depth):
+            return sign * self.utility(state)
+        hash_move = False
+        if self.transposition_table is not None:
+            score, hash_move = self.probe(state, alpha, beta, depth)
+            if score is not None:
+                return score
+        if depth == 1 and self.evaluator is not None:
+            return sign * self.frontier_value(state, ply, sign > 0)
+        cuts = self._depth_cuts
+        alpha_orig = alpha
+        best = -np.inf
+        best_move = False
+        for i, a in enumerate(self.ordered_actions(state, hash_move, ply)):
+            self._expanded_states += 1
+            state.make_move(a)
+            try:
+                value = self.scout(state, alpha, beta, depth - 1, i)
+            finally:
+                state.undo_move()
+            if value > best:
+                best = value
+                best_move = a
+                if value > alpha:
+                    alpha = value
+                    self.update_pv(ply, a)
+            if best >= beta:
+                self.record_cutoff(state, a, ply, depth, i)
+                break
+        if self.transposition_table is not None:
+            self.store(state, alpha_orig, beta, depth, best, best_move,
+                       self._depth_cuts == cuts)
+        return best
+
+
 if __name__ == '__main__':
     pass
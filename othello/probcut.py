@@ -0,0 +1,230 @@
+"""
+Multi-ProbCut forward pruning (Buro), for the alpha-beta search.
+
+The value of a deep search of a position is predicted from a shallow search
+by a linear model, v_deep ~ a * v_shallow + b, with a normal error of
+standard deviation sigma. At a node searched to a depth that has a model,
+a null window search to the shallow depth tests whether the deep value is
+above beta, or below alpha, with a confidence given by the threshold t: the
+node is cut if the shallow value is at least (beta + t * sigma - b) / a, or
+at most (alpha - t * sigma - b) / a. Multi-ProbCut tries several shallow
+depths per depth, cheapest first, and fits separate models per game phase.
+
+The models depend on the evaluation, so they are fitted (see calibrate)
+with the evaluator of the engine they are used with. Scores are from the
+point of view of the player to move. The parameters are saved as JSON:
+
+    {"threshold": t, "phases": n,
+     "pairs": [{"phase": p, "depth": d, "shallow": s,
+                "a": a, "b": b, "sigma": sigma}, ...]}
+
+where a depth is the number of plies searched below a node, one more than
+the 'depth' of an AI searching the node as its root.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from othello.patterns import phase
+
+# (depth, shallow depth) pairs fitted by default
+DEFAULT_PAIRS = ((3, 1), (4, 2), (5, 1), (5, 3), (6, 2), (6, 4))
+
+
+class ProbCut:
+    """
+    Multi-ProbCut parameters: for each game phase and depth, a list of
+    (shallow depth, a, b, sigma) models, and the cut 'threshold'.
+    """
+
+    def __init__(self, pairs=(), phases=1, threshold=1.5):
+        self.phases = phases
+        self.threshold = threshold
+        self.pairs = list(pairs)
+        self._checks = dict()
+        for pair in sorted(self.pairs, key=lambda p: p['shallow']):
+            self._checks.setdefault((pair['phase'], pair['depth']), []).append(
+                (pair['shallow'], pair['a'], pair['b'], pair['sigma']))
+
+    def __eq__(self, other):
+        return (isinstance(other, ProbCut) and
+                self.to_dict() == other.to_dict())
+
+    def checks(self, depth, tiles):
+        """
+        The (shallow depth, a, b, sigma) models for a node to be searched to
+        'depth' with 'tiles' tiles on the board, cheapest first.
+        """
+        return self._checks.get((int(phase(tiles, self.phases)), depth), ())
+
+    def to_dict(self):
+        return {'threshold': self.threshold, 'phases': self.phases,
+                'pairs': self.pairs}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read parameters saved with ProbCut.save.
+        """
+        with open(path) as f:
+            try:
+                data = json.load(f)
+                return cls(data['pairs'], data['phases'], data['threshold'])
+            except (ValueError, KeyError, TypeError):
+                raise ValueError('{} is not a ProbCut parameter file'.format(
+                    path))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+def search_scores(own, opp, depths, evaluator=None):
+    """
+    The scores of searches of the position given by the bitboards 'own',
+    of the player to move, and 'opp', to each of 'depths' plies.
+    """
+    from othello.game import Game
+    from othello.players import AlphaBetaAI, Player
+    scores = list()
+    for depth in depths:
+        ai = AlphaBetaAI('black', depth=depth - 1, endgame_empties=0,
+                         evaluator=evaluator, tt_size=2 ** 20)
+        game = Game.from_position((own, opp, Player.black),
+                                  [ai, Player('white')])
+        ai.search(game)
+        scores.append(float(ai.score))
+    return scores
+
+
+def _game_samples(engine, seed, opening_moves, depths, evaluator):
+    from othello.train import game_positions
+    samples = list()
+    for own, opp in game_positions(engine, seed, opening_moves):
+        tiles = bin(own | opp).count('1')
+        if 64 - tiles <= max(depths):
+            continue    # too close to the end for a depth-limited search
+        samples.append((tiles, search_scores(own, opp, depths, evaluator)))
+    return samples
+
+
+def fit(samples, depths, pairs=DEFAULT_PAIRS, phases=1, threshold=1.5):
+    """
+    Fit a model to each pair and phase from 'samples' of (tiles, scores),
+    the scores being those of the searches to 'depths'. Return a ProbCut.
+    """
+    column = {d: i for i, d in enumerate(depths)}
+    tiles = np.array([t for t, _ in samples])
+    scores = np.array([s for _, s in samples], dtype=np.float64)
+    sample_phases = phase(tiles, phases)
+    fitted = list()
+    for p in range(phases):
+        rows = scores[sample_phases == p]
+        if len(rows) < 3:
+            continue
+        for depth, shallow in pairs:
+            x = rows[:, column[shallow]]
+            y = rows[:, column[depth]]
+            if np.ptp(x) == 0:
+                continue
+            a, b = np.polyfit(x, y, 1)
+            sigma = float(np.std(y - (a * x + b), ddof=2))
+            if a <= 0:
+                continue
+            fitted.append({'phase': p, 'depth': depth, 'shallow': shallow,
+                           'a': float(a), 'b': float(b), 'sigma': sigma})
+    return ProbCut(fitted, phases, threshold)
+
+
+def calibrate(games, engine='alphabeta:depth=1', pairs=DEFAULT_PAIRS,
+              phases=1, threshold=1.5, workers=None, opening_moves=8,
+              seed=0, evaluator=None):
+    """
+    Fit Multi-ProbCut parameters from the positions of 'games' self-play
+    games of 'engine', searched with 'evaluator' in a pool of 'workers'
+    processes.
+    """
+    depths = sorted(set(d for pair in pairs for d in pair))
+    samples = list()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_game_samples, engine, seed + i,
+                               opening_moves, depths, evaluator)
+                   for i in range(games)]
+        for future in futures:
+            samples.extend(future.result())
+    return fit(samples, depths, pairs, phases, threshold)
+
+
+def parse_pairs(string):
+    """
+    Parse pairs given as 'depth:shallow,...', e.g. '3:1,4:2'.
+    """
+    pairs = list()
+    for item in filter(None, string.split(',')):
+        depth, _, shallow = item.partition(':')
+        try:
+            depth, shallow = int(depth), int(shallow)
+        except ValueError:
+            raise ValueError('invalid pair {!r}'.format(item))
+        if not 0 <= shallow < depth:
+            raise ValueError('the shallow depth of {!r} must be less than '
+                             'the depth'.format(item))
+        pairs.append((depth, shallow))
+    return tuple(pairs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Calibrate Multi-ProbCut from self-play positions.')
+    parser.add_argument('output', help='parameter file (JSON)')
+    parser.add_argument(
+        '-n', '--games', type=int, default=20,
+        help='number of games, default is 20')
+    parser.add_argument(
+        '--pairs', default=','.join('{}:{}'.format(*p)
+                                    for p in DEFAULT_PAIRS),
+        help='depth:shallow depth pairs to fit, default is %(default)s')
+    parser.add_argument(
+        '--phases', type=int, default=1,
+        help='number of game phases, default is 1')
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=1.5,
+        help='cut threshold in standard deviations, default is 1.5')
+    parser.add_argument(
+        '--engine', default='alphabeta:depth=1',
+        help="engine playing the games, default is 'alphabeta:depth=1'")
+    parser.add_argument(
+        '--evaluator', default=None,
+        help='pattern weight file of the engine to calibrate for, default '
+             'is the disc difference')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='number of processes, default is one per CPU')
+    parser.add_argument(
+        '--opening-moves', type=int, default=8,
+        help='number of random moves at the start of each game, '
+             'default is 8')
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='seed of the first game, default is 0')
+    args = parser.parse_args(argv)
+
+    try:
+        pairs = parse_pairs(args.pairs)
+    except ValueError as e:
+        parser.error(str(e))
+    probcut = calibrate(args.games, args.engine, pairs, args.phases,
+                        args.threshold, args.workers, args.opening_moves,
+                        args.seed, args.evaluator)
+    probcut.save(args.output)
+    for pair in probcut.pairs:
+        print('phase {phase}, depth {depth} from {shallow}: '
+              'a {a:.3f}, b {b:.3f}, sigma {sigma:.3f}'.format(**pair),
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
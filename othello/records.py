@@ -0,0 +1,233 @@
+"""
+Compact binary game records, and archives of many games.
+
+A game is recorded as one byte per move, the square number 8 * x + y of the
+move's numeric (x, y) index (see Board.parse_numeric_index and
+othello.bitboard.square), or PASS, from the start position. An archive file
+is the magic number followed by the games, each a 5 byte header, the number
+of moves, the final number of black and white tiles and the lengths of the
+black and white players' names, followed by the names (UTF-8) and the moves.
+A game of 60 moves between two engines thus takes some 100 bytes.
+
+Archives are appended to in bulk by an ArchiveWriter and read by a
+GameArchive, which memory-maps the file, so that the moves of each game are
+a view of the file rather than a copy. Records stay valid after the archive
+is closed, the file then being unmapped when the last of them is gone.
+Replaying the moves with bitboard operations (see GameRecord.positions)
+regenerates hundreds of thousands of positions per second for statistics
+or training.
+"""
+import mmap
+import os
+
+from othello import bitboard
+from othello.bitboard import place, square
+
+MAGIC = b'OTHGAME\x01'
+HEADER_SIZE = 5
+PASS = 64
+
+# initial bitboards, as set up by Game
+_START_BLACK = 1 << 28 | 1 << 35
+_START_WHITE = 1 << 27 | 1 << 36
+
+
+def encode_moves(moves):
+    """
+    The record of 'moves', numeric (x, y) indices or None for a pass.
+    """
+    return bytes(PASS if m is None else square(m) for m in moves)
+
+
+def decode_moves(codes):
+    """
+    The moves of the record 'codes', see encode_moves.
+    """
+    return [None if c == PASS else place(c) for c in codes]
+
+
+class GameRecord:
+    """
+    A recorded game: the names of the 'black' and 'white' players, the
+    final numbers of tiles and the 'codes' of the moves (bytes or a view of
+    an archive).
+    """
+
+    __slots__ = ('black', 'white', 'black_tiles', 'white_tiles', 'codes')
+
+    def __init__(self, black, white, black_tiles, white_tiles, codes):
+        self.black = black
+        self.white = white
+        self.black_tiles = black_tiles
+        self.white_tiles = white_tiles
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def moves(self):
+        return decode_moves(self.codes)
+
+    @property
+    def winner(self):
+        if self.black_tiles == self.white_tiles:
+            return None
+        return 'black' if self.black_tiles > self.white_tiles else 'white'
+
+    def positions(self):
+        """
+        Replay the game, yielding the position before each move as (black
+        tiles, white tiles, numeric colour of the player to move, move
+        code). Raises ValueError on an illegal move.
+        """
+        own, opp = _START_BLACK, _START_WHITE
+        to_move = -1    # black, as in Player.black
+        for code in self.codes:
+            if to_move == -1:
+                yield own, opp, to_move, code
+            else:
+                yield opp, own, to_move, code
+            if code != PASS:
+                f = bitboard.flips(own, opp, code)
+                if not f:
+                    raise ValueError('illegal move {} in game'.format(
+                        place(code)))
+                own |= f | 1 << code
+                opp ^= f
+            own, opp = opp, own
+            to_move = -to_move
+
+    def game(self, players=None):
+        """
+        The final position of the game as a Game, with the moves made so
+        that they can be taken back, by default with plain players.
+        """
+        from othello.game import Board, Game
+        from othello.players import Player
+        if players is None:
+            players = [Player('black'), Player('white')]
+        game = Game(Board(), players)
+        for move in self.moves:
+            game.make_move(move)
+        return game
+
+
+class ArchiveWriter:
+    """
+    Appends games to the archive file 'path', writing them in blocks of
+    about 'buffer_size' bytes. Use as a context manager, or call close.
+    """
+
+    def __init__(self, path, buffer_size=2 ** 20):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, moves, black_tiles, white_tiles, black='', white=''):
+        """
+        Add a game of 'moves' (numeric indices, None for a pass) between the
+        players named 'black' and 'white'.
+        """
+        codes = encode_moves(moves)
+        names = black.encode(), white.encode()
+        if len(codes) > 255 or any(len(n) > 255 for n in names):
+            raise ValueError('too many moves or too long a player name')
+        self._buffer += bytes((len(codes), black_tiles, white_tiles,
+                               len(names[0]), len(names[1])))
+        self._buffer += names[0] + names[1] + codes
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def add_result(self, result):
+        """
+        Add a game as given by othello.arena.play_game.
+        """
+        from othello.game import Board
+        board = Board()
+        moves = [None if m is None else board.parse_index(m)
+                 for m in result['moves']]
+        self.add(moves, result['black_tiles'], result['white_tiles'],
+                 result['black'], result['white'])
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer = bytearray()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class GameArchive:
+    """
+    The games of the archive file 'path', memory-mapped and read in order
+    by iterating over the archive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('{} is not a game archive'.format(path))
+            size = os.fstat(f.fileno()).st_size
+            self._mmap = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                          if size > len(MAGIC) else None)
+        self._data = (memoryview(self._mmap) if self._mmap is not None
+                      else memoryview(MAGIC))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._data.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # records still hold views of the file, which keep it
+                # mapped until they are gone
+                pass
+            self._mmap = None
+
+    def __iter__(self):
+        data = self._data
+        i = len(MAGIC)
+        end = len(data)
+        while i < end:
+            if i + HEADER_SIZE > end:
+                raise ValueError('{} is truncated'.format(self.path))
+            n, black_tiles, white_tiles, b, w = data[i:i + HEADER_SIZE]
+            i += HEADER_SIZE
+            if i + b + w + n > end:
+                raise ValueError('{} is truncated'.format(self.path))
+            black = str(data[i:i + b], 'utf-8')
+            white = str(data[i + b:i + b + w], 'utf-8')
+            i += b + w
+            yield GameRecord(black, white, black_tiles, white_tiles,
+                             data[i:i + n])
+            i += n
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def positions(self):
+        """
+        Yield the positions of all games, see GameRecord.positions.
+        """
+        for record in self:
+            yield from record.positions()
@@ -0,0 +1,353 @@
+"""
+An asyncio game server, for many simultaneous games against the AI.
+
+Clients connect over TCP or a Unix socket and send requests as JSON
+objects, one per line, each answered by one JSON line in order:
+
+    {"cmd": "new", "engine": "alphabeta:depth=4", "color": "white",
+     "time": 60, "position": "<Game.to_string>"}
+        start a game where the AI, given by an engine specification (see
+        othello.arena.parse_engine), plays 'color' with a time budget of
+        'time' seconds for the whole game; all keys but "cmd" are optional
+    {"cmd": "move", "game": id, "move": "d3"}
+        play a move ("pass" if there is none) for the client
+    {"cmd": "state", "game": id}
+    {"cmd": "close", "game": id}
+
+Replies are {"ok": true, ...} with the state of the game, the AI's moves
+since the last request ("ai_moves") and the result once the game is over,
+or {"ok": false, "error": "..."}. The AI moves whenever it is to move, so a
+game may be finished by the AI alone.
+
+Games are sessions of the server, not of a connection, and are held in
+memory. The searches run in a bounded pool of worker processes, each keeping
+an AI per engine between searches, so the event loop only does the I/O.
+Backpressure: the requests of a connection are handled one at a time, at
+most 'max_pending' searches wait for the pool, and a connection waiting for
+a slot is not read from until it gets one.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+
+from othello.arena import parse_engine
+from othello.game import Board, Game
+from othello.players import Player
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ENGINE = 'alphabeta:depth=6'
+
+# the AIs of a worker process, by engine and colour
+_worker_ais = dict()
+
+
+def _search(engine, position, time_limit):
+    """
+    Search 'position' (see Game.position) with an AI of 'engine' for at most
+    'time_limit' seconds. Return the move, the score and the seconds spent.
+    """
+    color = 'black' if position[2] == Player.black else 'white'
+    if (engine, color) not in _worker_ais:
+        cls, kwargs = parse_engine(engine)
+        ai = cls(color, **kwargs)
+        _worker_ais[engine, color] = ai, ai.time_limit
+    ai, engine_time_limit = _worker_ais[engine, color]
+    if engine_time_limit is not None:
+        time_limit = min(time_limit, engine_time_limit)
+    ai.time_limit = time_limit
+    other = Player('white' if color == 'black' else 'black')
+    game = Game.from_position(
+        position, [ai, other] if color == 'black' else [other, ai])
+    start = time.perf_counter()
+    move = ai.search(game)
+    score = None if ai.score is None else float(ai.score)
+    return move, score, time.perf_counter() - start
+
+
+class Session:
+    """
+    A game against the AI playing 'engine' with the numeric colour
+    'ai_color' and 'time_left' seconds left of its budget.
+    """
+
+    __slots__ = ('id', 'game', 'engine', 'ai_color', 'time_left', 'busy')
+
+    def __init__(self, id, game, engine, ai_color, time_left):
+        self.id = id
+        self.game = game
+        self.engine = engine
+        self.ai_color = ai_color
+        self.time_left = time_left
+        self.busy = False
+
+    def ai_to_move(self):
+        return (not self.game.is_terminal() and
+                int(self.game.current_player) == self.ai_color)
+
+    def move_time(self):
+        """
+        The time limit of the AI's next search, an even share of its budget
+        over its remaining moves.
+        """
+        moves = (self.game.nbr_of_empty_tiles() + 1) // 2
+        return max(self.time_left / max(moves, 1), 0.01)
+
+    def state(self):
+        game = self.game
+        board = game.board
+        state = {
+            'game': self.id,
+            'position': game.to_string(),
+            'to_move': str(game.current_player),
+            'legal_moves': [board.parse_numeric_index(m)
+                            for m in game.legal_moves()],
+            'time_left': self.time_left,
+        }
+        if game.is_terminal():
+            black = game.nbr_of_tiles(game.players[0])
+            white = game.nbr_of_tiles(game.players[1])
+            state['result'] = {
+                'black_tiles': black,
+                'white_tiles': white,
+                'winner': ('black' if black > white else
+                           'white' if white > black else None),
+            }
+        return state
+
+
+class GameServer:
+    """
+    Serves games against the AI, see the module documentation. The AI
+    searches run in 'workers' processes, with at most 'max_pending'
+    searches waiting for them; at most 'max_sessions' games are held at
+    once, and each AI has 'time_budget' seconds per game by default.
+    """
+
+    def __init__(self, workers=None, max_sessions=10000, max_pending=None,
+                 time_budget=60.0, max_line=2 ** 16):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending or 4 * self.workers
+        self.time_budget = time_budget
+        self.max_line = max_line
+        self.sessions = dict()
+        self._ids = itertools.count(1)
+        self._pool = None
+        self._slots = None
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """
+        Listen on the Unix socket 'path', or on 'host' and 'port'. Return
+        the asyncio server.
+        """
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._slots = asyncio.Semaphore(self.max_pending)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(
+                self.handle, path, limit=self.max_line)
+        else:
+            self._server = await asyncio.start_server(
+                self.handle, host, port, limit=self.max_line)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        """
+        Answer the requests of a connection, one at a time.
+        """
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than the limit, the rest of the line is lost
+                    await self._reply(writer, self.error('line too long'))
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    reply = self.error('invalid JSON')
+                else:
+                    try:
+                        reply = await self.request(request)
+                    except Exception:
+                        log.exception('request %r failed', request)
+                        reply = self.error('internal error')
+                await self._reply(writer, reply)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _reply(self, writer, reply):
+        writer.write(json.dumps(reply).encode() + b'\n')
+        await writer.drain()
+
+    def error(self, message):
+        return {'ok': False, 'error': message}
+
+    async def request(self, request):
+        """
+        Handle one request, returning the reply.
+        """
+        if not isinstance(request, dict):
+            return self.error('a request must be a JSON object')
+        cmd = request.get('cmd')
+        if cmd == 'new':
+            return await self.new_game(request)
+        if cmd not in ('move', 'state', 'close'):
+            return self.error('unknown command {!r}'.format(cmd))
+        session = self.sessions.get(request.get('game'))
+        if session is None:
+            return self.error('no game {!r}'.format(request.get('game')))
+        if session.busy:
+            return self.error('game {} is busy'.format(session.id))
+        if cmd == 'state':
+            return dict(session.state(), ok=True)
+        if cmd == 'close':
+            del self.sessions[session.id]
+            return {'ok': True, 'game': session.id}
+        return await self.move(session, request.get('move'))
+
+    async def new_game(self, request):
+        if len(self.sessions) >= self.max_sessions:
+            return self.error('too many games')
+        engine = request.get('engine', DEFAULT_ENGINE)
+        color = request.get('color', 'white')
+        try:
+            cls, kwargs = parse_engine(engine)
+            ai_color = int(Player(color))
+            # fail here rather than in a worker on bad engine arguments
+            cls(color, **kwargs)
+            budget = float(request.get('time', self.time_budget))
+            if 'position' in request:
+                game = Game.from_string(request['position'])
+            else:
+                game = Game(Board(), [Player('black'), Player('white')])
+        except (ValueError, TypeError) as e:
+            return self.error(str(e))
+        session = Session(next(self._ids), game, engine, ai_color, budget)
+        self.sessions[session.id] = session
+        try:
+            return await self.play_ai(session)
+        except Exception:
+            # the client never learns the id of the game
+            del self.sessions[session.id]
+            raise
+
+    async def move(self, session, move):
+        game = session.game
+        if game.is_terminal():
+            return self.error('game {} is over'.format(session.id))
+        if session.ai_to_move():
+            return self.error('not your move')
+        legal = game.legal_moves()
+        if move == 'pass' and not legal:
+            game.make_move(None)
+        else:
+            index = (game.board.parse_index(move)
+                     if isinstance(move, str) else None)
+            if index is None or index not in legal:
+                return self.error('illegal move {!r}'.format(move))
+            game.make_move(index)
+        return await self.play_ai(session)
+
+    async def play_ai(self, session):
+        """
+        Let the AI make its moves, passing for the client when it has no
+        moves, until the client is to move or the game is over.
+        """
+        game = session.game
+        moves = list()
+        session.busy = True
+        try:
+            while not game.is_terminal():
+                if not game.legal_moves():
+                    game.make_move(None)
+                    moves.append('pass')
+                    continue
+                if not session.ai_to_move():
+                    break
+                move = await self.search(session)
+                game.make_move(move)
+                moves.append(game.board.parse_numeric_index(move))
+        finally:
+            session.busy = False
+        return dict(session.state(), ok=True, ai_moves=moves)
+
+    async def search(self, session):
+        """
+        The AI's move in 'session', searched in the process pool within
+        the time left of its budget.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            move, _, seconds = await loop.run_in_executor(
+                self._pool, _search, session.engine, session.game.position(),
+                session.move_time())
+        session.time_left = max(session.time_left - seconds, 0.0)
+        if move not in session.game.legal_moves():
+            raise RuntimeError('the AI returned the illegal move {}'.format(
+                move))
+        return move
+
+
+async def serve(server, host, port, path):
+    asyncio_server = await server.start(host, port, path)
+    async with asyncio_server:
+        await asyncio_server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serve games against the AI over a socket.')
+    parser.add_argument(
+        '--host', default='127.0.0.1',
+        help='address to listen on, default is 127.0.0.1')
+    parser.add_argument(
+        '-p', '--port', type=int, default=7777,
+        help='port to listen on, default is 7777')
+    parser.add_argument(
+        '--unix', metavar='PATH', default=None,
+        help='listen on a Unix socket instead')
+    parser.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='number of search processes, default is one per CPU')
+    parser.add_argument(
+        '--max-games', type=int, default=10000,
+        help='maximum number of games held, default is 10000')
+    parser.add_argument(
+        '--max-pending', type=int, default=None,
+        help='maximum number of searches waiting for a process, default '
+             'is four per process')
+    parser.add_argument(
+        '-t', '--time', type=float, default=60.0,
+        help='default time budget of the AI per game in seconds, default '
+             'is 60')
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.workers, args.max_games, args.max_pending,
+                        args.time)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
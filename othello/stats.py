@@ -0,0 +1,219 @@
+"""
+Instrumentation of the AI search, and structured (JSON) logging.
+
+A SearchStats object given to an AI as 'stats' collects telemetry of each
+search: the expanded states, cutoffs and transposition table hits per ply,
+the time spent in move generation, move ordering and evaluation, the depth
+reached and the principal variation. The per-node counters are gathered by
+wrapping methods of the AI instance for the duration of a search only, so
+an AI without stats runs its plain methods.
+"""
+from collections import Counter
+import json
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class SearchStats:
+    """
+    Collects telemetry of the searches of an AI. After each search, the
+    summary (see SearchStats.summary) is logged at 'log_level' and passed to
+    'callback', if given.
+
+    In a parallel search (an AI with more than one worker) the nodes are
+    searched in other processes, so only the totals are available.
+    """
+
+    # the AI methods timed, and what their time is counted as; time spent
+    # in a nested timed method is only counted for the inner one
+    TIMED = (
+        ('actions', 'move_generation'),
+        ('ordered_actions', 'move_ordering'),
+        ('utility', 'evaluation'),
+        ('frontier_values', 'evaluation'),
+    )
+
+    def __init__(self, callback=None, log_level=logging.INFO):
+        self.callback = callback
+        self.log_level = log_level
+        self.last = None
+        self._wrapped = list()
+        self.reset()
+
+    def reset(self):
+        self.nodes = Counter()
+        self.cutoffs = Counter()
+        self.tt_probes = Counter()
+        self.tt_hits = Counter()
+        self.times = dict.fromkeys(
+            (key for _, key in self.TIMED), 0.0)
+        self._nested = 0.0
+        self._start_time = None
+        self._start_nodes = 0
+        self._board = None
+
+    def start(self, ai, state):
+        """
+        Called by AI.search before searching 'state'.
+        """
+        self.reset()
+        self._start_time = time.perf_counter()
+        self._start_nodes = ai._expanded_states
+        self._board = state.board
+        if ai.workers == 1:
+            self.attach(ai)
+
+    def finish(self, ai, move):
+        """
+        Called by AI.search with the move found, also if the search failed.
+        """
+        self.detach(ai)
+        self.last = self.summary(ai, move)
+        log.log(self.log_level, '%s: move %s, depth %s, %d expanded states, '
+                '%.2fs', ai, self.last['move'], self.last['depth'],
+                self.last['nodes'], self.last['seconds'],
+                extra={'data': self.last})
+        if self.callback is not None:
+            self.callback(self.last)
+
+    def attach(self, ai):
+        """
+        Wrap the methods of 'ai' that are counted and timed.
+        """
+        self._wrap(ai, 'cut_off', self._count_node)
+        self._wrap(ai, 'frontier_value', self._count_frontier)
+        if getattr(ai, 'transposition_table', None) is not None:
+            self._wrap(ai, 'probe', self._count_probe)
+        if hasattr(ai, 'record_cutoff'):
+            self._wrap(ai, 'record_cutoff', self._count_cutoff)
+        for name, key in self.TIMED:
+            if hasattr(ai, name):
+                self._wrap(ai, name, self._timed, key)
+
+    def detach(self, ai):
+        """
+        Restore the methods of 'ai' wrapped by SearchStats.attach.
+        """
+        for name in self._wrapped:
+            delattr(ai, name)
+        self._wrapped = list()
+
+    def _wrap(self, ai, name, wrapper, *args):
+        setattr(ai, name, wrapper(ai, getattr(ai, name), *args))
+        self._wrapped.append(name)
+
+    def _count_node(self, ai, method):
+        nodes = self.nodes
+
+        def cut_off(state, depth):
+            nodes[ai.ply(depth)] += 1
+            return method(state, depth)
+        return cut_off
+
+    def _count_frontier(self, ai, method):
+        nodes = self.nodes
+
+        def frontier_value(state, ply, maximize):
+            before = ai._expanded_states
+            try:
+                return method(state, ply, maximize)
+            finally:
+                nodes[ply + 1] += ai._expanded_states - before
+        return frontier_value
+
+    def _count_probe(self, ai, method):
+        probes = self.tt_probes
+        hits = self.tt_hits
+
+        def probe(state, alpha, beta, depth):
+            ply = ai.ply(depth)
+            probes[ply] += 1
+            score, move = method(state, alpha, beta, depth)
+            if score is not None:
+                hits[ply] += 1
+            return score, move
+        return probe
+
+    def _count_cutoff(self, ai, method):
+        cutoffs = self.cutoffs
+
+        def record_cutoff(state, move, ply, depth, index):
+            cutoffs[ply] += 1
+            return method(state, move, ply, depth, index)
+        return record_cutoff
+
+    def _timed(self, ai, method, key):
+        times = self.times
+
+        def timed(*args):
+            nested = self._nested
+            self._nested = 0.0
+            start = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                elapsed = time.perf_counter() - start
+                times[key] += elapsed - self._nested
+                self._nested = nested + elapsed
+        return timed
+
+    def _square(self, move):
+        return None if move is None else self._board.parse_numeric_index(move)
+
+    def _per_ply(self, counter):
+        plies = max(self.nodes, default=-1) + 1
+        return [counter[ply] for ply in range(plies)]
+
+    def summary(self, ai, move):
+        """
+        The statistics of the last search as a JSON serialisable dict.
+        """
+        seconds = time.perf_counter() - self._start_time
+        nodes = ai._expanded_states - self._start_nodes
+        summary = {
+            'event': 'search',
+            'player': str(ai),
+            'move': self._square(move),
+            'score': None if ai.score is None else float(ai.score),
+            'depth': ai.depth_reached,
+            'pv': [self._square(a) for a in ai.pv],
+            'nodes': nodes,
+            'seconds': seconds,
+            'nps': nodes / seconds if seconds else None,
+            'iterations': [
+                {'depth': d, 'seconds': t, 'nodes': n}
+                for d, t, n in ai.iterations],
+            'nodes_per_ply': self._per_ply(self.nodes),
+            'cutoffs_per_ply': self._per_ply(self.cutoffs),
+            'tt_probes_per_ply': self._per_ply(self.tt_probes),
+            'tt_hits_per_ply': self._per_ply(self.tt_hits),
+            'times': dict(self.times),
+        }
+        tt = getattr(ai, 'transposition_table', None)
+        if tt is not None:
+            summary['tt_hit_rate'] = tt.hit_rate
+        if ai.move_ordering is not None:
+            summary['first_move_cutoff_rate'] = (
+                ai.move_ordering.first_move_cutoff_rate)
+        return summary
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats log records as JSON lines, including the dict given as
+    extra={'data': ...} to the logging call.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'data', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
@@ -0,0 +1,210 @@
+"""
+The eight symmetries of the board (the dihedral group of the square) on
+bitboards, see othello.bitboard.
+
+A symmetry is numbered 0 to 7 by which of three reflections it is made of,
+applied in this order: bit 2 transposes the board (board[x, y] goes to
+board[y, x]), bit 1 flips it vertically (row x goes to row 7 - x) and bit 0
+mirrors it horizontally (column y goes to column 7 - y). Symmetry 0 is the
+identity. The rotations are not their own inverses, so moves are mapped
+back with inverse_square and inverse_move.
+
+The functions ending in _array work on numpy arrays of bitboards, to
+canonicalise or deduplicate large batches of positions at once.
+"""
+import numpy as np
+
+from othello.bitboard import FULL
+
+TRANSPOSE = 4
+FLIP = 2
+MIRROR = 1
+
+
+def flip_vertical(bits):
+    """
+    Swap the rows of the bitboard 'bits', row x going to row 7 - x.
+    """
+    k1 = 0x00FF00FF00FF00FF
+    k2 = 0x0000FFFF0000FFFF
+    bits = (bits >> 8) & k1 | (bits & k1) << 8
+    bits = (bits >> 16) & k2 | (bits & k2) << 16
+    return (bits >> 32) | (bits << 32) & FULL
+
+
+def mirror_horizontal(bits):
+    """
+    Swap the columns of the bitboard 'bits', column y going to column 7 - y.
+    """
+    k1 = 0x5555555555555555
+    k2 = 0x3333333333333333
+    k4 = 0x0F0F0F0F0F0F0F0F
+    bits = (bits >> 1) & k1 | (bits & k1) << 1
+    bits = (bits >> 2) & k2 | (bits & k2) << 2
+    return (bits >> 4) & k4 | (bits & k4) << 4
+
+
+def transpose(bits):
+    """
+    Reflect the bitboard 'bits' in the a1-h8 diagonal, board[x, y] going to
+    board[y, x].
+    """
+    t = 0x0F0F0F0F00000000 & (bits ^ bits << 28)
+    bits ^= t ^ t >> 28
+    t = 0x3333000033330000 & (bits ^ bits << 14)
+    bits ^= t ^ t >> 14
+    t = 0x5500550055005500 & (bits ^ bits << 7)
+    return bits ^ t ^ t >> 7
+
+
+def transform(bits, symmetry):
+    """
+    Apply 'symmetry' to the bitboard 'bits'.
+    """
+    if symmetry & TRANSPOSE:
+        bits = transpose(bits)
+    if symmetry & FLIP:
+        bits = flip_vertical(bits)
+    if symmetry & MIRROR:
+        bits = mirror_horizontal(bits)
+    return bits
+
+
+def transform_square(sq, symmetry):
+    """
+    The square that 'sq' goes to under 'symmetry'.
+    """
+    x, y = divmod(sq, 8)
+    if symmetry & TRANSPOSE:
+        x, y = y, x
+    if symmetry & FLIP:
+        x = 7 - x
+    if symmetry & MIRROR:
+        y = 7 - y
+    return 8 * x + y
+
+
+def inverse_square(sq, symmetry):
+    """
+    The square that goes to 'sq' under 'symmetry'.
+    """
+    x, y = divmod(sq, 8)
+    if symmetry & MIRROR:
+        y = 7 - y
+    if symmetry & FLIP:
+        x = 7 - x
+    if symmetry & TRANSPOSE:
+        x, y = y, x
+    return 8 * x + y
+
+
+def transform_move(move, symmetry):
+    """
+    The move, a numeric (x, y) index or None for a pass, that 'move' goes to
+    under 'symmetry'.
+    """
+    if move is None:
+        return None
+    return divmod(transform_square(8 * move[0] + move[1], symmetry), 8)
+
+
+def inverse_move(move, symmetry):
+    """
+    The move that goes to 'move' under 'symmetry', see transform_move.
+    """
+    if move is None:
+        return None
+    return divmod(inverse_square(8 * move[0] + move[1], symmetry), 8)
+
+
+def canonical_symmetries(black, white):
+    """
+    The canonical form of the position with the bitboards 'black' and
+    'white', the smallest (black, white) pair over the eight symmetries.
+    Return the transformed bitboards and all symmetries that give them,
+    which are more than one for symmetric positions.
+    """
+    best = (black, white)
+    symmetries = [0]
+    for symmetry in range(1, 8):
+        candidate = (transform(black, symmetry), transform(white, symmetry))
+        if candidate < best:
+            best = candidate
+            symmetries = [symmetry]
+        elif candidate == best:
+            symmetries.append(symmetry)
+    return best[0], best[1], tuple(symmetries)
+
+
+def canonical(black, white):
+    """
+    The canonical form of the position with the bitboards 'black' and
+    'white', see canonical_symmetries. Return the transformed bitboards and
+    the symmetry used.
+    """
+    black, white, symmetries = canonical_symmetries(black, white)
+    return black, white, symmetries[0]
+
+
+def _swap(bits, mask, shift):
+    # exchange the bits in 'mask' with those 'shift' places above them
+    return (bits >> shift) & mask | (bits & mask) << shift
+
+
+def _delta_swap(bits, mask, shift):
+    t = mask & (bits ^ bits << shift)
+    return bits ^ t ^ t >> shift
+
+
+def transform_array(bits, symmetry):
+    """
+    Apply 'symmetry' to each bitboard of the array 'bits', as transform.
+    """
+    bits = np.asarray(bits, dtype=np.uint64)
+    u = np.uint64
+    if symmetry & TRANSPOSE:
+        bits = _delta_swap(bits, u(0x0F0F0F0F00000000), u(28))
+        bits = _delta_swap(bits, u(0x3333000033330000), u(14))
+        bits = _delta_swap(bits, u(0x5500550055005500), u(7))
+    if symmetry & FLIP:
+        bits = _swap(bits, u(0x00FF00FF00FF00FF), u(8))
+        bits = _swap(bits, u(0x0000FFFF0000FFFF), u(16))
+        bits = bits >> u(32) | bits << u(32)
+    if symmetry & MIRROR:
+        bits = _swap(bits, u(0x5555555555555555), u(1))
+        bits = _swap(bits, u(0x3333333333333333), u(2))
+        bits = _swap(bits, u(0x0F0F0F0F0F0F0F0F), u(4))
+    return bits
+
+
+def canonical_array(black, white):
+    """
+    The canonical forms of the positions given by the arrays of bitboards
+    'black' and 'white', as canonical. Return the transformed bitboards and
+    the symmetry used for each position.
+    """
+    best_black = np.asarray(black, dtype=np.uint64).copy()
+    best_white = np.asarray(white, dtype=np.uint64).copy()
+    symmetries = np.zeros(best_black.shape, dtype=np.uint8)
+    for symmetry in range(1, 8):
+        b = transform_array(black, symmetry)
+        w = transform_array(white, symmetry)
+        better = (b < best_black) | (b == best_black) & (w < best_white)
+        best_black[better] = b[better]
+        best_white[better] = w[better]
+        symmetries[better] = symmetry
+    return best_black, best_white, symmetries
+
+
+def unique_array(black, white):
+    """
+    The indices of the first position of each class of equivalent
+    positions in the arrays of bitboards 'black' and 'white', in order.
+    """
+    black, white, _ = canonical_array(black, white)
+    pairs = np.empty(black.shape, dtype=[('black', np.uint64),
+                                         ('white', np.uint64)])
+    pairs['black'] = black
+    pairs['white'] = white
+    _, first = np.unique(pairs, return_index=True)
+    return np.sort(first)
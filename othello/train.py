@@ -0,0 +1,355 @@
+"""
+Offline training of the pattern evaluation (see othello.patterns) from
+self-play games, on the CPU of a single machine.
+
+The pipeline has three steps:
+
+1. generate: self-play games between engines (see othello.arena) are
+   replayed, and each position is labelled with the score of a search from
+   the point of view of the player to move: an exact solve near the end of
+   the game, a shallow search before that. The labelled positions are
+   appended to a dataset file as they are produced.
+2. The dataset files are streamed from disk in shuffled mini-batches by
+   read_batches, so they may be larger than memory.
+3. fit: weights are fitted either by least squares, of one weight per
+   square (up to symmetry) and phase, or by stochastic gradient descent of
+   the full pattern tables, starting from the least squares solution. The
+   result is written as a pattern weight file, to be given to an AI as
+   evaluator='<file>'.
+
+A dataset file is the magic number followed by records of the player to
+move's and the opponent's bitboards (uint64) and the label (float32).
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from othello import symmetry
+from othello.evaluation import popcount, to_boards
+from othello.patterns import TABLE_SIZE, PatternEvaluator, phase
+
+MAGIC = b'OTHDATA\x01'
+RECORD = np.dtype([('own', '<u8'), ('opp', '<u8'), ('label', '<f4')])
+
+
+def _square_classes():
+    """
+    The class of each square, squares mapped onto each other by a board
+    symmetry being in the same class.
+    """
+    representatives = [
+        min(symmetry.transform_square(sq, s) for s in range(8))
+        for sq in range(64)]
+    ids = {r: i for i, r in enumerate(sorted(set(representatives)))}
+    return np.array([ids[r] for r in representatives])
+
+
+SQUARE_CLASSES = _square_classes()
+N_CLASSES = SQUARE_CLASSES.max() + 1
+
+
+def game_positions(engine, seed=None, opening_moves=4):
+    """
+    Play a game of 'engine' against itself after a random opening, and
+    return the positions where a player had a move as (player to move,
+    opponent) bitboards.
+    """
+    from othello.arena import play_game
+    from othello.game import Board, Game
+    from othello.players import Player
+    result = play_game(engine, engine, opening_moves, seed)
+    game = Game(Board(), [Player('black'), Player('white')])
+    positions = list()
+    for move in result['moves']:
+        if move is not None:
+            positions.append((game.board.bits(game.current_player),
+                              game.board.bits(game.other_player)))
+            move = game.board.parse_index(move)
+        game.make_move(move)
+    return positions
+
+
+def labeller(depth=2, exact_empties=10, evaluator=None):
+    """
+    An AI labelling positions with a search to 'depth', see label. It is
+    meant to be reused for many positions, so that its transposition table
+    and evaluator are set up once.
+    """
+    from othello.players import AlphaBetaAI
+    # the evaluation does not depend on the colours, so the player to move
+    # is taken to be black
+    return AlphaBetaAI('black', depth=depth, endgame_empties=exact_empties,
+                       evaluator=evaluator, tt_size=2 ** 20)
+
+
+def label(own, opp, depth=2, exact_empties=10, evaluator=None, ai=None):
+    """
+    The score of the position for the player owning 'own', who is to move:
+    the final disc differential under perfect play with at most
+    'exact_empties' empty squares, otherwise the score of an alpha-beta
+    search to 'depth' with 'evaluator' (the disc difference by default),
+    in which finished games score their disc differential too. The search
+    is made by 'ai', as given by labeller, if given.
+    """
+    from othello.game import Game
+    from othello.players import RESULT_SCALE, Player
+    if ai is None:
+        ai = labeller(depth, exact_empties, evaluator)
+    game = Game.from_position((own, opp, Player.black),
+                              [ai, Player('white')])
+    ai.search(game)
+    score = float(ai.score)
+    if ai.evaluator is not None and abs(score) >= RESULT_SCALE:
+        # the result of a game finished within the search, see AI.utility,
+        # put on the scale of the disc differential
+        score /= RESULT_SCALE
+    return score
+
+
+def _labelled_game(engine, seed, opening_moves, depth, exact_empties,
+                   evaluator):
+    positions = game_positions(engine, seed, opening_moves)
+    ai = labeller(depth, exact_empties, evaluator)
+    records = np.zeros(len(positions), dtype=RECORD)
+    for i, (own, opp) in enumerate(positions):
+        records[i] = (own, opp, label(own, opp, ai=ai))
+    return records
+
+
+def generate(path, games, engine='alphabeta:depth=1', workers=None,
+             opening_moves=8, seed=0, depth=2, exact_empties=10,
+             evaluator=None):
+    """
+    Play and label 'games' self-play games in a pool of 'workers'
+    processes, appending the positions to the dataset file 'path' as each
+    game is finished. Yield the number of positions of each game.
+    """
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'ab') as f, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        if new:
+            f.write(MAGIC)
+        futures = [pool.submit(_labelled_game, engine, seed + i,
+                               opening_moves, depth, exact_empties,
+                               evaluator)
+                   for i in range(games)]
+        for future in as_completed(futures):
+            records = future.result()
+            f.write(records.tobytes())
+            f.flush()
+            yield len(records)
+
+
+def read_dataset(path):
+    """
+    Memory-map the records of the dataset file 'path'.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not a dataset file'.format(path))
+    size = os.path.getsize(path) - len(MAGIC)
+    n = size // RECORD.itemsize
+    if not n:
+        return np.zeros(0, dtype=RECORD)
+    return np.memmap(path, RECORD, 'r', len(MAGIC), (n,))
+
+
+def read_batches(paths, batch_size=4096, shuffle=True, seed=None,
+                 chunk_size=2 ** 18):
+    """
+    Stream the records of the dataset files 'paths' in batches of
+    'batch_size', yielding arrays of (player to move, opponent, label).
+    With 'shuffle', the files are read in chunks of 'chunk_size' records
+    in random order and each chunk is shuffled, so only a chunk at a time
+    is held in memory.
+    """
+    rng = np.random.default_rng(seed)
+    chunks = list()
+    for path in paths:
+        data = read_dataset(path)
+        chunks.extend((data, start)
+                      for start in range(0, len(data), chunk_size))
+    if shuffle:
+        rng.shuffle(chunks)
+    for data, start in chunks:
+        chunk = np.array(data[start:start + chunk_size])
+        if shuffle:
+            rng.shuffle(chunk)
+        for i in range(0, len(chunk), batch_size):
+            batch = chunk[i:i + batch_size]
+            yield (batch['own'], batch['opp'],
+                   batch['label'].astype(np.float64))
+
+
+def square_features(own, opp):
+    """
+    For each position, the number of the player's minus the opponent's
+    tiles in each square class, shape (N, N_CLASSES).
+    """
+    boards = to_boards(own, opp).reshape(-1, 64).astype(np.float64)
+    features = np.zeros((len(boards), N_CLASSES))
+    for c in range(N_CLASSES):
+        features[:, c] = boards[:, SQUARE_CLASSES == c].sum(axis=1)
+    return features
+
+
+def tiles(own, opp):
+    """
+    The number of tiles on the board of each position.
+    """
+    return popcount(np.asarray(own, np.uint64) | np.asarray(opp, np.uint64))
+
+
+def fit_squares(batches, phases=4, l2=1e-3):
+    """
+    Fit one weight per square class and phase by least squares, from the
+    normal equations accumulated over 'batches'. Return the weights of the
+    squares, shape (phases, 64).
+    """
+    a = np.zeros((phases, N_CLASSES, N_CLASSES))
+    b = np.zeros((phases, N_CLASSES))
+    for own, opp, labels in batches:
+        x = square_features(own, opp)
+        phase_of = phase(tiles(own, opp), phases)
+        for p in range(phases):
+            rows = phase_of == p
+            a[p] += x[rows].T @ x[rows]
+            b[p] += x[rows].T @ labels[rows]
+    weights = np.zeros((phases, N_CLASSES))
+    for p in range(phases):
+        weights[p] = np.linalg.solve(a[p] + l2 * np.eye(N_CLASSES), b[p])
+    return weights[:, SQUARE_CLASSES]
+
+
+def fit_patterns(batch_source, evaluator, epochs=4, learning_rate=0.05,
+                 l2=1e-4):
+    """
+    Refine the weights of the PatternEvaluator 'evaluator' in place by
+    mini-batch gradient descent of the squared error over 'epochs' passes
+    of 'batch_source()', a function returning an iterator of batches. The
+    error of each table entry is averaged over the positions that use it
+    in a batch. Yield the mean squared error of each epoch.
+    """
+    weights = evaluator.weights.astype(np.float64).reshape(-1)
+    n = weights.size
+    for _ in range(epochs):
+        total = count = 0
+        for own, opp, labels in batch_source():
+            indices, phases = evaluator.features(own, opp)
+            flat = (phases[:, None] * TABLE_SIZE + indices).ravel()
+            predictions = weights[flat].reshape(indices.shape).sum(axis=1)
+            errors = predictions - labels
+            total += float(errors @ errors)
+            count += len(errors)
+            gradient = np.bincount(flat, np.repeat(errors, indices.shape[1]),
+                                   minlength=n)
+            uses = np.bincount(flat, minlength=n)
+            used = uses > 0
+            weights[used] -= learning_rate * (gradient[used] / uses[used] +
+                                              l2 * weights[used])
+        evaluator.set_weights(weights.reshape(evaluator.phases, TABLE_SIZE))
+        yield total / count if count else 0.0
+
+
+def fit(paths, output, method='sgd', phases=4, epochs=4, batch_size=4096,
+        learning_rate=0.05, seed=0):
+    """
+    Fit a PatternEvaluator to the dataset files 'paths' and save it to
+    'output'. Return the evaluator and the mean squared errors per epoch.
+    """
+    squares = fit_squares(read_batches(paths, batch_size, False), phases)
+    evaluator = PatternEvaluator.from_squares(squares)
+    errors = list()
+    if method == 'sgd':
+        def batch_source():
+            return read_batches(paths, batch_size, True, seed + len(errors))
+        for error in fit_patterns(batch_source, evaluator, epochs,
+                                  learning_rate):
+            errors.append(error)
+    elif method != 'lstsq':
+        raise ValueError('unknown method {!r}'.format(method))
+    evaluator.save(output)
+    return evaluator, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Train the pattern evaluation from self-play games.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    gen = commands.add_parser(
+        'generate', help='play and label games, appending to a dataset')
+    gen.add_argument('dataset', help='dataset file, appended to')
+    gen.add_argument(
+        '-n', '--games', type=int, default=100,
+        help='number of games, default is 100')
+    gen.add_argument(
+        '--engine', default='alphabeta:depth=1',
+        help="engine playing the games, default is 'alphabeta:depth=1'")
+    gen.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help='number of processes, default is one per CPU')
+    gen.add_argument(
+        '--opening-moves', type=int, default=8,
+        help='number of random moves at the start of each game, '
+             'default is 8')
+    gen.add_argument(
+        '--seed', type=int, default=0,
+        help='seed of the first game, default is 0')
+    gen.add_argument(
+        '--depth', type=int, default=2,
+        help='depth of the labelling search, default is 2')
+    gen.add_argument(
+        '--exact', type=int, default=10,
+        help='label positions with at most this many empty squares '
+             'exactly, default is 10')
+    gen.add_argument(
+        '--evaluator', default=None,
+        help='pattern weight file for the labelling search, default is '
+             'the disc difference')
+
+    fit_ = commands.add_parser(
+        'fit', help='fit pattern weights to datasets')
+    fit_.add_argument('datasets', nargs='+', help='dataset files')
+    fit_.add_argument(
+        '-o', '--output', required=True, help='pattern weight file')
+    fit_.add_argument(
+        '--method', choices=('lstsq', 'sgd'), default='sgd',
+        help='least squares square weights only, or gradient descent of '
+             'the pattern tables after them, default is sgd')
+    fit_.add_argument(
+        '--phases', type=int, default=4,
+        help='number of game phases, default is 4')
+    fit_.add_argument(
+        '--epochs', type=int, default=4,
+        help='number of passes over the data, default is 4')
+    fit_.add_argument(
+        '--batch-size', type=int, default=4096,
+        help='positions per mini-batch, default is 4096')
+    fit_.add_argument(
+        '--learning-rate', type=float, default=0.05,
+        help='learning rate, default is 0.05')
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        total = 0
+        for n in generate(args.dataset, args.games, args.engine, args.workers,
+                          args.opening_moves, args.seed, args.depth,
+                          args.exact, args.evaluator):
+            total += n
+        print('{}: {} positions added'.format(args.dataset, total),
+              file=sys.stderr)
+    else:
+        _, errors = fit(args.datasets, args.output, args.method, args.phases,
+                        args.epochs, args.batch_size, args.learning_rate)
+        for epoch, error in enumerate(errors):
+            print('epoch {}: mean squared error {:.3f}'.format(epoch, error),
+                  file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
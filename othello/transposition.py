@@ -0,0 +1,163 @@
+"""
+Zobrist hashing of positions and a fixed-size transposition table.
+"""
+import random
+
+import numpy as np
+
+from othello import bitboard
+
+# random keys for each square and colour, indexed like Board._bits,
+# i.e. _KEYS[1] are the keys of white tiles and _KEYS[-1] of black tiles
+_rng = random.Random(0x07e110)
+_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(3)]
+_KEYS[0] = [0] * 64
+SIDE_KEY = _rng.getrandbits(64)
+
+
+def _byte_tables(keys):
+    """
+    For each of the eight bytes of a bitboard, tabulate the combined key of
+    every possible byte value, so that a bitboard is hashed in eight lookups.
+    """
+    tables = list()
+    for b in range(8):
+        table = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            table[value] = (table[value ^ low] ^
+                            keys[8 * b + low.bit_length() - 1])
+        tables.append(table)
+    return tables
+
+
+_TILE_TABLES = [_byte_tables(keys) for keys in _KEYS]
+# flipping a tile removes one colour and adds the other
+_FLIP_TABLES = _byte_tables([w ^ b for w, b in zip(_KEYS[1], _KEYS[-1])])
+
+
+def _hash_bits(tables, bits):
+    h = 0
+    for table in tables:
+        h ^= table[bits & 0xFF]
+        bits >>= 8
+    return h
+
+
+def tile_key(color, sq):
+    """
+    The key of a single tile of numeric colour 'color' on square 'sq'.
+    """
+    return _KEYS[color][sq]
+
+
+def flip_key(mask):
+    """
+    The combined key change of flipping all tiles in 'mask'.
+    """
+    return _hash_bits(_FLIP_TABLES, mask)
+
+
+def zobrist(white, black):
+    """
+    Compute the hash of a position from scratch.
+    """
+    return (_hash_bits(_TILE_TABLES[1], white) ^
+            _hash_bits(_TILE_TABLES[-1], black))
+
+
+ENTRY = np.dtype([('key', '<u8'), ('depth', 'i1'), ('bound', 'u1'),
+                  ('move', 'i1'), ('score', '<f8'), ('complete', '?')])
+
+
+class TranspositionTable:
+    """
+    A fixed-size hash table of search results, with a memory budget given in
+    bytes. Each bucket holds two entries, the first of which is only replaced
+    by results of at least the same depth while the second is always
+    replaced.
+    """
+
+    EXACT = 0
+    LOWER = 1   # the score is a lower bound, i.e. the search failed high
+    UPPER = 2   # the score is an upper bound, i.e. the search failed low
+
+    NO_MOVE = -1
+    PASS = -2
+
+    def __init__(self, size=16 * 2 ** 20):
+        buckets = 1
+        while 2 * buckets * 2 * ENTRY.itemsize <= size:
+            buckets *= 2
+        self._mask = buckets - 1
+        self._table = np.zeros((buckets, 2), dtype=ENTRY)
+        self.probes = 0
+        self.hits = 0
+
+    def __reduce__(self):
+        # copies and pickles (e.g. for worker processes) get an empty table
+        # of the same size, rather than the contents
+        return TranspositionTable, (self.nbytes,)
+
+    @property
+    def nbytes(self):
+        return self._table.nbytes
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self._table[:] = 0
+        self.reset_stats()
+
+    def probe(self, key):
+        """
+        Look up 'key', returning (depth, bound, score, move, complete) or
+        None if the position is not in the table. The move is given as a
+        numeric (x, y) index, None for a pass, or False if no best move is
+        known.
+        """
+        self.probes += 1
+        bucket = self._table[key & self._mask]
+        for entry in bucket:
+            if entry['key'] == key:
+                self.hits += 1
+                _, depth, bound, move, score, complete = entry.item()
+                return depth, bound, score, self._decode(move), complete
+        return None
+
+    def store(self, key, depth, bound, score, move=False, complete=False):
+        """
+        Store a search result for 'key', where 'move' is the best move found,
+        or False if there is none, and 'complete' tells that the search
+        reached the end of the game in every line, so that the result holds
+        at any depth.
+        """
+        bucket = self._table[key & self._mask]
+        entry = (key, depth, bound, self._encode(move), score, complete)
+        if bucket[0]['key'] == key or depth >= bucket[0]['depth']:
+            if bucket[0]['key'] != key:
+                # demote the old entry to the always-replace slot
+                bucket[1] = bucket[0]
+            bucket[0] = entry
+        else:
+            bucket[1] = entry
+
+    def _encode(self, move):
+        if move is False:
+            return TranspositionTable.NO_MOVE
+        if move is None:
+            return TranspositionTable.PASS
+        return bitboard.square(move)
+
+    def _decode(self, move):
+        if move == TranspositionTable.NO_MOVE:
+            return False
+        if move == TranspositionTable.PASS:
+            return None
+        return bitboard.place(move)
@@ -104,6 +104,13 @@ setup(
     entry_points={
         'console_scripts': [
             'play=othello:play',
+            'othello-arena=othello.arena:main',
+            'othello-bench=othello.bench:main',
+            'othello-book=othello.book:main',
+            'othello-train=othello.train:main',
+            'othello-probcut=othello.probcut:main',
+            'othello-server=othello.server:main',
+            'othello-analyze=othello.analyze:main',
         ],
     },
 
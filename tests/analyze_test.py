@@ -0,0 +1,75 @@
+from unittest import TestCase
+import io
+import json
+import os.path
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.analyze import analyze, analyze_position, main, read_positions
+from othello.bench import MIDGAME
+from othello.game import Board, Game
+from othello.players import AlphaBetaAI, Player
+
+
+class AnalyzeTest(TestCase):
+
+    def test_analyze_in_order(self):
+        lines = list(MIDGAME.values()) * 2
+        results = list(analyze(iter(lines), 'alphabeta:depth=1', workers=2,
+                               window=3))
+        self.assertEqual([r['position'] for r in results], lines)
+        for line, result in zip(lines, results):
+            game = Game.from_string(line)
+            ai = AlphaBetaAI(str(game.current_player), depth=1)
+            move = ai.search(game)
+            self.assertEqual(result['move'],
+                             game.board.parse_numeric_index(move))
+            self.assertEqual(result['score'], ai.score)
+            self.assertEqual(result['depth'], 1)
+
+    def test_pass(self):
+        ais = {Player.black: AlphaBetaAI('black', depth=2),
+               Player.white: AlphaBetaAI('white', depth=2)}
+        start = Game(Board(), [Player('black'), Player('white')]).to_string()
+        self.assertIsNotNone(analyze_position(start, ais)['score'])
+        # black has no move, and the results of the search of the start
+        # position are not reported again
+        line = ('--XXXXOXXXXXXOOXXOXOOOOXXOXOOOOXXOOOXOOXXOXOOXOXXOOOOOXXXOOX'
+                'XXXX X')
+        result = analyze_position(line, ais)
+        self.assertEqual(result['move'], 'pass')
+        self.assertIsNone(result['score'])
+        self.assertIsNone(result['depth'])
+        self.assertIsNone(result['pv'])
+        ai = ais[Player.black]
+        self.assertIsNone(ai.search(Game.from_string(line, [ai, Player(
+            'white')])))
+        self.assertIsNone(ai.score)
+        self.assertEqual(ai.pv, ())
+        self.assertIsNone(ai.depth_reached)
+
+    def test_main(self):
+        lines = ['# a comment', '', MIDGAME['mid52'], 'not a position']
+        self.assertEqual(list(read_positions([io.StringIO('\n'.join(lines))])),
+                         lines[2:])
+        with tempfile.TemporaryDirectory() as directory:
+            positions = os.path.join(directory, 'positions.txt')
+            output = os.path.join(directory, 'results.jsonl')
+            with open(positions, 'w') as f:
+                f.write('\n'.join(lines))
+            main([positions, '-e', 'alphabeta:depth=0', '-w', '1',
+                  '-o', output])
+            with open(output) as f:
+                results = [json.loads(line) for line in f]
+        self.assertEqual(len(results), 2)
+        game = Game.from_string(MIDGAME['mid52'])
+        self.assertIn(game.board.parse_index(results[0]['move']),
+                      game.legal_moves())
+        self.assertIn('error', results[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+from unittest import TestCase
+import json
+import math
+import os.path
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.arena import Tournament, elo, main, parse_engine, play_game
+from othello.players import AlphaBetaAI, MiniMaxAI
+
+
+class ArenaTest(TestCase):
+
+    def test_parse_engine(self):
+        self.assertEqual(parse_engine('minimax'), (MiniMaxAI, {}))
+        self.assertEqual(
+            parse_engine('alphabeta:depth=3,time_limit=0.5'),
+            (AlphaBetaAI, {'depth': 3, 'time_limit': 0.5}))
+        self.assertRaises(ValueError, parse_engine, 'random')
+
+    def test_elo(self):
+        self.assertEqual(elo([0.5, 0.5])[0], 0)
+        rating, margin = elo([1, 1, 1, 0])
+        self.assertAlmostEqual(rating, 400 * math.log10(3))
+        self.assertGreater(margin, 0)
+        self.assertEqual(elo([1, 1])[0], math.inf)
+
+    def test_play_game(self):
+        result = play_game('alphabeta:depth=0', 'minimax:depth=0',
+                           opening_moves=2, seed=3)
+        # every move but a pass adds a tile to the four starting tiles
+        self.assertEqual(sum(1 for m in result['moves'] if m is not None),
+                         result['black_tiles'] + result['white_tiles'] - 4)
+        self.assertEqual(play_game('alphabeta:depth=0', 'minimax:depth=0',
+                                   opening_moves=2, seed=3), result)
+
+    def test_tournament(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'results.jsonl')
+            main(['alphabeta:depth=1', 'minimax:depth=0', '-n', '4',
+                  '-w', '2', '-o', path])
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 5)
+        summary = lines[-1]
+        self.assertEqual(summary['type'], 'summary')
+        self.assertEqual(summary['games'], 4)
+        self.assertEqual(summary['wins'] + summary['draws'] +
+                         summary['losses'], 4)
+        # every opening is played with both colours
+        seeds = sorted((r['seed'], r['black']) for r in lines[:-1])
+        self.assertEqual([s for s, _ in seeds], [0, 0, 1, 1])
+        self.assertNotEqual(seeds[0][1], seeds[1][1])
+        self.assertRaises(ValueError, Tournament, 'random', 'minimax')
+
+
+if __name__ == '__main__':
+    unittest.main()
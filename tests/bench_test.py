@@ -0,0 +1,62 @@
+from unittest import TestCase
+import json
+import os.path
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.bench import (ENDGAME, MIDGAME, benchmarks, branching_factor,
+                           main, nodes_per_depth, run)
+from othello.game import Game
+
+
+class BenchTest(TestCase):
+
+    def test_positions(self):
+        for name, position in list(MIDGAME.items()) + list(ENDGAME.items()):
+            game = Game.from_string(position)
+            self.assertEqual(game.to_string(), position)
+            self.assertTrue(game.legal_moves())
+            self.assertIn(str(game.nbr_of_empty_tiles()), name)
+
+    def test_branching_factor(self):
+        self.assertIsNone(branching_factor([]))
+        self.assertIsNone(branching_factor([(0, 0.1, 10)]))
+        iterations = [(0, 0.1, 10), (1, 0.5, 40), (2, 0.9, 130)]
+        self.assertEqual(nodes_per_depth(iterations), {0: 10, 1: 30, 2: 90})
+        self.assertEqual(branching_factor(iterations), 3)
+
+    def test_run(self):
+        result = run('mid52', MIDGAME['mid52'], 'alphabeta:depth=2')
+        self.assertEqual(result['depth'], 2)
+        self.assertEqual(sorted(result['time_to_depth']), ['0', '1', '2'])
+        self.assertEqual(sum(result['nodes_per_depth'].values()),
+                         result['nodes'])
+        self.assertGreater(result['nps'], 0)
+        self.assertGreater(result['process_peak_rss'], 0)
+
+        result = run('end12b', ENDGAME['end12b'],
+                     'alphabeta:endgame_empties=12')
+        self.assertEqual(result['depth'], 12)
+        self.assertEqual(list(result['time_to_depth']), ['12'])
+
+    def test_benchmarks(self):
+        tasks = list(benchmarks(('a', 'b'), ('c',), ['mid52', 'end12a']))
+        self.assertEqual([(name, engine) for name, _, engine in tasks],
+                         [('mid52', 'a'), ('mid52', 'b'), ('end12a', 'c')])
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.jsonl')
+            main(['-e', 'minimax:depth=1', '-p', 'mid46', '-o', path])
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['position'], 'mid46')
+        self.assertIn('python', lines[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
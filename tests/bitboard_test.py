@@ -0,0 +1,90 @@
+from unittest import TestCase
+import random
+import unittest
+
+import sys
+import os.path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello import bitboard
+
+
+def naive_flips(own, opp, sq):
+    """
+    Walk the eight directions tile by tile, like the original implementation.
+    """
+    x0, y0 = divmod(sq, 8)
+    if (own | opp) >> sq & 1:
+        return 0
+    flipped = 0
+    for dx, dy in ((0, 1), (1, 1), (1, 0), (1, -1), (0, -1),
+                   (-1, -1), (-1, 0), (-1, 1)):
+        x, y = x0 + dx, y0 + dy
+        f = 0
+        while 0 <= x < 8 and 0 <= y < 8 and opp >> (8 * x + y) & 1:
+            f |= 1 << (8 * x + y)
+            x, y = x + dx, y + dy
+        if 0 <= x < 8 and 0 <= y < 8 and own >> (8 * x + y) & 1:
+            flipped |= f
+    return flipped
+
+
+def random_position(rng):
+    own = opp = 0
+    for sq in range(64):
+        r = rng.random()
+        if r < 0.35:
+            own |= 1 << sq
+        elif r < 0.7:
+            opp |= 1 << sq
+    return own, opp
+
+
+class BitboardTest(TestCase):
+
+    def test_starting_moves(self):
+        black = (1 << 28) | (1 << 35)   # 4e, 5d
+        white = (1 << 27) | (1 << 36)   # 4d, 5e
+        moves = bitboard.legal_moves(black, white)
+        self.assertEqual(sorted(bitboard.place(sq)
+                                for sq in bitboard.squares(moves)),
+                         [(2, 3), (3, 2), (4, 5), (5, 4)])
+
+    def test_against_naive(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            own, opp = random_position(rng)
+            moves = 0
+            for sq in range(64):
+                f = naive_flips(own, opp, sq)
+                self.assertEqual(bitboard.flips(own, opp, sq), f)
+                if f:
+                    moves |= 1 << sq
+            self.assertEqual(bitboard.legal_moves(own, opp), moves)
+
+    def test_move_features(self):
+        rng = random.Random(1)
+        for sq in (0, 9, 63):
+            self.assertEqual(bitboard.neighbours(1 << sq),
+                             bitboard.NEIGHBOURS[sq])
+        for _ in range(200):
+            own, opp = random_position(rng)
+            empty = ~(own | opp) & bitboard.FULL
+            next_to_empty = bitboard.neighbours(empty)
+            self.assertEqual(bitboard.move_features(own, opp), (
+                bitboard.legal_moves(own, opp),
+                bitboard.legal_moves(opp, own),
+                bitboard.neighbours(opp) & empty,
+                bitboard.neighbours(own) & empty,
+                own & next_to_empty,
+                opp & next_to_empty))
+
+    def test_popcount(self):
+        self.assertEqual(bitboard.popcount(0), 0)
+        self.assertEqual(bitboard.popcount(bitboard.FULL), 64)
+        self.assertEqual(bitboard.popcount(bitboard.NOT_A), 56)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from unittest import TestCase
+import json
+import os.path
+import pickle
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.arena import play_game
+from othello.book import BookBuilder, OpeningBook, main
+from othello.game import Board, Game
+from othello.players import AlphaBetaAI, Player
+
+
+class OpeningBookTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'book.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_build_and_lookup(self):
+        board = Board()
+        builder = BookBuilder(plies=4)
+        # d3 c3 and f5 f6 are equivalent openings
+        builder.add_game([board.parse_index(m) for m in ('d3', 'c3')], 10)
+        builder.add_game([board.parse_index(m) for m in ('f5', 'f6')], -4)
+        builder.write(self.path)
+        book = OpeningBook(self.path)
+        self.assertEqual(len(book), 2)
+
+        game = Game(Board(), [Player('black'), Player('white')])
+        (move, games, mean), = book.entries(game.position())
+        self.assertEqual((games, mean), (2, 3.0))
+        self.assertIn(move, game.legal_moves())
+        self.assertEqual(book.lookup(game), move)
+
+        # the replies are found in both orientations
+        game.make_move(board.parse_index('d3'))
+        self.assertEqual(book.lookup(game), board.parse_index('c3'))
+        game.undo_move()
+        game.make_move(board.parse_index('f5'))
+        self.assertEqual(book.lookup(game), board.parse_index('f6'))
+        game.make_move(board.parse_index('f6'))
+        self.assertIsNone(book.lookup(game))
+
+        self.assertEqual(len(pickle.loads(pickle.dumps(book))), 2)
+        self.assertIsNone(OpeningBook(self.path, min_games=3).lookup(
+            Game(Board(), [Player('black'), Player('white')])))
+
+    def test_grow(self):
+        result = play_game('alphabeta:depth=0', 'alphabeta:depth=0', 2, 1)
+        results = os.path.join(self.directory.name, 'results.jsonl')
+        with open(results, 'w') as f:
+            f.write(json.dumps(result) + '\n')
+            f.write(json.dumps({'type': 'summary'}) + '\n')
+        main([self.path, results, '--plies', '6'])
+        self.assertEqual(OpeningBook(self.path).games.sum(), 6)
+        main([self.path, results, '--plies', '6'])
+        book = OpeningBook(self.path)
+        self.assertEqual(len(book), 6)
+        self.assertEqual(book.games.sum(), 12)
+
+        game = Game(Board(), [AlphaBetaAI('black', book=self.path),
+                              Player('white')])
+        ai = game.current_player
+        move = ai.search(game)
+        self.assertIn(move, game.legal_moves())
+        self.assertEqual(ai._expanded_states, 0)
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a book')
+        self.assertRaises(ValueError, OpeningBook, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
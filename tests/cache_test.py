@@ -0,0 +1,107 @@
+from unittest import TestCase
+import os.path
+import pickle
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.cache import PositionCache
+from othello.game import Board, Game
+from othello.players import AlphaBetaAI, Player
+from othello.transposition import TranspositionTable
+
+
+class PositionCacheTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_symmetric_positions_share_entries(self):
+        board = Board()
+        cache = PositionCache(self.path)
+        game = Game(board, [Player('black'), Player('white')])
+        game.make_move(board.parse_index('d3'))
+        self.assertIsNone(cache.lookup(game.position()))
+        cache.store(game.position(), 3, TranspositionTable.EXACT, 1.5,
+                    board.parse_index('c5'))
+        # f5 is the image of d3 under a symmetry, and d6 that of c5
+        other = Game(Board(), [Player('black'), Player('white')])
+        other.make_move(board.parse_index('f5'))
+        depth, bound, score, move = cache.lookup(other.position())
+        self.assertEqual((depth, bound, score), (3, 0, 1.5))
+        self.assertEqual(move, board.parse_index('d6'))
+        self.assertIn(move, other.legal_moves())
+        # shallower results do not replace deeper ones
+        cache.store(game.position(), 1, TranspositionTable.EXACT, 0.0,
+                    board.parse_index('e3'))
+        self.assertEqual(cache.lookup(game.position())[0], 3)
+        self.assertEqual(len(pickle.loads(pickle.dumps(cache))), 1)
+
+    def test_eviction(self):
+        cache = PositionCache(self.path, max_entries=2, evict_interval=1)
+        game = Game(Board(), [Player('black'), Player('white')])
+        positions = list()
+        for _ in range(4):
+            move = game.legal_moves()[0]
+            positions.append(game.position())
+            cache.store(game.position(), 1, TranspositionTable.EXACT, 0.0,
+                        move)
+            game.make_move(move)
+            time.sleep(0.01)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.lookup(positions[0]))
+        self.assertIsNotNone(cache.lookup(positions[3]))
+        cache.max_age = 0
+        cache.evict()
+        self.assertEqual(len(cache), 0)
+
+    def test_ai_reuses_results(self):
+        game = Game(Board(), [Player('black'), Player('white')])
+        first = AlphaBetaAI('black', depth=3, cache=self.path)
+        move = first.search(game)
+        second = AlphaBetaAI('black', depth=3, cache=self.path)
+        self.assertEqual(second.search(game), move)
+        self.assertEqual(second.score, first.score)
+        self.assertEqual(second._expanded_states, 0)
+        # a deeper search is not answered from the cache
+        deeper = AlphaBetaAI('black', depth=4, cache=self.path)
+        deeper.search(game)
+        self.assertGreater(deeper._expanded_states, 0)
+        self.assertEqual(deeper.cache.lookup(game.position())[0], 4)
+
+    def test_lookups_do_not_write(self):
+        game = Game(Board(), [Player('black'), Player('white')])
+        writer = PositionCache(self.path)
+        writer.store(game.position(), 2, TranspositionTable.EXACT, 0.0,
+                     game.legal_moves()[0])
+        writer.close()
+        reader = PositionCache(self.path, timeout=0)
+        ai = AlphaBetaAI('black', depth=2, cache=reader)
+        # another process holds the write lock
+        lock = sqlite3.connect(self.path, isolation_level=None)
+        lock.execute('BEGIN IMMEDIATE')
+        try:
+            self.assertIsNotNone(reader.lookup(game.position()))
+            with self.assertRaises(sqlite3.OperationalError):
+                reader.store(game.position(), 3, TranspositionTable.EXACT,
+                             0.0, game.legal_moves()[0])
+            # the AI searches on without storing its result
+            ai.depth = 3
+            self.assertIn(ai.search(game), game.legal_moves())
+            self.assertEqual(ai.depth_reached, 3)
+        finally:
+            lock.execute('ROLLBACK')
+            lock.close()
+        reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+from unittest import TestCase
+import unittest
+
+import sys
+import os.path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.endgame import EndgameSolver, solve
+from othello.players import AlphaBetaAI
+from tests.players_test import endgame
+
+
+class EndgameSolverTest(TestCase):
+
+    def test_agrees_with_alpha_beta(self):
+        for seed in range(4):
+            game = endgame(8, seed)
+            ai = AlphaBetaAI(str(game.current_player), depth=20,
+                             endgame_empties=0)
+            ai.search(game)
+            score, move = solve(game)
+            self.assertEqual(score, ai.score)
+            self.assertIn(move, game.legal_moves())
+            # the move is perfect: the opponent cannot do better after it
+            game.make_move(move)
+            self.assertEqual(-solve(game)[0], score)
+
+    def test_game_over(self):
+        game = endgame(0)
+        black = game.board.bits(game.players[0])
+        white = game.board.bits(game.players[1])
+        self.assertEqual(EndgameSolver().solve(black, white),
+                         (game.nbr_of_tiles(game.players[0]) -
+                          game.nbr_of_tiles(game.players[1]), None))
+
+    def test_used_by_ai(self):
+        game = endgame(10, 1)
+        ai = AlphaBetaAI(str(game.current_player), endgame_empties=10)
+        move = ai.search(game)
+        self.assertEqual((ai.score, move), solve(game))
+        self.assertEqual(ai.depth_reached, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+from unittest import TestCase
+import unittest
+
+import numpy as np
+
+import sys
+import os.path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello import bitboard
+from othello.evaluation import (Evaluator, MoveCache, square_weights,
+                                to_bits, to_boards)
+from othello.game import Board, Game
+from othello.players import RESULT_SCALE, AlphaBetaAI, MiniMaxAI, Player
+from tests.players_test import endgame
+
+
+def positions(n):
+    """
+    The player to move and the opponent's bitboards in 'n' random games.
+    """
+    own, opp = list(), list()
+    for seed in range(n):
+        game = endgame(60 - seed % 50, seed)
+        own.append(game.board.bits(game.current_player))
+        opp.append(game.board.bits(game.other_player))
+    return own, opp
+
+
+def minimax(ai, game, depth):
+    if depth < 0 or game.is_terminal():
+        return ai.utility(game)
+    values = list()
+    for a in game.legal_moves() or [None]:
+        game.make_move(a)
+        values.append(minimax(ai, game, depth - 1))
+        game.undo_move()
+    if int(game.current_player) == ai.player:
+        return max(values)
+    return min(values)
+
+
+class EvaluatorTest(TestCase):
+
+    def test_square_weights(self):
+        weights = square_weights(edge_weight=3, corner_weight=10)
+        self.assertEqual(weights[0, 0], 10)
+        self.assertEqual(weights[7, 3], 3)
+        self.assertEqual(weights[4, 4], 2)
+
+    def test_conversions(self):
+        own, opp = positions(20)
+        boards = to_boards(own, opp)
+        self.assertEqual(boards.shape, (20, 8, 8))
+        self.assertEqual(boards.dtype, np.int8)
+        self.assertEqual(boards[0, 3, 4], 1 if own[0] >> 28 & 1 else -1)
+        back_own, back_opp = to_bits(boards)
+        self.assertEqual([int(b) for b in back_own], own)
+        self.assertEqual([int(b) for b in back_opp], opp)
+
+    def test_batch_matches_single(self):
+        own, opp = positions(30)
+        evaluator = Evaluator(disc_weight=1, square_weight=0.5,
+                              mobility_weight=2)
+        scores = evaluator.evaluate(np.array(own, dtype=np.uint64),
+                                    np.array(opp, dtype=np.uint64))
+        weights = square_weights()
+        for i, (o, p) in enumerate(zip(own, opp)):
+            board = to_boards([o], [p])[0]
+            expected = (
+                bitboard.popcount(o) - bitboard.popcount(p) +
+                0.5 * np.sum(board * weights) +
+                2 * (bitboard.popcount(bitboard.legal_moves(o, p)) -
+                     bitboard.popcount(bitboard.legal_moves(p, o))))
+            self.assertAlmostEqual(scores[i], expected)
+        self.assertTrue(np.allclose(
+            evaluator.evaluate_boards(to_boards(own, opp)), scores))
+
+    def test_mobility_and_frontier(self):
+        potential = Evaluator(disc_weight=0, square_weight=0,
+                              mobility_weight=0, potential_mobility_weight=1)
+        frontier = Evaluator(disc_weight=0, square_weight=0,
+                             mobility_weight=0, frontier_weight=1)
+        game = endgame(60)
+        # 10 empty squares are next to the white tiles, and 10 to the black
+        self.assertEqual(potential.score(game.board, -1), 0)
+        self.assertEqual(frontier.score(game.board, -1), 0)
+        game.make_move(game.legal_moves()[0])
+        # black has 4 tiles and white 1, all next to empty squares
+        self.assertEqual(frontier.score(game.board, -1), 3)
+        self.assertEqual(frontier.evaluate([game.board.bits(-1)],
+                                           [game.board.bits(1)])[0], 3)
+
+    def test_single_matches_batch(self):
+        evaluator = Evaluator(disc_weight=1, square_weight=0.5,
+                              mobility_weight=2, potential_mobility_weight=1,
+                              frontier_weight=-0.5, move_cache=True)
+        for seed in range(20):
+            game = endgame(60 - 2 * seed, seed)
+            board = game.board
+            expected = evaluator.evaluate([board.bits(1)], [board.bits(-1)])
+            self.assertAlmostEqual(evaluator.score(board, 1), expected[0])
+            evaluator.attach(game)
+            self.assertIsInstance(board.move_cache, MoveCache)
+            for _ in range(2):
+                self.assertAlmostEqual(evaluator.score(board, 1), expected[0])
+            self.assertEqual(board.move_cache.hits, 1)
+            moves = game.legal_moves()
+            board.set_move_cache(None)
+            self.assertEqual(moves, game.legal_moves())
+
+    def test_frontier_batches(self):
+        for cls in (MiniMaxAI, AlphaBetaAI):
+            for depth in (0, 1, 2):
+                game = endgame(50, depth)
+                ai = cls(str(game.current_player), depth=depth,
+                         evaluator=True)
+                ai.search(game)
+                self.assertAlmostEqual(ai.score, minimax(ai, game, depth))
+
+    def test_finished_games(self):
+        # black wipes out white by playing a3, its only move
+        game = Game.from_position(
+            (1 << 0 | 1 << 10, 1 << 1, Player.black),
+            [Player('black'), Player('white')])
+        ai = AlphaBetaAI('black', depth=1, endgame_empties=0,
+                         evaluator=True)
+        moves, values, over = ai.frontier_values(game)
+        wipeout = moves.index((0, 2))
+        self.assertEqual(values[wipeout], 4 * RESULT_SCALE)
+        self.assertEqual(list(over), [m == (0, 2) for m in moves])
+        # a node is only cut off if some of its children are not finished
+        ai.new_iteration(1)
+        self.assertEqual(ai.frontier_value(game, 1, True), 4 * RESULT_SCALE)
+        self.assertEqual(ai._depth_cuts, 0)
+        ai.frontier_value(Game(Board(), game.players), 1, True)
+        self.assertEqual(ai._depth_cuts, 1)
+        self.assertEqual(values.max(), values[wipeout])
+        self.assertEqual(ai.search(game), (0, 2))
+        game.make_move((0, 2))
+        self.assertTrue(game.is_terminal())
+        self.assertEqual(ai.utility(game), 4 * RESULT_SCALE)
+
+
+if __name__ == '__main__':
+    unittest.main()
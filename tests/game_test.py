@@ -1,4 +1,5 @@
 from unittest import TestCase
+import random
 import unittest
 
 import sys
@@ -8,6 +9,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from othello.game import *
 from othello.players import Player
+from othello import transposition
 
 
 class GameTest(TestCase):
@@ -168,5 +170,95 @@ class GameTest(TestCase):
         self.assertEqual(game.nbr_of_tiles(white), 1)
         self.assertEqual(game.nbr_of_tiles(black), 4)
 
+    def test_make_and_undo_move(self):
+        board = Board()
+        white = Player('white')
+        black = Player('black')
+        game = Game(board, [black, white])
+        start = board.to_array()
+
+        game.make_move(board.parse_index('d3'))
+        self.assertIs(game.current_player, white)
+        self.assertEqual(game.nbr_of_tiles(black), 4)
+        game.make_move(board.parse_index('c3'))
+        game.make_move(None)    # black passes
+        self.assertIs(game.current_player, white)
+        self.assertRaises(ValueError, game.make_move, board.parse_index('a1'))
+
+        game.undo_move()
+        self.assertIs(game.current_player, black)
+        game.undo_move()
+        game.undo_move()
+        self.assertIs(game.current_player, black)
+        self.assertTrue((board.to_array() == start).all())
+
+    def test_incremental_hash(self):
+        board = Board()
+        white = Player('white')
+        black = Player('black')
+        game = Game(board, [black, white])
+        start = game.hash
+        for move in ('d3', 'c3', 'c4', 'e3'):
+            game.make_move(board.parse_index(move))
+            self.assertEqual(
+                board.hash, transposition.zobrist(board.bits(white),
+                                                  board.bits(black)))
+        other = Game(Board(), [Player('black'), Player('white')])
+        for move in ('d3', 'c3'):
+            other.move(other.board.parse_index(move))
+            other.swap_players()
+        for move in ('c4', 'e3'):
+            flips = other.get_valid_flips(other.board.parse_index(move))
+            other.board[other.board.parse_index(move)] = int(
+                other.current_player)
+            other.flip_tiles(flips)
+            other.swap_players()
+        self.assertEqual(game.hash, other.hash)
+        for _ in range(4):
+            game.undo_move()
+        self.assertEqual(game.hash, start)
+        game.swap_players()
+        self.assertNotEqual(game.hash, start)
+
+    def test_tile_counts(self):
+        board = Board()
+        white = Player('white')
+        black = Player('black')
+        game = Game(board, [black, white])
+        rng = random.Random(1)
+        for _ in range(40):
+            moves = game.legal_moves()
+            game.make_move(rng.choice(moves) if moves else None)
+            array = board.to_array()
+            self.assertEqual(array.dtype, np.int8)
+            self.assertEqual(game.nbr_of_tiles(white), np.sum(array == 1))
+            self.assertEqual(game.nbr_of_tiles(black), np.sum(array == -1))
+            self.assertEqual(game.nbr_of_empty_tiles(), np.sum(array == 0))
+            self.assertEqual(board.sum(), array.sum())
+        for _ in range(40):
+            game.undo_move()
+        self.assertEqual(game.nbr_of_tiles(white), 2)
+        self.assertEqual(game.nbr_of_empty_tiles(), 60)
+
+    def test_position_strings(self):
+        game = Game(Board(), [Player('black'), Player('white')])
+        start = game.to_string()
+        self.assertEqual(start, '-' * 27 + 'OX------XO' + '-' * 27 + ' X')
+        game.make_move(game.board.parse_index('d3'))
+        other = Game.from_string(game.to_string().replace('-', '.'))
+        self.assertEqual(other.position(), game.position())
+        self.assertEqual(other.to_string()[-1], 'O')
+        self.assertEqual(Game.from_string(start[:64]).to_string(), start)
+        for invalid in ('', start[:63], start[:64] + ' Z', 'A' * 64):
+            self.assertRaises(ValueError, Game.from_string, invalid)
+
+    def test_slots(self):
+        board = Board()
+        game = Game(board, [Player('black'), Player('white')])
+        for obj in (board, game, game.current_player):
+            self.assertFalse(hasattr(obj, '__dict__'))
+        self.assertRaises(ValueError, Player, 'red')
+
+
 if __name__ == '__main__':
     unittest.main()
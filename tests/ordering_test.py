@@ -0,0 +1,58 @@
+from unittest import TestCase
+import unittest
+
+import sys
+import os.path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.ordering import MoveOrderer
+from othello.players import AlphaBetaAI
+from tests.players_test import endgame
+
+
+class MoveOrdererTest(TestCase):
+
+    def test_static_order(self):
+        orderer = MoveOrderer()
+        moves = [(1, 1), (3, 2), (0, 7), (0, 3)]
+        orderer.order(moves, 0, 1)
+        self.assertEqual(moves, [(0, 7), (0, 3), (3, 2), (1, 1)])
+
+    def test_hash_move_and_killers(self):
+        orderer = MoveOrderer()
+        orderer.cutoff((1, 1), 2, 3, 1, 1)
+        orderer.cutoff((3, 2), 2, 3, 1, 0)
+        moves = [(0, 0), (1, 1), (3, 2), (5, 5)]
+        orderer.order(moves, 2, 1, hash_move=(5, 5))
+        self.assertEqual(moves, [(5, 5), (3, 2), (1, 1), (0, 0)])
+        # killers are kept per ply, and history per player
+        orderer.order(moves, 1, -1)
+        self.assertEqual(moves[0], (0, 0))
+        self.assertEqual(orderer.cutoffs, 2)
+        self.assertEqual(orderer.first_move_cutoff_rate, 0.5)
+
+    def test_history(self):
+        orderer = MoveOrderer(killers=0, static=False)
+        orderer.cutoff((4, 4), 5, 3, -1, 2)
+        orderer.cutoff((2, 2), 5, 1, -1, 2)
+        moves = [(2, 2), (6, 6), (4, 4)]
+        self.assertEqual(orderer.order(list(moves), 0, -1),
+                         [(4, 4), (2, 2), (6, 6)])
+        self.assertEqual(orderer.order(list(moves), 0, 1), moves)
+
+    def test_fewer_nodes(self):
+        expanded = dict()
+        for ordering in (False, True):
+            expanded[ordering] = 0
+            for seed in range(3):
+                game = endgame(48, seed)
+                ai = AlphaBetaAI(str(game.current_player), depth=3,
+                                 move_ordering=ordering)
+                ai.search(game)
+                expanded[ordering] += ai._expanded_states
+        self.assertLess(expanded[True], expanded[False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from unittest import TestCase
+import unittest
+
+import sys
+import os.path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.game import Game
+from othello.players import MiniMaxAI, AlphaBetaAI, PVSAI
+from tests.players_test import endgame
+
+
+class RootSplitterTest(TestCase):
+
+    def test_position_round_trip(self):
+        game = endgame(40)
+        copy = Game.from_position(game.position())
+        self.assertEqual(copy.position(), game.position())
+        self.assertEqual(copy.hash, game.hash)
+        self.assertEqual(copy.legal_moves(), game.legal_moves())
+
+    def test_same_result_as_serial(self):
+        for cls in (MiniMaxAI, AlphaBetaAI, PVSAI):
+            game = endgame(50)
+            color = str(game.current_player)
+            serial = cls(color, depth=2)
+            parallel = cls(color, depth=2, workers=2)
+            try:
+                move = parallel.search(game)
+            finally:
+                parallel.close()
+            self.assertEqual(move, serial.search(game))
+            self.assertEqual(parallel.score, serial.score)
+            self.assertEqual(parallel.depth_reached, 2)
+            self.assertGreater(parallel._expanded_states, 0)
+
+    def test_alpha_bounds_worse_moves(self):
+        game = endgame(44)
+        for cls in (AlphaBetaAI, PVSAI):
+            ai = cls(str(game.current_player), depth=3, tt_size=0)
+            scores = [ai.score_move(game, a, 3) for a in game.legal_moves()]
+            best = max(scores)
+            for a, score in zip(game.legal_moves(), scores):
+                ai._expanded_states = 0
+                ai.score_move(game, a, 3)
+                full = ai._expanded_states
+                ai._expanded_states = 0
+                bound = ai.score_move(game, a, 3, best)
+                if score < best:
+                    self.assertLessEqual(bound, best)
+                    self.assertLessEqual(ai._expanded_states, full)
+                else:
+                    self.assertEqual(bound, score)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+from unittest import TestCase
+import os.path
+import random
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.evaluation import Evaluator
+from othello.game import Board, Game
+from othello.patterns import (GROUPS, INSTANCES, TABLE_SIZE, PatternEvaluator,
+                              PatternIndices)
+from othello.players import AlphaBetaAI, Player
+from tests.evaluation_test import positions
+
+
+class PatternTest(TestCase):
+
+    def test_instances(self):
+        self.assertEqual([(name, n) for name, _, n, _, _ in GROUPS], [
+            ('edge', 4), ('corner3x3', 4), ('corner2x5', 8),
+            ('diagonal8', 2), ('diagonal7', 4), ('diagonal6', 4),
+            ('diagonal5', 4), ('diagonal4', 4)])
+        covered = set(sq for instance, _ in INSTANCES for sq in instance)
+        self.assertEqual(covered, set(range(64)))
+
+    def test_square_weights(self):
+        # the initial weights give the weighted-square score
+        patterns = PatternEvaluator.from_square_weights()
+        squares = Evaluator(disc_weight=0, mobility_weight=0)
+        own, opp = positions(20)
+        np.testing.assert_allclose(patterns.evaluate(own, opp),
+                                   squares.evaluate(own, opp), atol=1e-3)
+
+    def test_incremental(self):
+        rng = random.Random(2)
+        evaluator = PatternEvaluator(
+            np.random.RandomState(0).randn(3, TABLE_SIZE))
+        game = Game(Board(), [Player('black'), Player('white')])
+        evaluator.attach(game)
+        board = game.board
+        for _ in range(40):
+            moves = game.legal_moves()
+            game.make_move(rng.choice(moves) if moves else None)
+            np.testing.assert_array_equal(
+                board.patterns.indices,
+                PatternIndices(board.bits(1), board.bits(-1)).indices)
+            for player in (1, -1):
+                self.assertAlmostEqual(
+                    evaluator.score(board, player),
+                    evaluator.evaluate(board.bits(player),
+                                       board.bits(-player))[0], places=3)
+        for _ in range(40):
+            game.undo_move()
+        np.testing.assert_array_equal(
+            board.patterns.indices,
+            PatternIndices(board.bits(1), board.bits(-1)).indices)
+
+    def test_save_and_load(self):
+        evaluator = PatternEvaluator(
+            np.random.RandomState(1).randn(2, TABLE_SIZE))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'weights.bin')
+            evaluator.save(path)
+            self.assertEqual(os.path.getsize(path), 16 + 8 * TABLE_SIZE)
+            loaded = PatternEvaluator.load(path)
+            np.testing.assert_array_equal(loaded.weights, evaluator.weights)
+
+            ai = AlphaBetaAI('black', depth=2, evaluator=path)
+            game = Game(Board(), [ai, Player('white')])
+            self.assertIn(ai.search(game), game.legal_moves())
+
+            with open(path, 'r+b') as f:
+                f.truncate(100)
+            self.assertRaises(ValueError, PatternEvaluator.load, path)
+        self.assertRaises(ValueError, PatternEvaluator, np.zeros((2, 10)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,19 @@
 import unittest
+import random
 import sys
+import time
 import os.path
 
+import numpy as np
+
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from collections import OrderedDict
 from copy import deepcopy
 from unittest import TestCase
-from othello.players import MiniMaxAI, AlphaBetaAI, Player
+from othello.players import MiniMaxAI, AlphaBetaAI, PVSAI, Player
 from othello.game import Board, Game
+from othello.transposition import TranspositionTable
 
 
 class TestGame:
@@ -30,6 +35,7 @@ class TestGame:
             ('a2', OrderedDict([('c1', 'x'), ('c2', 'x'), ('c3', 'x')])),
             ('a3', OrderedDict([('d1', 'x'), ('d2', 'x'), ('d3', 'x')])),
         ])
+        self.history = list()
 
     @property
     def board(self):
@@ -40,6 +46,13 @@ class TestGame:
         self.state = place
         self.states = self.states[place]
 
+    def make_move(self, place):
+        self.history.append((self.state, self.states))
+        self.move(place)
+
+    def undo_move(self):
+        self.state, self.states = self.history.pop()
+
     def legal_moves(self):
         try:
             return list(self.states.keys())
@@ -93,6 +106,138 @@ class MiniMaxAITest(TestCase):
         self.assertEqual(ai.search(game), (3, 7))
 
 
+def endgame(empties, seed=0):
+    """
+    Play random moves from the starting position until 'empties' tiles are
+    left unoccupied.
+    """
+    rng = random.Random(seed)
+    game = Game(Board(), [Player('black'), Player('white')])
+    while game.nbr_of_empty_tiles() > empties and not game.is_terminal():
+        moves = game.legal_moves()
+        game.make_move(rng.choice(moves) if moves else None)
+    return game
+
+
+class AlphaBetaAITest(TestCase):
+
+    def test_transposition_table(self):
+        game = endgame(9)
+        with_tt = AlphaBetaAI(color=str(game.current_player),
+                              endgame_empties=0)
+        without_tt = AlphaBetaAI(color=str(game.current_player), tt_size=0,
+                                 endgame_empties=0)
+        with_tt.search(game)
+        without_tt.search(game)
+        self.assertEqual(with_tt.score, without_tt.score)
+        self.assertLess(with_tt._expanded_states,
+                        without_tt._expanded_states)
+        self.assertGreater(with_tt.transposition_table.hit_rate, 0)
+
+    def test_complete_entries(self):
+        # with passes, a search to as many plies as there are empty squares
+        # need not reach the end of the game, so only entries stored as
+        # complete count as such
+        game = endgame(4)
+        ai = AlphaBetaAI(str(game.current_player), endgame_empties=0)
+        table = ai.transposition_table
+        ai.new_iteration(4)
+        table.store(game.hash, 4, TranspositionTable.EXACT, 5.0)
+        self.assertEqual(ai.probe(game, -np.inf, np.inf, 4), (5.0, False))
+        self.assertEqual(ai._depth_cuts, 1)
+        self.assertEqual(ai.probe(game, -np.inf, np.inf, 6), (None, False))
+        ai.new_iteration(4)
+        table.store(game.hash, 2, TranspositionTable.EXACT, 6.0,
+                    complete=True)
+        self.assertEqual(ai.probe(game, -np.inf, np.inf, 6), (6.0, False))
+        self.assertEqual(ai._depth_cuts, 0)
+
+    def test_agrees_with_minimax(self):
+        for depth in range(4):
+            game = Game(Board(), [Player('black'), Player('white')])
+            minimax = MiniMaxAI('black', depth=depth)
+            alphabeta = AlphaBetaAI('black', depth=depth)
+            minimax.search(game)
+            alphabeta.search(game)
+            self.assertEqual(minimax.score, alphabeta.score)
+            self.assertEqual(len(alphabeta.pv), depth + 1)
+            self.assertLessEqual(alphabeta._expanded_states,
+                                 minimax._expanded_states)
+
+    def test_time_limit(self):
+        game = Game(Board(), [Player('black'), Player('white')])
+        ai = AlphaBetaAI('black', time_limit=0.2, depth=60)
+        start = time.perf_counter()
+        move = ai.search(game)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn(move, game.legal_moves())
+        self.assertEqual(move, ai.pv[0])
+        self.assertGreater(ai.depth_reached, 0)
+        # the search leaves the game as it found it
+        self.assertEqual(game.nbr_of_empty_tiles(), 60)
+        self.assertEqual(str(game.current_player), 'black')
+
+    def test_pondering(self):
+        game = Game(Board(), [Player('black'), Player('white')])
+        ai = AlphaBetaAI('white', depth=2)
+        ai.start_pondering(game)
+        ai._ponder_thread.join()
+        ai.stop_pondering()
+        reply = game.legal_moves()[0]
+        game.make_move(reply)
+        expected = AlphaBetaAI('white', depth=2)
+        expected_move = expected.search(game)
+        nodes = ai._expanded_states
+        self.assertEqual(ai.search(game), expected_move)
+        self.assertEqual(ai.score, expected.score)
+        self.assertEqual(ai.depth_reached, 2)
+        # the result found while pondering was used as it was
+        self.assertEqual(ai._expanded_states, nodes)
+
+
+class PVSAITest(TestCase):
+
+    def test_agrees_with_alpha_beta(self):
+        for seed in range(3):
+            game = endgame(40, seed)
+            color = str(game.current_player)
+            for depth in range(1, 5):
+                alphabeta = AlphaBetaAI(color, depth=depth, endgame_empties=0)
+                pvs = PVSAI(color, depth=depth, endgame_empties=0)
+                alphabeta.search(game)
+                move = pvs.search(game)
+                self.assertEqual(pvs.score, alphabeta.score)
+                self.assertIn(move, game.legal_moves())
+                self.assertEqual(move, pvs.pv[0])
+
+    def test_solves_endgame(self):
+        game = endgame(9)
+        color = str(game.current_player)
+        alphabeta = AlphaBetaAI(color, depth=60, endgame_empties=0)
+        pvs = PVSAI(color, depth=60, endgame_empties=0)
+        alphabeta.search(game)
+        pvs.search(game)
+        self.assertEqual(pvs.score, alphabeta.score)
+
+    def test_fewer_nodes(self):
+        alphabeta_nodes = pvs_nodes = 0
+        for seed in range(4):
+            game = endgame(44, seed)
+            color = str(game.current_player)
+            alphabeta = AlphaBetaAI(color, depth=5, endgame_empties=0)
+            pvs = PVSAI(color, depth=5, endgame_empties=0)
+            alphabeta.search(game)
+            pvs.search(game)
+            alphabeta_nodes += alphabeta._expanded_states
+            pvs_nodes += pvs._expanded_states
+        self.assertLess(pvs_nodes, alphabeta_nodes)
+
+    def test_no_probcut(self):
+        from othello.probcut import ProbCut
+        with self.assertRaises(ValueError):
+            PVSAI('black', probcut=ProbCut())
+
+
 # class AlphaBetaAITest(TestCase):
 #     def test_basic_alpha_beta(self):
 #         ai = AlphaBetaAI(1, time_limit=10)
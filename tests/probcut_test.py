@@ -0,0 +1,103 @@
+from unittest import TestCase
+import os.path
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.players import AlphaBetaAI
+from othello.probcut import ProbCut, fit, parse_pairs, search_scores
+from tests.players_test import endgame
+
+
+class ProbCutTest(TestCase):
+
+    def test_fit(self):
+        rng = random.Random(0)
+        samples = list()
+        for _ in range(200):
+            shallow = rng.uniform(-20, 20)
+            deep = 1.5 * shallow + 2 + rng.gauss(0, 1)
+            samples.append((rng.randint(4, 64), [shallow, deep]))
+        probcut = fit(samples, (1, 3), pairs=((3, 1),), phases=2)
+        self.assertEqual(len(probcut.pairs), 2)
+        for pair in probcut.pairs:
+            self.assertAlmostEqual(pair['a'], 1.5, delta=0.1)
+            self.assertAlmostEqual(pair['b'], 2, delta=0.5)
+            self.assertAlmostEqual(pair['sigma'], 1, delta=0.3)
+        (shallow, a, b, sigma), = probcut.checks(3, 60)
+        self.assertEqual(shallow, 1)
+        self.assertEqual(probcut.checks(4, 60), ())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'probcut.json')
+            probcut.save(path)
+            self.assertEqual(ProbCut.load(path), probcut)
+
+    def test_parse_pairs(self):
+        self.assertEqual(parse_pairs('3:1,5:3'), ((3, 1), (5, 3)))
+        with self.assertRaises(ValueError):
+            parse_pairs('3:3')
+        with self.assertRaises(ValueError):
+            parse_pairs('3-1')
+
+    def test_search_scores(self):
+        game = endgame(40)
+        own, opp, _ = game.position()
+        if str(game.current_player) == 'white':
+            own, opp = opp, own
+        scores = search_scores(own, opp, (1, 2))
+        ai = AlphaBetaAI(str(game.current_player), depth=1,
+                         endgame_empties=0)
+        ai.search(game)
+        self.assertEqual(scores[1], ai.score)
+
+    def test_pruning(self):
+        pairs = [{'phase': 0, 'depth': d, 'shallow': d - 2, 'a': 1.0,
+                  'b': 0.0, 'sigma': 1.0} for d in range(3, 6)]
+        game = endgame(40)
+        full = AlphaBetaAI(str(game.current_player), depth=4,
+                           endgame_empties=0)
+        pruned = AlphaBetaAI(str(game.current_player), depth=4,
+                             endgame_empties=0, probcut=ProbCut(pairs))
+        full.search(game)
+        move = pruned.search(game)
+        self.assertIn(move, game.legal_moves())
+        self.assertLess(pruned._expanded_states, full._expanded_states)
+        # the search leaves the game as it found it
+        self.assertEqual(game.nbr_of_empty_tiles(), 40)
+
+    def test_shallow_test_is_invisible(self):
+        game = endgame(40)
+        ai = AlphaBetaAI(str(game.current_player), depth=5,
+                         endgame_empties=0)
+        ai.search(game)
+        killers = [list(k) for k in ai.move_ordering._killers]
+        history = {c: dict(h) for c, h in ai.move_ordering._history.items()}
+        pv_table = list(ai._pv_table)
+        # a node at ply 2 of the last iteration, searched with depth 4
+        ai._shallow_test(ai.max_value, game, 0.0, 4, 2, True)
+        self.assertEqual(ai._iteration_depth, 5)
+        self.assertEqual(ai.move_ordering._killers, killers)
+        self.assertEqual(ai.move_ordering._history, history)
+        self.assertEqual(ai._pv_table[:2], pv_table[:2])
+        self.assertEqual(ai._pv_table[2], ())
+
+        # nor are nested ProbCut checks in the shallow search
+        # (the checks of the inner nodes never cut, so that the nodes are
+        # searched after them)
+        ai.probcut = ProbCut([
+            {'phase': 0, 'depth': d, 'shallow': s, 'a': 1.0, 'b': 0.0,
+             'sigma': sigma} for d, s, sigma in ((5, 4, 1.0), (3, 1, 1e3))])
+        ai._follow_pv = False
+        ai.transposition_table.clear()
+        ai._shallow_test(ai.max_value, game, 0.0, 5, 4, True)
+        self.assertFalse(ai._shallow_testing)
+        self.assertEqual(ai.move_ordering._killers, killers)
+        self.assertEqual(ai.move_ordering._history, history)
+
+
+if __name__ == '__main__':
+    unittest.main()
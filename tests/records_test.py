@@ -0,0 +1,106 @@
+from unittest import TestCase
+import os.path
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.arena import main as arena_main, play_game
+from othello.game import Board, Game
+from othello.players import Player
+from othello.records import (MAGIC, PASS, ArchiveWriter, GameArchive,
+                             decode_moves, encode_moves)
+
+
+class RecordsTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'games.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_encoding(self):
+        board = Board()
+        moves = [board.parse_index('d3'), None, (7, 7)]
+        codes = encode_moves(moves)
+        self.assertEqual(codes, bytes((2 * 8 + 3, PASS, 63)))
+        self.assertEqual(decode_moves(codes), moves)
+
+    def test_archive(self):
+        result = play_game('alphabeta:depth=1', 'minimax:depth=0', 4, 0)
+        with ArchiveWriter(self.path, buffer_size=64) as writer:
+            for _ in range(3):
+                writer.add_result(result)
+            writer.add([], 2, 2)
+        # appending keeps the games written before
+        with ArchiveWriter(self.path) as writer:
+            writer.add_result(result)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(len(MAGIC)), MAGIC)
+
+        archive = GameArchive(self.path)
+        records = list(archive)
+        self.assertEqual(len(archive), 5)
+        record = records[0]
+        self.assertEqual(record.black, 'alphabeta:depth=1')
+        self.assertEqual(record.white, 'minimax:depth=0')
+        self.assertEqual(record.winner, result['winner'])
+        self.assertEqual(
+            [None if m is None else Board().parse_numeric_index(m)
+             for m in record.moves], result['moves'])
+        game = record.game()
+        self.assertTrue(game.is_terminal())
+        self.assertEqual(game.nbr_of_tiles(game.players[0]),
+                         result['black_tiles'])
+        self.assertEqual(len(records[3]), 0)
+
+        # the positions are those before each move
+        replay = Game(Board(), [Player('black'), Player('white')])
+        for (black, white, to_move, code), move in zip(
+                record.positions(), record.moves):
+            self.assertEqual((black, white, to_move), replay.position())
+            replay.make_move(move)
+        self.assertEqual(sum(1 for _ in archive.positions()),
+                         4 * len(record))
+        archive.close()
+        # the records outlive the archive
+        self.assertEqual(records[0].moves, record.moves)
+        self.assertEqual(len(list(records[1].positions())), len(records[1]))
+
+    def test_records_outlive_archive(self):
+        with ArchiveWriter(self.path) as writer:
+            writer.add([(2, 3), None], 4, 1, 'a', 'b')
+        with GameArchive(self.path) as archive:
+            records = list(archive)
+        # the moves are not copied
+        self.assertIsInstance(records[0].codes, memoryview)
+        self.assertEqual(records[0].moves, [(2, 3), None])
+        self.assertEqual(records[0].black, 'a')
+
+    def test_errors(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not an archive')
+        with self.assertRaises(ValueError):
+            GameArchive(self.path)
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC + bytes((3, 0, 0, 0, 0, 1)))
+        with self.assertRaises(ValueError):
+            list(GameArchive(self.path))
+        with ArchiveWriter(self.path + '2') as writer:
+            writer.add([(0, 0)], 0, 0)
+        with self.assertRaises(ValueError):
+            list(next(iter(GameArchive(self.path + '2'))).positions())
+
+    def test_arena_archive(self):
+        arena_main(['minimax:depth=0', 'minimax:depth=0', '-n', '2',
+                    '-w', '1', '-o', os.path.join(self.directory.name,
+                                                  'results.jsonl'),
+                    '--archive', self.path])
+        self.assertEqual(len(GameArchive(self.path)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
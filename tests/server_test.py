@@ -0,0 +1,148 @@
+from unittest import TestCase
+import asyncio
+import json
+import os.path
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.server import GameServer
+
+
+class GameServerTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'server.sock')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_client(self, client, **kwargs):
+        """
+        Run the coroutine function 'client' with a connection to a server
+        on a Unix socket, returning the server.
+        """
+        server = GameServer(workers=1, **kwargs)
+
+        async def main():
+            await server.start(path=self.path)
+            try:
+                reader, writer = await asyncio.open_unix_connection(
+                    self.path)
+
+                async def send(request):
+                    writer.write(json.dumps(request).encode() + b'\n')
+                    return json.loads(await reader.readline())
+                await client(send)
+                writer.close()
+            finally:
+                await server.close()
+        asyncio.run(main())
+        return server
+
+    def test_game(self):
+        replies = list()
+
+        async def client(send):
+            reply = await send({'cmd': 'new', 'engine': 'alphabeta:depth=1',
+                                'color': 'white', 'time': 10})
+            replies.append(reply)
+            game = reply['game']
+            replies.append(await send({'cmd': 'move', 'game': game,
+                                       'move': 'a1'}))
+            while 'result' not in reply:
+                move = reply['legal_moves'][0] if reply['legal_moves'] \
+                    else 'pass'
+                reply = await send({'cmd': 'move', 'game': game,
+                                    'move': move})
+                self.assertTrue(reply['ok'], reply)
+            replies.append(reply)
+            replies.append(await send({'cmd': 'close', 'game': game}))
+            replies.append(await send({'cmd': 'state', 'game': game}))
+        server = self.run_client(client)
+
+        new, illegal, finished, closed, missing = replies
+        self.assertTrue(new['ok'])
+        self.assertEqual(new['to_move'], 'black')
+        self.assertEqual(new['ai_moves'], [])
+        self.assertEqual(sorted(new['legal_moves']),
+                         ['c4', 'd3', 'e6', 'f5'])
+        self.assertFalse(illegal['ok'])
+        result = finished['result']
+        self.assertEqual(result['black_tiles'] + result['white_tiles'] +
+                         finished['position'].count('-'), 64)
+        self.assertLess(finished['time_left'], 10)
+        self.assertTrue(closed['ok'])
+        self.assertFalse(missing['ok'])
+        self.assertEqual(server.sessions, {})
+
+    def test_ai_moves_first_and_limits(self):
+        replies = list()
+
+        async def client(send):
+            replies.append(await send({'cmd': 'new', 'color': 'black',
+                                       'engine': 'minimax:depth=0'}))
+            replies.append(await send({'cmd': 'new'}))
+            replies.append(await send({'cmd': 'new', 'engine': 'nope'}))
+            replies.append(await send([1, 2]))
+        self.run_client(client, max_sessions=1)
+
+        first, full, engine, invalid = replies
+        self.assertEqual(len(first['ai_moves']), 1)
+        self.assertEqual(first['to_move'], 'white')
+        self.assertEqual(full['error'], 'too many games')
+        self.assertFalse(engine['ok'])
+        self.assertFalse(invalid['ok'])
+
+    def test_bad_engine_arguments(self):
+        replies = list()
+
+        async def client(send):
+            for engine in ('alphabeta:dpth=4', "alphabeta:depth='x'"):
+                replies.append(await send({'cmd': 'new', 'color': 'black',
+                                           'engine': engine}))
+            replies.append(await send({'cmd': 'new', 'color': 'black',
+                                       'engine': 'alphabeta:depth=1'}))
+        server = self.run_client(client, max_sessions=1)
+
+        typo, depth, good = replies
+        self.assertFalse(typo['ok'])
+        self.assertIn('dpth', typo['error'])
+        self.assertFalse(depth['ok'])
+        self.assertIn('depth', depth['error'])
+        # the failed games do not count against max_sessions
+        self.assertTrue(good['ok'], good)
+        self.assertEqual(list(server.sessions), [good['game']])
+
+    def test_slow_search_does_not_block(self):
+        order = list()
+
+        async def client(send):
+            async def slow():
+                reader, writer = await asyncio.open_unix_connection(
+                    self.path)
+                writer.write(json.dumps(
+                    {'cmd': 'new', 'color': 'black', 'time': 30,
+                     'engine': 'alphabeta:depth=60'}).encode() + b'\n')
+                reply = json.loads(await reader.readline())
+                writer.close()
+                order.append(('slow', reply))
+
+            async def fast():
+                await asyncio.sleep(0.1)
+                order.append(('fast', await send({'cmd': 'new'})))
+            await asyncio.gather(slow(), fast())
+        self.run_client(client)
+
+        self.assertEqual([name for name, _ in order], ['fast', 'slow'])
+        self.assertTrue(all(reply['ok'] for _, reply in order))
+        # about a thirtieth of the budget is used for the first move
+        self.assertLess(order[1][1]['time_left'], 30)
+        self.assertGreater(order[1][1]['time_left'], 28)
+
+
+if __name__ == '__main__':
+    unittest.main()
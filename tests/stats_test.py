@@ -0,0 +1,79 @@
+from unittest import TestCase
+import json
+import logging
+import os.path
+import pstats
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.game import Board, Game
+from othello.players import AlphaBetaAI, MiniMaxAI, Player
+from othello.stats import JSONFormatter, SearchStats
+
+
+class SearchStatsTest(TestCase):
+
+    def test_alphabeta(self):
+        summaries = list()
+        stats = SearchStats(callback=summaries.append)
+        game = Game(Board(), [Player('black'), Player('white')])
+        ai = AlphaBetaAI('black', depth=3, stats=stats, evaluator=True)
+        move = ai.search(game)
+        plain = AlphaBetaAI('black', depth=3, evaluator=True)
+        self.assertEqual(plain.search(game), move)
+
+        summary, = summaries
+        self.assertIs(summary, stats.last)
+        self.assertEqual(summary['nodes'], plain._expanded_states)
+        self.assertEqual(sum(summary['nodes_per_ply']), summary['nodes'])
+        self.assertEqual(len(summary['nodes_per_ply']), 5)
+        self.assertGreater(sum(summary['cutoffs_per_ply']), 0)
+        self.assertEqual(len(summary['tt_probes_per_ply']),
+                         len(summary['tt_hits_per_ply']))
+        self.assertEqual(summary['move'],
+                         game.board.parse_numeric_index(move))
+        self.assertEqual(summary['pv'][0], summary['move'])
+        self.assertEqual(summary['depth'], 3)
+        self.assertGreater(summary['times']['move_generation'], 0)
+        self.assertGreater(summary['times']['evaluation'], 0)
+        json.dumps(summary)
+
+        # the wrapped methods are removed after the search
+        for name in ('cut_off', 'actions', 'probe', 'utility'):
+            self.assertNotIn(name, vars(ai))
+
+    def test_minimax(self):
+        game = Game(Board(), [Player('black'), Player('white')])
+        ai = MiniMaxAI('black', depth=2, stats=True)
+        ai.search(game)
+        summary = ai.stats.last
+        self.assertEqual(sum(summary['nodes_per_ply']), ai._expanded_states)
+        self.assertFalse(any(summary['cutoffs_per_ply']))
+        self.assertEqual([i['depth'] for i in summary['iterations']],
+                         [0, 1, 2])
+
+    def test_profile(self):
+        game = Game(Board(), [Player('black'), Player('white')])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'search.prof')
+            ai = MiniMaxAI('black', depth=1, profile=path)
+            ai.search(game)
+            functions = [f for _, _, f in pstats.Stats(path).stats]
+        self.assertIn('iterative_deepening', functions)
+
+    def test_json_formatter(self):
+        record = logging.LogRecord('othello', logging.INFO, __file__, 1,
+                                   'Player %s moved on %s',
+                                   ('white', 'c5'), None)
+        record.data = {'event': 'move', 'move': 'c5'}
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertEqual(entry['message'], 'Player white moved on c5')
+        self.assertEqual(entry['event'], 'move')
+        self.assertEqual(entry['level'], 'INFO')
+
+
+if __name__ == '__main__':
+    unittest.main()
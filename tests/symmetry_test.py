@@ -0,0 +1,97 @@
+from unittest import TestCase
+import os.path
+import random
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.game import Board, Game
+from othello.players import Player
+from othello import symmetry
+
+
+def naive_transform(bits, sym):
+    result = 0
+    for sq in range(64):
+        if bits >> sq & 1:
+            result |= 1 << symmetry.transform_square(sq, sym)
+    return result
+
+
+class SymmetryTest(TestCase):
+
+    def test_transform(self):
+        rng = random.Random(0)
+        for sym in range(8):
+            for _ in range(100):
+                bits = rng.getrandbits(64)
+                self.assertEqual(symmetry.transform(bits, sym),
+                                 naive_transform(bits, sym))
+            for sq in range(64):
+                self.assertEqual(symmetry.inverse_square(
+                    symmetry.transform_square(sq, sym), sym), sq)
+        # a1 goes to a8 when flipped, h1 when mirrored
+        self.assertEqual(symmetry.flip_vertical(1), 1 << 56)
+        self.assertEqual(symmetry.mirror_horizontal(1), 1 << 7)
+        self.assertEqual(symmetry.transpose(1 << 1), 1 << 8)
+
+    def test_canonical(self):
+        game = Game(Board(), [Player('black'), Player('white')])
+        black, white, to_move = game.position()
+        # the start position is symmetric
+        _, _, symmetries = symmetry.canonical_symmetries(black, white)
+        self.assertEqual(len(symmetries), 4)
+        # the four first moves lead to equivalent positions
+        positions = set()
+        for move in game.legal_moves():
+            game.make_move(move)
+            black, white, _ = game.position()
+            canonical = symmetry.canonical(black, white)
+            self.assertEqual(symmetry.transform(black, canonical[2]),
+                             canonical[0])
+            positions.add(canonical[:2])
+            game.undo_move()
+        self.assertEqual(len(positions), 1)
+
+    def test_board_and_moves(self):
+        board = Board()
+        game = Game(board, [Player('black'), Player('white')])
+        game.make_move(board.parse_index('f5'))
+        black, white, sym = board.canonical()
+        canonical = board.transformed(sym)
+        self.assertEqual(canonical.bits(-1), black)
+        self.assertEqual(canonical.bits(1), white)
+        canonical_game = Game.from_position(
+            (black, white, int(game.current_player)))
+        moves = canonical_game.legal_moves()
+        self.assertEqual(
+            sorted(symmetry.inverse_move(m, sym) for m in moves),
+            sorted(game.legal_moves()))
+        for move in game.legal_moves():
+            self.assertIn(symmetry.transform_move(move, sym), moves)
+        self.assertIsNone(symmetry.inverse_move(None, sym))
+
+    def test_arrays(self):
+        rng = random.Random(0)
+        black = [rng.getrandbits(64) for _ in range(50)]
+        white = [rng.getrandbits(64) & ~b for b in black]
+        for sym in range(8):
+            self.assertEqual(
+                symmetry.transform_array(black, sym).tolist(),
+                [symmetry.transform(b, sym) for b in black])
+        arrays = symmetry.canonical_array(black, white)
+        for i, (b, w) in enumerate(zip(black, white)):
+            self.assertEqual(tuple(int(a[i]) for a in arrays),
+                             symmetry.canonical(b, w))
+        # the images of the positions are duplicates
+        images = [(symmetry.transform(b, i % 8), symmetry.transform(w, i % 8))
+                  for i, (b, w) in enumerate(zip(black, white))]
+        all_black, all_white = zip(*(list(zip(black, white)) + images))
+        self.assertEqual(
+            symmetry.unique_array(all_black, all_white).tolist(),
+            list(range(50)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+from unittest import TestCase
+import os.path
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.evaluation import square_weights
+from othello.patterns import TABLE_SIZE, PatternEvaluator
+from othello.train import (MAGIC, N_CLASSES, RECORD, SQUARE_CLASSES,
+                           fit_patterns, fit_squares, generate, label,
+                           labeller, main, read_batches, read_dataset,
+                           square_features)
+from tests.evaluation_test import positions
+
+
+class TrainTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_dataset(self, n=200):
+        """
+        A dataset labelled with the weighted-square score.
+        """
+        own, opp = positions(n)
+        records = np.zeros(n, dtype=RECORD)
+        records['own'] = own
+        records['opp'] = opp
+        weights = square_weights().reshape(64)
+        records['label'] = square_features(own, opp) @ np.array(
+            [weights[np.flatnonzero(SQUARE_CLASSES == c)[0]]
+             for c in range(N_CLASSES)])
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(records.tobytes())
+        return records
+
+    def test_square_classes(self):
+        self.assertEqual(N_CLASSES, 10)
+        self.assertEqual(len(set(SQUARE_CLASSES[[0, 7, 56, 63]])), 1)
+
+    def test_read_batches(self):
+        records = self.write_dataset(50)
+        self.assertEqual(len(read_dataset(self.path)), 50)
+        batches = list(read_batches([self.path], batch_size=16, seed=0,
+                                    chunk_size=20))
+        self.assertTrue(all(len(b[0]) <= 16 for b in batches))
+        own = np.concatenate([b[0] for b in batches])
+        self.assertEqual(sorted(own.tolist()), sorted(records['own'].tolist()))
+
+    def test_fit(self):
+        self.write_dataset()
+        squares = fit_squares(read_batches([self.path], shuffle=False),
+                              phases=2, l2=1e-9)
+        np.testing.assert_allclose(squares, np.tile(
+            square_weights().reshape(64), (2, 1)), atol=1e-3)
+
+        evaluator = PatternEvaluator(np.zeros((2, TABLE_SIZE)))
+        errors = list(fit_patterns(
+            lambda: read_batches([self.path], 64, True, 0), evaluator, 3))
+        self.assertLess(errors[-1], errors[0])
+
+    def test_generate(self):
+        sizes = list(generate(self.path, 1, 'alphabeta:depth=0', workers=1,
+                              depth=0, exact_empties=4))
+        data = read_dataset(self.path)
+        self.assertEqual(len(data), sizes[0])
+        self.assertGreater(len(data), 40)
+        # the last positions are solved exactly
+        self.assertEqual(data['label'][-1], int(data['label'][-1]))
+
+        output = os.path.join(self.directory.name, 'weights.bin')
+        main(['fit', self.path, '-o', output, '--epochs', '1'])
+        self.assertEqual(PatternEvaluator.load(output).phases, 4)
+
+    def test_label_finished_games(self):
+        # black wipes out white by playing a3, a result found by the search
+        # rather than the endgame solver
+        own, opp = 1 << 0 | 1 << 10, 1 << 1
+        self.assertEqual(label(own, opp, depth=1, exact_empties=0,
+                               evaluator=True), 4)
+        self.assertEqual(label(own, opp, depth=1, exact_empties=60), 4)
+
+    def test_label_reuses_ai(self):
+        ai = labeller(depth=2, exact_empties=6)
+        for own, opp in zip(*positions(12)):
+            self.assertEqual(label(own, opp, ai=ai),
+                             label(own, opp, depth=2, exact_empties=6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+from unittest import TestCase
+import unittest
+
+import sys
+import os.path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from othello.transposition import TranspositionTable, ENTRY, zobrist
+
+
+class TranspositionTableTest(TestCase):
+
+    def test_memory_budget(self):
+        for size in (1000, 2 ** 20, 3 * 2 ** 20):
+            table = TranspositionTable(size)
+            self.assertLessEqual(table.nbytes, size)
+            self.assertGreater(table.nbytes, size // 2 - 2 * ENTRY.itemsize)
+
+    def test_store_and_probe(self):
+        table = TranspositionTable(2 ** 16)
+        self.assertIsNone(table.probe(12345))
+        table.store(12345, 4, TranspositionTable.LOWER, 2.5, (2, 3))
+        self.assertEqual(table.probe(12345),
+                         (4, TranspositionTable.LOWER, 2.5, (2, 3), False))
+        table.store(54321, 2, TranspositionTable.EXACT, -1, None)
+        self.assertEqual(table.probe(54321)[3], None)
+        self.assertEqual(table.hits, 2)
+        self.assertEqual(table.probes, 3)
+
+    def test_replacement(self):
+        table = TranspositionTable(1000)
+        buckets = table._mask + 1
+        deep, shallow, newer = 7, 7 + buckets, 7 + 2 * buckets
+        table.store(deep, 8, TranspositionTable.EXACT, 1)
+        table.store(shallow, 2, TranspositionTable.EXACT, 2)
+        table.store(newer, 1, TranspositionTable.EXACT, 3)
+        # the deep entry survives, the always-replace slot holds the newest
+        self.assertIsNotNone(table.probe(deep))
+        self.assertIsNone(table.probe(shallow))
+        self.assertIsNotNone(table.probe(newer))
+        # a deeper result takes the depth-preferred slot, demoting the old one
+        table.store(shallow, 9, TranspositionTable.EXACT, 2)
+        self.assertIsNotNone(table.probe(deep))
+        self.assertIsNotNone(table.probe(shallow))
+
+    def test_zobrist(self):
+        self.assertEqual(zobrist(0, 0), 0)
+        self.assertNotEqual(zobrist(1, 2), zobrist(2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()